@@ -6,16 +6,19 @@ import re
 import sys
 import subprocess
 import json
+import sqlite3
 import os
+from math import isnan, pi
 
 from functools import partial
 from collections import defaultdict
-from math import sin, cos, sqrt, atan2, radians
+
+from libs.startupProfile import StartupProfile, popProfileFlag
+startupProfile = StartupProfile()
 try:
     from PyQt5.QtGui import *
     from PyQt5.QtCore import *
     from PyQt5.QtWidgets import *
-    from PyQt5.QtWebEngineWidgets import QWebEngineView
     from PyQt5.QtCore import QUrl
 except ImportError:
     # needed for py3+qt4
@@ -28,14 +31,9 @@ except ImportError:
     from PyQt4.QtGui import *
     from PyQt4.QtCore import *
 
-# Add External libs
-from PIL.ExifTags import TAGS, GPSTAGS
-from PIL import Image
-from PIL import ImageQt
-from xml.etree import ElementTree
-from xml.etree.ElementTree import Element, SubElement
-from lxml import etree
+startupProfile.mark('Qt imports')
 import resources
+startupProfile.mark('resources')
 
 # Add internal libs
 from libs.constants import *
@@ -49,12 +47,24 @@ from libs.colorDialog import ColorDialog
 from libs.labelFile import LabelFile, LabelFileError
 from libs.toolBar import ToolBar
 from libs.pascal_voc_io import PascalVocReader
-from libs.pascal_voc_io import XML_EXT,ENCODE_METHOD
+from libs.pascal_voc_io import XML_EXT
+from libs.pascal_voc_io import SignRecord
 from libs.ustr import ustr
 from libs.version import __version__
-from libs.getExImgInfo import get_exif_data,_get_if_exist,_convert_to_degress,get_lat_lon
-from libs.boundingBoxWidget import BoundingBoxWidget
-from libs.thumbnailDialog import ThumbnailDialog
+from libs.boundingBoxWidget import BoundingBoxWidget, SPARE_WIDGETS
+from libs.prefetcher import ImagePrefetcher
+from libs.imageLoader import loadImageRecord, decodeImage
+from libs.geoIndex import GeoIndex, GeoIndexWorker
+from libs.dirScanner import DirScanner, scanImages
+from libs.fileListModel import FileListModel
+from libs.saveQueue import SaveQueue
+from libs import geo
+from libs.gpsTrack import GpsTrack
+from libs.mapWidget import MapWidget
+from libs.signInventory import SignInventory, SEARCH_RADIUS
+from libs.subclassCatalog import SubclassCatalog
+from libs.thumbnailCache import ThumbnailCache, THUMBNAIL_SIZE
+startupProfile.mark('labelImg modules')
 __appname__ = 'labelImg'
 
 # Utility functions and classes.
@@ -114,16 +124,31 @@ class MainWindow(QMainWindow, WindowMixin):
         # Load setting in the main thread
         self.settings = Settings()
         self.settings.load()
+        startupProfile.mark('settings')
         settings = self.settings
 
         # Save as Pascal voc xml
         self.defaultSaveDir = None
         self.usingPascalVocFormat = True
         # For loading all image under a directory
-        self.mImgList = []
+        self.fileListModel = FileListModel(self.annotationPathFor, self)
+        self.mImgList = self.fileListModel.paths
         self.dirname = None
         self.labelHist = []
         self.lastOpenDir = None
+        # Decode the next/previous images in the background
+        self.prefetcher = ImagePrefetcher()
+        # Persistent GPS/EXIF index of the opened dir, filled in the background
+        self.geoIndex = None
+        self.geoIndexWorker = None
+        # Heading, speed and chainage of the frames, from the geo index
+        self.gpsTrack = None
+        # Streaming scan of the opened dir
+        self.dirScanner = None
+        # Annotations are written on a worker thread
+        self.saveQueue = SaveQueue(self)
+        self.saveQueue.saved.connect(self.labelsSaved)
+        self.saveQueue.failed.connect(self.labelsSaveFailed)
 
         # Whether we need to save or not.
         self.dirty = False
@@ -145,19 +170,16 @@ class MainWindow(QMainWindow, WindowMixin):
         # map the img info items (boundingBoxWidget class) to shape.
         self.bndWidgetsToShapes = {}
         self.shapesToBndWidgets = {}
-        self.pasteGeosToBndWidgets = {}
-        self.pasteAllsToBndWidgets = {}
-        self.QComboBoxSubsToBndWidgets = {}
-        #self.checkBoxesToBndWidgets = {}
-        self.gotoGeoToBndWidgets = {}
-        self.latLineEditToBndWidgets = {}
-        self.longLineEidtToBndWidgets = {}
-
-        # save last image GPS INFO
+        # Hidden rows of the image info dock, see acquireBndWidget()
+        self.bndWidgetPool = []
+        # The subclass list of the combo boxes, see subclasses()
+        self.subclassCatalog = None
+        # The subclass previews, see thumbnails()
+        self.thumbnailCache = None
+
+        # GPS INFO of the current image
         self.geoInfo = None
-        self.lastGPS = None
 
-        self.bndNum = 0
         #refer cropped img
         self.cropped_img = None
         self.thumbnailDialog = None
@@ -224,11 +246,24 @@ class MainWindow(QMainWindow, WindowMixin):
         self.dock.setWidget(labelListContainer)
 
         # Tzutalin 20160906 : Add file list and dock to move faster
-        self.fileListWidget = QListWidget()
-        self.fileListWidget.itemDoubleClicked.connect(self.fileitemDoubleClicked)
+        # A model/view list stays cheap with hundreds of thousands of images
+        self.fileListView = QTreeView()
+        self.fileListView.setModel(self.fileListModel)
+        self.fileListView.setRootIsDecorated(False)
+        self.fileListView.setUniformRowHeights(True)
+        self.fileListView.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.fileListView.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.fileListView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.fileListView.setTextElideMode(Qt.ElideLeft)
+        fileListHeader = self.fileListView.header()
+        fileListHeader.setStretchLastSection(False)
+        fileListHeader.setSectionResizeMode(FileListModel.COLUMN_FILE, QHeaderView.Stretch)
+        for column in range(FileListModel.COLUMN_XML, len(FileListModel.HEADERS)):
+            fileListHeader.setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        self.fileListView.doubleClicked.connect(self.fileitemDoubleClicked)
         filelistLayout = QVBoxLayout()
         filelistLayout.setContentsMargins(0, 0, 0, 0)
-        filelistLayout.addWidget(self.fileListWidget)
+        filelistLayout.addWidget(self.fileListView)
         fileListContainer = QWidget()
         fileListContainer.setLayout(filelistLayout)
         self.filedock = QDockWidget(u'File List', self)
@@ -266,11 +301,14 @@ class MainWindow(QMainWindow, WindowMixin):
         self.dock.setFeatures(self.dock.features() ^ self.dockFeatures)
 
         # Jchen =20180305: add a widget for webbrowser to load map
-        # page viewer
-        self.webViewer = QWebEngineView()
-        self.webViewer.setMinimumHeight(100)
-        self.webViewer.page()
-        self.webViewer.load(QUrl(self.defaultURL))
+        # The map is drawn from local data and only pans when the frame
+        # changes. The web page viewer is created on demand, see showWebMap().
+        self.mapWidget = MapWidget()
+        self.mapWidget.setDataDir(settings.get(SETTING_MAP_DATA_DIR, None))
+        self.webViewer = None
+        self.webMapDock = None
+        # Opened on first use, see openSignInventory()
+        self.signInventory = None
 
         # navigation_bar
         self.navigation_bar = QToolBar('Navigation')
@@ -297,49 +335,35 @@ class MainWindow(QMainWindow, WindowMixin):
         distContainer.setMaximumHeight(50)
         distContainer.setLayout(distLayout)
         #add buttons to navigation bar
-        back_button = QAction(QIcon('icons/backward.png'), 'Back', self)
-        next_button = QAction(QIcon('icons/forward.png'), 'Forward', self)
-        home_button = QAction(QIcon('icons/home.png'), 'home', self)
-        reload_button = QAction(QIcon('icons/reload.png'), 'reload', self)
+        zoomInMap = QAction(QIcon('icons/zoom-in.png'), 'Zoom in', self)
+        zoomOutMap = QAction(QIcon('icons/zoom-out.png'), 'Zoom out', self)
+        mapData = QAction(QIcon('icons/open.png'), 'Map data', self)
+        webMap = QAction(QIcon('icons/home.png'), 'Web map', self)
 
-        back_button.triggered.connect(self.webViewer.back)
-        next_button.triggered.connect(self.webViewer.forward)
-        home_button.triggered.connect(self.back_to_home)
-        reload_button.triggered.connect(self.webViewer.reload)
+        zoomInMap.triggered.connect(lambda: self.mapWidget.setZoom(self.mapWidget.zoom + 1))
+        zoomOutMap.triggered.connect(lambda: self.mapWidget.setZoom(self.mapWidget.zoom - 1))
+        mapData.triggered.connect(self.changeMapDataDir)
+        webMap.triggered.connect(self.showWebMap)
 
         #add buttons to navigation_bar
-        self.navigation_bar.addAction(back_button)
-        self.navigation_bar.addAction(next_button)
-        self.navigation_bar.addAction(home_button)
-        self.navigation_bar.addAction(reload_button)
-
-        #get enter for url
-        self.urlbar = QLineEdit()
-        self.urlbar.returnPressed.connect(self.navigate_to_url)
-
+        self.navigation_bar.addAction(zoomInMap)
+        self.navigation_bar.addAction(zoomOutMap)
+        self.navigation_bar.addAction(mapData)
         self.navigation_bar.addSeparator()
-        self.navigation_bar.addWidget(self.urlbar)
+        self.navigation_bar.addAction(webMap)
 
-        # change the webbroswer url
-        self.webViewer.urlChanged.connect(self.renew_urlbar)
-
-        webBrowserLayout = QVBoxLayout()
-        webBrowserLayout.setContentsMargins(0, 0, 0, 0)
-        webBrowserLayout.addWidget(self.navigation_bar) #add navigation_bar
-        webBrowserLayout.addWidget(self.webViewer)
-        webBrowserLayout.addWidget(distContainer)
-        webBrowserContainer = QWidget()
-        webBrowserContainer.setLayout(webBrowserLayout)
-
-        # add scroll to webbrowser
-        webScrollArea = QScrollArea()
-        webScrollArea.setWidgetResizable(True)
-        webScrollArea.setWidget(webBrowserContainer)
+        mapLayout = QVBoxLayout()
+        mapLayout.setContentsMargins(0, 0, 0, 0)
+        mapLayout.addWidget(self.navigation_bar) #add navigation_bar
+        mapLayout.addWidget(self.mapWidget)
+        mapLayout.addWidget(distContainer)
+        mapContainer = QWidget()
+        mapContainer.setLayout(mapLayout)
 
         # Jchen =20180305: add a webbrowser and dock to move faster
         self.webDock = QDockWidget(u'Traffic Sign Map', self)
         self.webDock.setObjectName(u'Browser')
-        self.webDock.setWidget(webScrollArea)
+        self.webDock.setWidget(mapContainer)
 
         self.addDockWidget(Qt.RightDockWidgetArea, self.webDock)
         self.webDock.setFeatures(QDockWidget.DockWidgetFloatable)
@@ -349,14 +373,11 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Jchen = 20180311 add a dock to show the image infomation
 
-        self.createThumbnail = QPushButton('create ThumbN', self)
-        self.createThumbnail.setFixedWidth(120)
-        self.createThumbnail.clicked.connect(self.createThumbnailClicked)
-
-        self.thumbnail = QLabel()
-        self.thumbnail.setMinimumWidth(100)
-        self.thumbnail.setMinimumHeight(100)
-        self.thumbnail.setScaledContents(True)
+        # The contents of the image info dock are made with the first image,
+        # see setupImgInfoDock().
+        self.createThumbnail = None
+        self.thumbnail = None
+        self.imgInfoLayout = None
 
 
         # Connect to itemChanged to detect checkbox changes.
@@ -387,6 +408,9 @@ class MainWindow(QMainWindow, WindowMixin):
         openAnnotation = action('&Open Annotation', self.openAnnotationDialog,
                                 'Ctrl+Shift+O', 'open', u'Open Annotation')
 
+        loadInventory = action('Load Sign &Inventory', self.loadSignInventoryDialog,
+                               None, 'open', u'Import a sign inventory export (CSV or GeoJSON)')
+
         openNextImg = action('&Next Image', self.openNextImg,
                              'd', 'next', u'Open Next')
 
@@ -542,7 +566,8 @@ class MainWindow(QMainWindow, WindowMixin):
         self.saveLayout.setChecked(False)
 
         addActions(self.menus.file,
-                   (open, opendir, changeSavedir, openAnnotation, self.menus.recentFiles, save, saveAs, close, resetAll, quit))
+                   (open, opendir, changeSavedir, openAnnotation, loadInventory, self.menus.recentFiles, save, saveAs,
+                    close, resetAll, quit))
         addActions(self.menus.help, (help, showInfo,self.saveLayout))
         addActions(self.menus.view, (
             self.autoSaving,
@@ -575,6 +600,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Application state.
         self.image = QImage()
+        self.imageRecord = None
         self.filePath = ustr(defaultFilename)
         self.recentFiles = []
         self.maxRecent = 7
@@ -593,6 +619,7 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 self.recentFiles = recentFileQStringList = settings.get(SETTING_RECENT_FILES)
 
+        startupProfile.mark('widgets')
         size = settings.get(SETTING_WIN_SIZE, QSize(600, 500))
         position = settings.get(SETTING_WIN_POSE, QPoint(0, 0))
         self.resize(size)
@@ -638,69 +665,95 @@ class MainWindow(QMainWindow, WindowMixin):
         # Display cursor coordinates at the right of status bar
         self.labelCoordinates = QLabel('')
         self.statusBar().addPermanentWidget(self.labelCoordinates)
+        self.stopScanButton = QPushButton('Stop scan')
+        self.stopScanButton.clicked.connect(self.stopDirScan)
+        self.stopScanButton.setVisible(False)
+        self.statusBar().addPermanentWidget(self.stopScanButton)
 
         # Open Dir if deafult file
         if self.filePath and os.path.isdir(self.filePath):
             self.openDirDialog(dirpath=self.filePath)
 
         self.setFocusPolicy(Qt.StrongFocus)
+        startupProfile.mark('window state')
 
     ##focus event.
 
     ## Support Functions ##
     # jchen = 20180403 create thumbnail
 
-    def createThumbnailClicked(self):
-        self.thumbnailDialog = ThumbnailDialog(self)
+    def setupImgInfoDock(self):
+        """Build the contents of the image info dock, once, when the first
+        image is loaded. The rows of the boxes are recycled, see
+        acquireBndWidget()."""
+        if self.imgInfoLayout is not None:
+            return
+        self.createThumbnail = QPushButton('create ThumbN', self)
+        self.createThumbnail.setFixedWidth(120)
+        self.createThumbnail.clicked.connect(self.createThumbnailClicked)
 
-        TBD = self.thumbnailDialog
-        with open('data/subclass.txt', 'r') as subclass:
-            dropitems = subclass.readlines()
-            for line in dropitems:
-                line = line.strip()
-                TBD.imgName.addItem(line)
+        # The previews come scaled to this size, see thumbnails()
+        self.thumbnail = QLabel()
+        self.thumbnail.setFixedSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self.thumbnail.setAlignment(Qt.AlignCenter)
+
+        self.imgInfoLayout = QVBoxLayout()
+        self.imgInfoLayout.setContentsMargins(0, 0, 0, 0)
+        self.imgInfoLayout.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+
+        self.hLayout = QVBoxLayout()
+        self.hLayout.setAlignment(Qt.AlignTop)
+        self.hLayout.addWidget(self.createThumbnail)
+        self.hLayout.addWidget(self.thumbnail)
+        self.wholeImgInfoLayout = QHBoxLayout()
+        self.wholeImgInfoLayout.addLayout(self.imgInfoLayout)
+        self.wholeImgInfoLayout.addLayout(self.hLayout)
+        self.wholeImgInfoLayout.setAlignment(Qt.AlignTop)
+        imgInfoListContainer = QWidget()
+        imgInfoListContainer.setLayout(self.wholeImgInfoLayout)
+
+        # jchen 0328 add Scroll function
+        imgInfoScroll = QScrollArea()
+        imgInfoScroll.setWidget(imgInfoListContainer)
+        imgInfoScroll.setWidgetResizable(True)
+        self.imgInfoScrollBars = {
+            Qt.Vertical: imgInfoScroll.verticalScrollBar()
+        }
+        self.imgInfoScrollArea = imgInfoScroll
+        self.imgInfodock.setWidget(self.imgInfoScrollArea)
 
-        TBD.imgName.setEditable(True)
-        allStrings = [TBD.imgName.itemText(i) for i in range(TBD.imgName.count())]
-        autoComplete = QCompleter(allStrings)
-        TBD.imgName.setCompleter(autoComplete)
+    def createThumbnailClicked(self):
+        # The dialog is only loaded when a thumbnail is first made, it is
+        # kept for the next ones.
+        if self.thumbnailDialog is None:
+            from libs.thumbnailDialog import ThumbnailDialog
+            self.thumbnailDialog = ThumbnailDialog(self)
+            # A preview saved over an existing one does not change the folder
+            self.thumbnailDialog.accepted.connect(lambda: self.thumbnails().rescan())
+            self.subclasses().bind(self.thumbnailDialog.imgName)
 
+        TBD = self.thumbnailDialog
+        TBD.imgData = None
+        TBD.isSaved = False
+        TBD.imgThumbnail.clear()
         TBD.show()
 
         if (self.filePath):
-            try:
-                shape = self.canvas.selectedShape
-                points = shape.points
-                xmin = points[0].x()
-                ymin = points[0].y()
-                xmax = points[2].x()
-                ymax = points[2].y()
-            except:
-                print('get croodinate failed')
-            try:
-                bndBoxWidget = self.shapesToBndWidgets[shape]
-                TBD.imgName.setCurrentText(bndBoxWidget.dropDownBoxs['sub'].currentText())
-            except:
+            shape = self.canvas.selectedShape
+            bndBoxWidget = self.shapesToBndWidgets.get(shape)
+            if bndBoxWidget is None:
                 TBD.imgThumbnail.setText('No bounding \n box selected')
-                print('get subclass failed')
-            try:
-                img = Image.open("{}".format(self.filePath))
-
-                area = (xmin, ymin, xmax, ymax)
-                cropped_img = img.crop(area)
-                #cropped_img.save(os.getcwd() + '/icons/thumbnails/{}.png'.format(bndBoxWidget.dropDownBoxs['sub'].currentText()), 'PNG')
-                TBD.imgData = cropped_img
-            except:
-                print('load image failed')
-            try:
-                temp_img = cropped_img.resize((64,64), Image.ANTIALIAS)
-                image1 = ImageQt.ImageQt(temp_img)
-                image2 = QImage(image1)
-                pixmap = QPixmap.fromImage(image2)
-                pixmap.scaled(64,64,Qt.KeepAspectRatio)
-                TBD.imgThumbnail.setPixmap(pixmap)
-            except:
-                print('load img to label failed')
+                return
+            TBD.imgName.setCurrentText(bndBoxWidget.dropDownBoxs['sub'].currentText())
+            # Cut from the image on the canvas, the file is not read again
+            points = shape.points
+            area = QRectF(points[0], points[2]).normalized().toAlignedRect()
+            TBD.imgData = self.image.copy(area)
+            if TBD.imgData.isNull():
+                print('crop thumbnail failed')
+                return
+            TBD.imgThumbnail.setPixmap(QPixmap.fromImage(
+                TBD.imgData.scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)))
 
             # try:
             #     print(TBD.isSaved)
@@ -720,6 +773,89 @@ class MainWindow(QMainWindow, WindowMixin):
         return
     # navigate_to_url function
 
+    def showWebMap(self, url=None):
+        """Open the web sign viewer, creating it on first use. QtWebEngine is
+        slow to start and optional, nothing else needs it."""
+        if self.webViewer is None:
+            try:
+                from PyQt5.QtWebEngineWidgets import QWebEngineView
+            except ImportError as e:
+                self.errorMessage(u'Web map unavailable', u'QtWebEngine could not be loaded: %s' % e)
+                return
+            self.webViewer = QWebEngineView()
+            self.webViewer.setMinimumHeight(100)
+
+            webBar = QToolBar('Web navigation')
+            webBar.setIconSize(QSize(16, 16))
+            back_button = QAction(QIcon('icons/backward.png'), 'Back', self)
+            next_button = QAction(QIcon('icons/forward.png'), 'Forward', self)
+            home_button = QAction(QIcon('icons/home.png'), 'home', self)
+            reload_button = QAction(QIcon('icons/reload.png'), 'reload', self)
+            back_button.triggered.connect(self.webViewer.back)
+            next_button.triggered.connect(self.webViewer.forward)
+            home_button.triggered.connect(self.back_to_home)
+            reload_button.triggered.connect(self.webViewer.reload)
+            for button in (back_button, next_button, home_button, reload_button):
+                webBar.addAction(button)
+
+            #get enter for url
+            self.urlbar = QLineEdit()
+            self.urlbar.returnPressed.connect(self.navigate_to_url)
+            webBar.addSeparator()
+            webBar.addWidget(self.urlbar)
+            # change the webbroswer url
+            self.webViewer.urlChanged.connect(self.renew_urlbar)
+
+            webLayout = QVBoxLayout()
+            webLayout.setContentsMargins(0, 0, 0, 0)
+            webLayout.addWidget(webBar)
+            webLayout.addWidget(self.webViewer)
+            webContainer = QWidget()
+            webContainer.setLayout(webLayout)
+            self.webMapDock = QDockWidget(u'Traffic Sign Web Map', self)
+            self.webMapDock.setObjectName(u'WebBrowser')
+            self.webMapDock.setWidget(webContainer)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.webMapDock)
+            self.tabifyDockWidget(self.webDock, self.webMapDock)
+        if url is None:
+            url = self.webMapUrl(self.geoInfo) if self.geoInfo is not None else self.defaultURL
+        self.webViewer.load(QUrl(url))
+        self.urlbar.setText(url)
+        self.webMapDock.show()
+        self.webMapDock.raise_()
+
+    def webMapUrl(self, position):
+        return 'https://vtrans.github.io/signs-data-viewer/?lon={}&lat={}&zoomLevel=18'.format(
+            float(position[1]), float(position[0]))
+
+    def changeMapDataDir(self, _value=False):
+        """Pick the folder of raster tiles (<z>/<x>/<y>.png) and GeoJSON layers
+        the map is drawn from."""
+        current = self.mapWidget.dataDir or '.'
+        dirPath = ustr(QFileDialog.getExistingDirectory(self, '%s - Map data folder' % __appname__, current,
+                                                        QFileDialog.ShowDirsOnly | QFileDialog.DontResolveSymlinks))
+        if dirPath:
+            self.mapWidget.setDataDir(dirPath)
+            self.status('Map drawn from %s (%d layers)' % (dirPath, len(self.mapWidget.layers)))
+
+    def showFrameOnMap(self):
+        """Pan the map to the current frame and show its signs."""
+        if self.geoInfo is None:
+            self.mapWidget.clearCurrent()
+            return
+        point = self.currentTrackPoint()
+        self.mapWidget.setCurrent(self.geoInfo[0], self.geoInfo[1], point.heading if point is not None else None)
+        signs = []
+        for shape in self.canvas.shapes:
+            sign = self.objects.get(shape)
+            if sign is None or sign['latitude'] is None or sign['longitude'] is None:
+                continue
+            try:
+                signs.append((float(sign['latitude']), float(sign['longitude']), sign['subclass'] or shape.label))
+            except (TypeError, ValueError):
+                continue
+        self.mapWidget.setSigns(signs)
+
     def back_to_home(self):
         self.webViewer.load(QUrl(self.defaultURL))
 
@@ -796,9 +932,14 @@ class MainWindow(QMainWindow, WindowMixin):
     def resetState(self):
         self.itemsToShapes.clear()
         self.shapesToItems.clear()
+        if self.imgInfoLayout is not None:
+            self.releaseImgInfo()
+            self.trimBndWidgetPool()
+        self.objects.clear()
         self.labelList.clear()
         self.filePath = None
         self.imageData = None
+        self.imageRecord = None
         self.labelFile = None
         self.canvas.resetState()
         self.labelCoordinates.clear()
@@ -892,13 +1033,21 @@ class MainWindow(QMainWindow, WindowMixin):
             self.setDirty()
 
     # Tzutalin 20160906 : Add file list and dock to move faster
-    def fileitemDoubleClicked(self, item=None):
-        currIndex = self.mImgList.index(ustr(item.text()))
-        if currIndex < len(self.mImgList):
-            filename = self.mImgList[currIndex]
+    def fileitemDoubleClicked(self, index=None):
+        if index is not None and index.isValid():
+            filename = self.fileListModel.path(index.row())
             if filename:
                 self.loadFile(filename)
 
+    def annotationPathFor(self, imagePath):
+        """Path of the xml loadFile would read for imagePath."""
+        basename = os.path.splitext(os.path.basename(imagePath))[0] + XML_EXT
+        if self.defaultSaveDir is not None:
+            xmlPath = os.path.join(self.defaultSaveDir, basename)
+            if os.path.isfile(xmlPath):
+                return xmlPath
+        return os.path.splitext(imagePath)[0] + XML_EXT
+
     # Add chris
     def btnstate(self, item= None):
         """ Function to handle difficult examples
@@ -943,7 +1092,7 @@ class MainWindow(QMainWindow, WindowMixin):
         self.actions.shapeFillColor.setEnabled(selected)
 
 
-    def addLabel(self, shape):
+    def addLabel(self, shape, addInfo=True):
         item = HashableQListWidgetItem(shape.label)
         item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
         item.setCheckState(Qt.Checked)
@@ -951,19 +1100,10 @@ class MainWindow(QMainWindow, WindowMixin):
         self.itemsToShapes[item] = shape
         self.shapesToItems[shape] = item
         self.labelList.addItem(item)
-        try:
-            pass
-            #print(self.filePath)
-            #print(self.canvas.selectedShape)
-        except:
-            print('file path is none')
         #jcehn = 20180401 add imginfo
-        try:                         # try to fix this "'MainWindow' object has no attribute 'imgInfoLayout'"
-            temp = self.imgInfoLayout
-            self.addImgInfo(shape,self.copiedObjectInfo)
-            self.shapesToBndWidgets[shape].boundingBoxInfoLayoutContainer.setVisible(True)
-        except Exception as e:
-            print(e.args)
+        # Shapes read with an image get their rows in loadImgInfo()
+        if addInfo and self.imgInfoLayout is not None:
+            self.addImgInfo(shape, self.copiedObjectInfo)
         for action in self.actions.onShapesPresent:
             action.setEnabled(True)
 
@@ -979,13 +1119,14 @@ class MainWindow(QMainWindow, WindowMixin):
 
     def loadLabels(self, shapes):
         s = []
-        for label, points, line_color, fill_color, difficult in shapes:
+        for label, points, line_color, fill_color, difficult, sign in shapes:
             shape = Shape(label=label)
             for x, y in points:
                 shape.addPoint(QPointF(x, y))
             shape.difficult = difficult
             shape.close()
             s.append(shape)
+            self.objects[shape] = sign
 
             if line_color:
                 shape.line_color = QColor(*line_color)
@@ -997,11 +1138,12 @@ class MainWindow(QMainWindow, WindowMixin):
             else:
                 shape.fill_color = generateColorByText(label)
 
-            self.addLabel(shape)
+            self.addLabel(shape, addInfo=False)
 
         self.canvas.loadShapes(s)
 
     def saveLabels(self, annotationFilePath):
+        """Queue a snapshot of the labels to be written by the save thread."""
         annotationFilePath = ustr(annotationFilePath)
         if self.labelFile is None:
             self.labelFile = LabelFile()
@@ -1019,29 +1161,52 @@ class MainWindow(QMainWindow, WindowMixin):
 
         obejcts = []
         for shape in self.canvas.shapes:
-            try:
-                obejcts.append(self.objects[shape])
-            except Exception as e:
-                pritn('Exception in convert objects in savePascal:', str(e))
-        # Can add differrent annotation formats here
-        try:
-            if self.usingPascalVocFormat is True:
-                print ('Img: ' + self.filePath + ' -> Its xml: ' + annotationFilePath)
-                self.labelFile.savePascalVocFormat(annotationFilePath, shapes, self.filePath, self.imageData,
-                                                   self.lineColor.getRgb(), self.fillColor.getRgb(),objects = obejcts, geoInfo = self.geoInfo)
-                # delete xml file when there is no bounding box in the image
-                try:
-                    if self.noShapes():
+            if shape in self.objects:
+                obejcts.append(self.objects[shape].copy())
+            else:
+                print('no sign info for %s, saving it empty' % shape.label)
+                obejcts.append(SignRecord())
+
+        # Everything the job needs is copied now, the window moves on
+        labelFile = LabelFile()
+        labelFile.verified = self.labelFile.verified
+        filePath = self.filePath
+        imageData = self.imageData
+        geoInfo = self.geoInfo
+        imageShape = self.imageRecord.shape if self.imageRecord else None
+        lineColor = self.lineColor.getRgb()
+        fillColor = self.fillColor.getRgb()
+        usingPascalVocFormat = self.usingPascalVocFormat
+
+        def save():
+            # Can add differrent annotation formats here
+            if usingPascalVocFormat is True:
+                print ('Img: ' + filePath + ' -> Its xml: ' + annotationFilePath)
+                if not shapes:
+                    # no xml file when there is no bounding box in the image
+                    if os.path.isfile(annotationFilePath):
                         os.remove(annotationFilePath)
-                except:
-                    print('no xml file to delete')
+                    return
+                labelFile.savePascalVocFormat(annotationFilePath, shapes, filePath, imageData,
+                                              lineColor, fillColor, objects = obejcts, geoInfo = geoInfo,
+                                              imageShape = imageShape)
             else:
-                self.labelFile.save(annotationFilePath, shapes, self.filePath, self.imageData,
-                                    self.lineColor.getRgb(), self.fillColor.getRgb())
-            return True
-        except LabelFileError as e:
-            self.errorMessage(u'Error saving label data', u'<b>%s</b>' % e)
-            return False
+                labelFile.save(annotationFilePath, shapes, filePath, imageData,
+                               lineColor, fillColor)
+
+        self.saveQueue.submit(annotationFilePath, filePath, save)
+        return True
+
+    def labelsSaved(self, annotationFilePath, imagePath):
+        self.fileListModel.invalidateStatus(imagePath)
+        self.statusBar().showMessage('Saved to  %s' % annotationFilePath)
+        self.statusBar().show()
+
+    def labelsSaveFailed(self, annotationFilePath, imagePath, message):
+        if imagePath == self.filePath:
+            # Still on screen, let the user save again
+            self.setDirty()
+        self.errorMessage(u'Error saving label data', u'<b>%s</b><p>%s</p>' % (annotationFilePath, message))
 
     def copySelectedShape(self):
         self.addLabel(self.canvas.copySelectedShape())
@@ -1062,19 +1227,8 @@ class MainWindow(QMainWindow, WindowMixin):
 
     def changeCheckBoxStatus(self,shape):
         try:
-            for s in self.shapesToBndWidgets:
-                self.shapesToBndWidgets[s].checkBox.setCheckable(False)
-                self.shapesToBndWidgets[s].checkBox.setChecked(False)
-                p = self.shapesToBndWidgets[s].boundingBoxInfoLayoutContainer.palette()
-                p.setColor(self.shapesToBndWidgets[s].boundingBoxInfoLayoutContainer.backgroundRole(), Qt.white)
-                self.shapesToBndWidgets[s].boundingBoxInfoLayoutContainer.setPalette(p)
-
-            self.shapesToBndWidgets[shape].checkBox.setCheckable(True)
-            self.shapesToBndWidgets[shape].checkBox.setChecked(True)
-            p = self.shapesToBndWidgets[shape].boundingBoxInfoLayoutContainer.palette()
-            p.setColor(self.shapesToBndWidgets[shape].boundingBoxInfoLayoutContainer.backgroundRole(), Qt.darkGray)
-            self.shapesToBndWidgets[shape].boundingBoxInfoLayoutContainer.setPalette(p)
-
+            for s, bndWidget in self.shapesToBndWidgets.items():
+                bndWidget.setSelected(s == shape)
         except Exception as e:
             print('Exception is :', str(e))
             print('selected the boundingbox failed')
@@ -1226,12 +1380,17 @@ class MainWindow(QMainWindow, WindowMixin):
 
         # Tzutalin 20160906 : Add file list and dock to move faster
         # Highlight the file item
-        if unicodeFilePath and self.fileListWidget.count() > 0:
-            index = self.mImgList.index(unicodeFilePath)
-            fileWidgetItem = self.fileListWidget.item(index)
-            fileWidgetItem.setSelected(True)
+        index = self.fileListModel.indexOf(unicodeFilePath) if unicodeFilePath else -1
+        if index >= 0:
+            modelIndex = self.fileListModel.index(index, FileListModel.COLUMN_FILE)
+            self.fileListView.setCurrentIndex(modelIndex)
+            self.fileListView.scrollTo(modelIndex)
+        else:
+            index = None
 
         if unicodeFilePath and os.path.exists(unicodeFilePath):
+            image = None
+            geoInfo = None
             if LabelFile.isLabelFile(unicodeFilePath):
                 try:
                     self.labelFile = LabelFile(unicodeFilePath)
@@ -1249,26 +1408,36 @@ class MainWindow(QMainWindow, WindowMixin):
                 #print("not in labelfile")
                 # Load image:
                 # read data first and store for saving into label file.
-                self.imageData = read(unicodeFilePath, None)
+                # Stepping through a folder is normally a prefetch cache hit.
+                record = self.prefetcher.take(unicodeFilePath)
+                if record is None:
+                    try:
+                        record = loadImageRecord(unicodeFilePath)
+                    except (IOError, OSError):
+                        record = None
+                if record is not None:
+                    self.imageData = record.imageData
+                    image = record.image
+                    geoInfo = record.geoInfo
+                else:
+                    self.imageData = None
+                self.imageRecord = record
                 self.labelFile = None
 
             # Jchen 20180315 Load image geoInfo
-
-            try:
-                self.geoInfo = get_lat_lon(get_exif_data(Image.open(unicodeFilePath)))  #self.geoInfo  = (lat,lon) or (lat,lon, alt)
-                if updateWebbrowser:
-                    #googleQueryUrl = 'https://www.google.com/maps/search/?api=1&query='
-                    vtranMapUrl = 'https://vtrans.github.io/signs-data-viewer/?lon=-72.683117&lat=44.296882&zoomLevel=18'
-                    imgUrl = 'https://vtrans.github.io/signs-data-viewer/?lon={}&lat={}&zoomLevel=18'.format(self.geoInfo[1],self.geoInfo[0])
-                    self.webViewer.load(QUrl(imgUrl))
-                    self.urlbar.setText(imgUrl)
-                #print('curGPS lat = {},long = {}'.format(self.geoInfo[0],self.geoInfo[1]))
-                #print(imgUrl)
-            except:
-                print('loading img geoInfo failed.')
-
-
-            image = QImage.fromData(self.imageData)
+            # None without GPS, never the position of the previous image
+            self.geoInfo = geoInfo  #self.geoInfo  = (lat,lon) or (lat,lon, alt)
+            if geoInfo is None:
+                print('no geoInfo in %s' % unicodeFilePath)
+            # Once opened, the web viewer follows the frames while it is shown
+            elif updateWebbrowser and self.webViewer is not None and self.webMapDock.isVisible():
+                imgUrl = self.webMapUrl(self.geoInfo)
+                self.webViewer.load(QUrl(imgUrl))
+                self.urlbar.setText(imgUrl)
+
+
+            if image is None:
+                image = decodeImage(self.imageData or b'')
             if image.isNull():
                 self.errorMessage(u'Error opening file',
                                   u"<p>Make sure <i>%s</i> is a valid image file." % unicodeFilePath)
@@ -1277,7 +1446,7 @@ class MainWindow(QMainWindow, WindowMixin):
             self.status("Loaded %s" % os.path.basename(unicodeFilePath))
             self.image = image
             self.filePath = unicodeFilePath
-            self.canvas.loadPixmap(QPixmap.fromImage(image))
+            self.canvas.loadImage(image)
             if self.labelFile:
                 self.loadLabels(self.labelFile.shapes)
             self.setClean()
@@ -1288,6 +1457,8 @@ class MainWindow(QMainWindow, WindowMixin):
             self.toggleActions(True)
 
             # Label xml file and show bound box according to its filename
+            # An autosave of this image may still be on its way to disk
+            self.saveQueue.flush(unicodeFilePath)
             xmlPath = None
             if self.usingPascalVocFormat is True:
                 if self.defaultSaveDir is not None:
@@ -1306,25 +1477,12 @@ class MainWindow(QMainWindow, WindowMixin):
                         self.loadPascalXMLByFilename(xmlPath)
 
                 #Jchen = 20180316 add image info dock for bound box info
-                #xmlPath = os.path.splitext(filePath)[0] + XML_EXT
-                shapes = self.canvas.shapes
-
-                try:
-
-                    signinfos = self.parseXML(xmlPath)
-                    #print('signinfos:',len(signinfos),'shapes:',len(shapes))
-                    for count in range(len(shapes)):
-                        self.objects[shapes[count]] = signinfos[count]
-                except:
-                    print('load xml file to objects failed')
-
-
-                self.loadImgInfo(shapes)
+                # The sign attributes were read with the boxes in loadLabels
+                self.loadImgInfo(self.canvas.shapes)
 
             # show the distance information
-            if(self.lastGPS != None):
-                self.distTextFt.setText(self.calc_geo_dist(self.lastGPS[0],self.lastGPS[1],self.geoInfo[0],self.geoInfo[1],"feet"))
-                self.distTextMt.setText(self.calc_geo_dist(self.lastGPS[0], self.lastGPS[1], self.geoInfo[0], self.geoInfo[1], "meter"))
+            self.showTrackInfo()
+            self.showFrameOnMap()
             self.setWindowTitle(__appname__ + ' ' + filePath)
 
             # Default : select last item if there is at least one item
@@ -1334,223 +1492,190 @@ class MainWindow(QMainWindow, WindowMixin):
 
             self.canvas.setFocus(True)
 
+            if index is not None:
+                self.prefetcher.prefetch(self.mImgList, index)
+
             return True
         return False
 
+    def subclasses(self):
+        """The SubclassCatalog of data/subclass.txt, read on first use."""
+        if self.subclassCatalog is None:
+            self.subclassCatalog = SubclassCatalog()
+        return self.subclassCatalog
+
     # jchen  = 20180401 add imginfo btnbox funxtions
-    def addImgInfo(self,shape, objectInfo = {}):
+    def newBndWidget(self):
+        """A new row for the image info dock, its signals connected once."""
         bndWidget = BoundingBoxWidget()
+        QComboBoxSub = bndWidget.dropDownBoxs['sub']
+        self.subclasses().bind(QComboBoxSub)
+
+        bndWidget.pasteButton.clicked.connect(partial(self.pasteGeo, bndWidget))
+        bndWidget.pasteAllButton.clicked.connect(partial(self.pasteAll, bndWidget))
+        bndWidget.gotoGeoButton.clicked.connect(partial(self.gotoGeo, bndWidget))
+        bndWidget.nearbyButton.clicked.connect(partial(self.showNearbySigns, bndWidget))
+        QComboBoxSub.currentTextChanged.connect(partial(self.QComboBoxSubChanged, bndWidget))
+        # latlineEdit and longLineEdit text change event connect to same funtion
+        bndWidget.labelLineEdits['lat'].textChanged.connect(partial(self.gpsInfoChanged, bndWidget))
+        bndWidget.labelLineEdits['lon'].textChanged.connect(partial(self.gpsInfoChanged, bndWidget))
+        self.imgInfoLayout.addWidget(bndWidget.boundingBoxInfoLayoutContainer)
+        return bndWidget
+
+    def acquireBndWidget(self, shape):
+        """A row of the dock for shape: a free one from the pool, or a new
+        one when all of them are in use."""
+        if self.bndWidgetPool:
+            bndWidget = self.bndWidgetPool.pop(0)
+            container = bndWidget.boundingBoxInfoLayoutContainer
+            # Rows are shown in the order the shapes were added
+            if self.imgInfoLayout.indexOf(container) != len(self.bndWidgetsToShapes):
+                self.imgInfoLayout.removeWidget(container)
+                self.imgInfoLayout.insertWidget(len(self.bndWidgetsToShapes), container)
+        else:
+            bndWidget = self.newBndWidget()
         self.shapesToBndWidgets[shape] = bndWidget
         self.bndWidgetsToShapes[bndWidget] = shape
-
+        return bndWidget
+
+    def releaseBndWidget(self, bndWidget, hide=True):
+        """Give the row of a shape back to the pool. The rows in use stay
+        first in the layout, a hidden row goes to its end."""
+        shape = self.bndWidgetsToShapes.pop(bndWidget, None)
+        self.shapesToBndWidgets.pop(shape, None)
+        if hide:
+            container = bndWidget.boundingBoxInfoLayoutContainer
+            container.setVisible(False)
+            self.imgInfoLayout.removeWidget(container)
+            self.imgInfoLayout.addWidget(container)
+        bndWidget.setSelected(False)
+        self.bndWidgetPool.append(bndWidget)
+
+    def trimBndWidgetPool(self):
+        """Delete the free rows past SPARE_WIDGETS."""
+        while len(self.bndWidgetPool) > SPARE_WIDGETS:
+            container = self.bndWidgetPool.pop().boundingBoxInfoLayoutContainer
+            self.imgInfoLayout.removeWidget(container)
+            container.deleteLater()
+
+    def addImgInfo(self,shape, objectInfo = None, updateDistance=True):
         #this try catch block make sure when the new shape been create the self.objects[shape] will be initial to dict
-        try:
-            object = self.objects[shape]
-        except:
-            self.objects[shape] = objectInfo
+        if shape not in self.objects:
+            self.objects[shape] = SignRecord(objectInfo)
+        sign = self.objects[shape]
+        bndWidget = self.acquireBndWidget(shape)
 
-        #get current selet
-
-        try:
-            self.imgInfoLayout.addWidget(bndWidget.boundingBoxInfoLayoutContainer)
-        except Exception as e:
-            print(str(e))
-        #bndWidget.setObjectName("BoundingBoxWidget_{}".format(count))
-        try:
-            with open('data/subclass.txt', 'r') as subclass:
-                dropitems = subclass.readlines()
-                for line in dropitems:
-                    line = line.strip()
-                    bndWidget.dropDownBoxs['sub'].addItem(line)
-
-            pasteGeoButton = bndWidget.pasteButton
-            pasteGeoButton.setObjectName('pasteGeo_'+str(self.bndNum))
-            pasteGeoButton.clicked.connect(self.pasteGeo)
-
-            self.pasteGeosToBndWidgets[pasteGeoButton.objectName()] = bndWidget
-
-            pasteAllbutton = bndWidget.pasteAllButton
-            pasteAllbutton.setObjectName('pasteAll_' + str(self.bndNum))
-            pasteAllbutton.clicked.connect(self.pasteAll)
-
-            self.pasteAllsToBndWidgets[pasteAllbutton.objectName()] = bndWidget
-
-            QComboBoxSub = bndWidget.dropDownBoxs['sub']
-            QComboBoxSub.setObjectName('QComboBoxSub_' + str(self.bndNum))
-            try:
-                QComboBoxSub.setCurrentText(self.objects[shape]['subclass'])
-            except:
-                print("load sub class failed in add img info")
-                pass
-            self.QComboBoxSubsToBndWidgets[QComboBoxSub.objectName()] = bndWidget
-
-            # create a completer with the strings in the column as model
-            QComboBoxSub.setEditable(True)
-            allStrings = [QComboBoxSub.itemText(i) for i in range(QComboBoxSub.count())]
-            autoComplete = QCompleter(allStrings)
-            QComboBoxSub.setCompleter(autoComplete)
-
-            #add event function
-            QComboBoxSub.currentTextChanged.connect(self.QComboBoxSubChanged)
-
-            #show the thumbnail
-            thumbnail = self.thumbnail
-            try:
-                pixmap = QPixmap('icons/thumbnails/{}.png'.format(self.objects[shape]['subclass']))
-                pixmap.scaled(64,64, Qt.KeepAspectRatio)
-                thumbnail.setPixmap(pixmap)
-            except:
-                thumbnail.setText('No thumbnail')
-            self.createThumbnail.setVisible(True)
-            self.thumbnail.setVisible(True)
-
-            #add the checkbox checkfunntion
-            # checkBox = bndWidget.checkBox
-            # checkBox.setObjectName('checkBox_' + str(self.bndNum))
-            # self.checkBoxesToBndWidgets[checkBox.objectName()] = bndWidget
-            #
-            # checkBox.stateChanged.connect(self.checkBoxStateChanged)
-
-            #add the goto geo function
-            gotoGeoButton = bndWidget.gotoGeoButton
-            gotoGeoButton.setObjectName('gotoGeoButton_' + str(self.bndNum))
-            gotoGeoButton.clicked.connect(self.gotoGeo)
-
-            self.gotoGeoToBndWidgets[gotoGeoButton.objectName()] = bndWidget
-
-        except Exception as e:
-            print('Exception in addImgInfo:', str(e))
-            print('load class failed')
-
-        # unpdate the bndwidget number
-
-        # partial(self.lineEditChanged, count)
         # Using image geoinfo as bounding box geoinfo.
         try:
-            latText = self.objects[shape]['latitude']
-            longText = self.objects[shape]['longitude']
-
-            bndWidget.labelLineEdits['lat'].setText('{}'.format(float(latText)))
-            bndWidget.labelLineEdits['lon'].setText('{}'.format(float(longText)))
-
-        except Exception as e:
-            #print('exception in loading geo info:',str(e))
-            bndWidget.labelLineEdits['lat'].setText('{}'.format(self.geoInfo[0]))
-            bndWidget.labelLineEdits['lon'].setText('{}'.format(self.geoInfo[1]))
-            print("load Image GeoInfo")
-        except:
-            print('No Geoinfo')
-
-        #set the cursor to the left most position
-        bndWidget.labelLineEdits['lat'].setCursorPosition(0)
-        bndWidget.labelLineEdits['lon'].setCursorPosition(0)
-        try:
-            latLe = bndWidget.labelLineEdits['lat']
-            latLe.setObjectName('latLineEdit_' + str(self.bndNum))
-            self.latLineEditToBndWidgets[latLe.objectName()] = bndWidget
-
-            lonLe = bndWidget.labelLineEdits['lon']
-            lonLe.setObjectName('longLineEdit_' + str(self.bndNum))
-            self.longLineEidtToBndWidgets[lonLe.objectName()] = bndWidget
-
-            latLe.setCursorPosition(0)
-            lonLe.setCursorPosition(0)
-
-
-            # latlineEdit and longLineEdit text change event connect to same funtion
-            latLe.textChanged.connect(lambda: self.gpsInfoChanged(latLe,lonLe))
-            lonLe.textChanged.connect(lambda: self.gpsInfoChanged(latLe,lonLe))
-        except Exception as e:
-            print("add the textChange funtion to lat and long lineEidt failed " + str(e))
-
-
-        self.bndNum += 1
-        # Calculate and show the sign (bndbox) distance from image
+            latText = '{}'.format(float(sign['latitude']))
+            longText = '{}'.format(float(sign['longitude']))
+        except (TypeError, ValueError):
+            if self.geoInfo is not None:
+                latText, longText = '{}'.format(self.geoInfo[0]), '{}'.format(self.geoInfo[1])
+            else:
+                latText = longText = ''
+        bndWidget.setSign(latText, longText, sign['subclass'])
+        bndWidget.boundingBoxInfoLayoutContainer.setVisible(True)
+
+        #show the thumbnail
+        self.loadThumbnail(shape)
+        self.createThumbnail.setVisible(True)
+        self.thumbnail.setVisible(True)
+
+        if updateDistance:
+            self.updateSignDistances([shape])
+
+    def currentTrackPoint(self):
+        """TrackPoint of the current image, None if it is not on the GPS track."""
+        if self.gpsTrack is None or self.filePath is None:
+            return None
+        return self.gpsTrack.frame(self.filePath)
+
+    def showTrackInfo(self):
+        """Show the distance from the previous frame of the GPS track."""
+        point = self.currentTrackPoint()
+        if point is None:
+            self.distTextFt.clear()
+            self.distTextMt.clear()
+            return
+        self.distTextFt.setText('{:.3f}'.format(point.step * geo.METERS_TO_FEET))
+        self.distTextMt.setText('{:.3f}'.format(point.step))
+
+    def updateSignDistances(self, shapes):
+        """Show Xd, Yd and the distance from the camera of the signs of shapes,
+        computed in one go for all of them. Xd and Yd need the heading of
+        the current frame on the GPS track."""
+        if self.geoInfo is None:
+            return
+        point = self.currentTrackPoint()
+        heading = point.heading if point is not None and point.heading is not None else float('nan')
+        located = []
+        for shape in shapes:
+            try:
+                sign = self.objects[shape]
+                located.append((shape, float(sign['latitude']), float(sign['longitude'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        if not located:
+            return
+        _, signLats, signLons = zip(*located)
         try:
-            if(self.lastGPS != None):
-                x0 = self.lastGPS[0]
-                y0 = self.lastGPS[1]
-
-                x1 = self.geoInfo[0]    #image lat
-                y1 = self.geoInfo[1]    #image long
-
-                x2 = float(self.objects[shape]['latitude'])
-                y2 = float(self.objects[shape]['longitude'])
-
-                direction = self.calc_bearing(x0, y0, x1, y1)   # angle A1
-                signAngle = self.calc_bearing(x1,y1,x2,y2)      # angle A2
-                actAngle = abs(direction - signAngle)                # angle A3
-                distance = self.calc_geo_dist(x1, y1, x2, y2,'meter')
-
-                Xd = float(distance) * float(sin(actAngle))
-                Yd = float(distance) * float(cos(actAngle))
-                bndWidget.gpsDistanceNameDict['Xd'].setText(str(Xd))
-                bndWidget.gpsDistanceNameDict['Yd'].setText(str(Yd))
-                bndWidget.gpsDistanceNameDict['Dist'].setText(distance)
-                bndWidget.gpsDistanceNameDict['Xd'].setCursorPosition(0)
-                bndWidget.gpsDistanceNameDict['Yd'].setCursorPosition(0)
-                bndWidget.gpsDistanceNameDict['Dist'].setCursorPosition(0)
-        except Exception as e:
-            print("Load the distance failed: "+str(e))
-        #bndWidget.numberOfBoundingBoxs.setText(str(count + 1))
-
+            xds, yds, distances = geo.signOffsets(heading, self.geoInfo[0], self.geoInfo[1], signLats, signLons)
+        except (TypeError, ValueError) as e:
+            print("Load the distance failed: " + str(e))
+            return
+        for (shape, _, _), xd, yd, distance in zip(located, xds, yds, distances):
+            fields = self.shapesToBndWidgets[shape].gpsDistanceNameDict
+            fields['Xd'].setText('' if isnan(xd) else str(float(xd)))
+            fields['Yd'].setText('' if isnan(yd) else str(float(yd)))
+            fields['Dist'].setText('{:.3f}'.format(distance))
+            for name in ('Xd', 'Yd', 'Dist'):
+                fields[name].setCursorPosition(0)
 
     def remImgInfo(self,shape):
         if shape is None:
             return
-        bndBoxWidget = self.shapesToBndWidgets[shape]
-        bndBoxWidget.boundingBoxInfoLayoutContainer.setVisible(False)
-        self.imgInfoLayout.removeWidget(bndBoxWidget.boundingBoxInfoLayoutContainer)
+        self.releaseBndWidget(self.shapesToBndWidgets[shape])
         del self.objects[shape]
-        del self.shapesToBndWidgets[shape]
-        del self.bndWidgetsToShapes[bndBoxWidget]
+
+    def releaseImgInfo(self, hide=True):
+        """Give the rows of all the shapes back to the pool, first in the
+        order they are shown so the next image takes the same rows."""
+        inUse = list(self.bndWidgetsToShapes)
+        spare = self.bndWidgetPool
+        self.bndWidgetPool = []
+        for bndWidget in inUse:
+            self.releaseBndWidget(bndWidget, hide=False)
+            if hide:
+                bndWidget.boundingBoxInfoLayoutContainer.setVisible(False)
+        self.bndWidgetPool.extend(spare)
 
     # jchen = 20180329 add
     def loadImgInfo(self, shapes):
         # add the imageinfomation to imginfodock
-        self.imgInfoLayout = QVBoxLayout()
-        self.imgInfoLayout.setContentsMargins(0, 0, 0, 0)
-        self.imgInfoLayout.setAlignment(Qt.AlignLeft | Qt.AlignTop)
-
-        self.hLayout = QVBoxLayout()
-        self.hLayout.setAlignment(Qt.AlignTop)
-        self.hLayout.addWidget(self.createThumbnail)
-        self.hLayout.addWidget(self.thumbnail)
+        # The rows of the previous image are reused in place, only the ones
+        # left over are hidden.
+        self.setupImgInfoDock()
+        self.releaseImgInfo(hide=False)
+        # An edited subclass list shows up with the next image; no row is
+        # bound to a shape while the shared model resets.
+        self.subclasses().reload()
         self.thumbnail.setVisible(False)
         self.createThumbnail.setVisible(False)
-        self.wholeImgInfoLayout = QHBoxLayout()
-        self.wholeImgInfoLayout.addLayout(self.imgInfoLayout)
-        self.wholeImgInfoLayout.addLayout(self.hLayout)
-        self.wholeImgInfoLayout.setAlignment(Qt.AlignTop)
-        imgInfoListContainer = QWidget()
-        imgInfoListContainer.setLayout(self.wholeImgInfoLayout)
-
-        # jchen 0328 add Scroll function
-        imgInfoScroll = QScrollArea()
-        imgInfoScroll.setWidget(imgInfoListContainer)
-        imgInfoScroll.setWidgetResizable(True)
-        self.imgInfoScrollBars = {
-            Qt.Vertical: imgInfoScroll.verticalScrollBar()
-        }
-        self.imgInfoScrollArea = imgInfoScroll
-        self.imgInfodock.setWidget(self.imgInfoScrollArea)
-        # self.imgInfo.clear()
-        #self.imgXmlInfos = []
 
         # add the boundingBoxWidget children
-        self.bndNum = 0 # count is len()
         for shape in shapes:
-            self.addImgInfo(shape)
+            self.addImgInfo(shape, updateDistance=False)
+        for bndWidget in self.bndWidgetPool:
+            bndWidget.boundingBoxInfoLayoutContainer.setVisible(False)
+        self.trimBndWidgetPool()
+        self.updateSignDistances(shapes)
 
 
-    def pasteGeo(self):
+    def pasteGeo(self, bndBoxWidget, _value=False):
         clipboardText = QApplication.clipboard().text()
-        pasteGeoName = self.sender().objectName()
-
-        try:
-            bndBoxWidget = self.pasteGeosToBndWidgets[pasteGeoName]
-            shape = self.bndWidgetsToShapes[bndBoxWidget]
-        except:
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
             return
         try:
             clipboardText = json.loads(clipboardText)
@@ -1564,14 +1689,10 @@ class MainWindow(QMainWindow, WindowMixin):
             print('Exception in pasteGeo:',str(e),'\n',clipboardText)
             pass
 
-    def pasteAll(self):
+    def pasteAll(self, bndBoxWidget, _value=False):
         clipboardText = QApplication.clipboard().text()
-        pasteAllName = self.sender().objectName()
-        try:
-            bndBoxWidget = self.pasteAllsToBndWidgets[pasteAllName]
-            shape = self.bndWidgetsToShapes[bndBoxWidget]
-            #print(shape)
-        except:
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
             return
         try:
             clipboardText = json.loads(clipboardText)
@@ -1580,27 +1701,9 @@ class MainWindow(QMainWindow, WindowMixin):
             # print('imgXmlInfos name:', self.imgXmlInfos[bndCount].objectName())
             bndBoxWidget.labelLineEdits['lat'].setText('{:.7f}'.format(clipboardText['latitude']))
             bndBoxWidget.labelLineEdits['lon'].setText('{:.7f}'.format(clipboardText['longitude']))
-            self.objects[shape]['subclass'] = clipboardText['MUTCDCode']
-            self.objects[shape]['SignMainGeneralOID'] = clipboardText['SignMainGeneralOID']
-            self.objects[shape]['ID'] = clipboardText['ID']
-            self.objects[shape]['LaneDirection'] = clipboardText['LaneDirection']
-            self.objects[shape]['Marker'] = clipboardText['Marker']
-            self.objects[shape]['City'] = clipboardText['City']
-            self.objects[shape]['County'] = clipboardText['County']
-            self.objects[shape]['District'] = clipboardText['District']
-            self.objects[shape]['STREETNAME'] = clipboardText['STREETNAME']
-            self.objects[shape]['MUTCDCode'] = clipboardText['MUTCDCode']
-            self.objects[shape]['Retired'] = clipboardText['Retired']
-            self.objects[shape]['Replaced'] = clipboardText['Replaced']
-            self.objects[shape]['SignAge'] = clipboardText['SignAge']
-            self.objects[shape]['TWN_TID'] = clipboardText['TWN_TID']
-            self.objects[shape]['TWN_MI'] = clipboardText['TWN_MI']
-            self.objects[shape]['QCFLAG'] = clipboardText['QCFLAG']
-            self.objects[shape]['MIN_TWN_FMI'] = clipboardText['MIN_TWN_FMI']
-            self.objects[shape]['MAX_TWN_TMI'] = clipboardText['MAX_TWN_TMI']
-            self.objects[shape]['SR_SID'] = clipboardText['SR_SID']
-            self.objects[shape]['OFFSET'] = clipboardText['OFFSET']
-            self.objects[shape]['PublishDate'] = clipboardText['PublishDate']
+            self.objects[shape].update(clipboardText)
+            code = clipboardText['MUTCDCode']
+            self.objects[shape]['subclass'] = self.subclasses().lookup(code) or code
             #print(self.objects[shape])
             self.setDirty()
         except Exception as e:
@@ -1611,74 +1714,128 @@ class MainWindow(QMainWindow, WindowMixin):
         except:
             print('subclass show failed')
 
-    def gotoGeo(self):
-        gotoGeoName = self.sender().objectName()
+    def openSignInventory(self):
+        """The local sign inventory, None until one was imported."""
+        if self.signInventory is None and os.path.isfile(SignInventory.defaultPath()):
+            try:
+                self.signInventory = SignInventory(SignInventory.defaultPath())
+            except sqlite3.Error as e:
+                print('open sign inventory failed: %s' % e)
+        return self.signInventory
+
+    def loadSignInventoryDialog(self, _value=False):
+        """Replace the local sign inventory by a CSV or GeoJSON export."""
+        path = os.path.dirname(self.filePath) if self.filePath else '.'
+        filters = 'Sign inventory (*.csv *.geojson *.json)'
+        filename = QFileDialog.getOpenFileName(self, '%s - Choose a sign inventory export' % __appname__,
+                                               path, filters)
+        if isinstance(filename, (tuple, list)):
+            filename = filename[0]
+        filename = ustr(filename)
+        if not filename:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            bndBoxWidget = self.gotoGeoToBndWidgets[gotoGeoName]
-            shape = self.bndWidgetsToShapes[bndBoxWidget]
-        except:
-            print('find goto geo and shap failed')
+            inventory = SignInventory(SignInventory.defaultPath())
+            count = inventory.importFile(filename)
+        except (IOError, OSError, ValueError, sqlite3.Error) as e:
+            QApplication.restoreOverrideCursor()
+            self.errorMessage(u'Error importing sign inventory', u'<b>%s</b>' % e)
+            return
+        QApplication.restoreOverrideCursor()
+        self.signInventory = inventory
+        self.status('%d signs imported from %s' % (count, filename))
+
+    def showNearbySigns(self, bndBoxWidget):
+        """Offer the inventory signs around the camera, nearest ones ahead
+        first; picking one fills every attribute of the box."""
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
+            return
+        inventory = self.openSignInventory()
+        if inventory is None:
+            self.status('No sign inventory, import one with File > Load Sign Inventory')
+            return
+        if self.geoInfo is None:
+            self.status('The image has no GPS position')
+            return
+        point = self.currentTrackPoint()
+        heading = point.heading if point is not None else None
+        candidates = inventory.near(self.geoInfo[0], self.geoInfo[1], SEARCH_RADIUS, heading, limit=20)
+        if not candidates:
+            self.status('No inventory sign within %d m' % SEARCH_RADIUS)
+            return
+        menu = QMenu(self)
+        for candidate in candidates:
+            record = candidate.record
+            side = ''
+            if candidate.offAxis is not None:
+                side = ' ahead' if abs(candidate.offAxis) <= pi / 2 else ' behind'
+            text = u'%s  %.1f m%s  %s (%s)' % (record['MUTCDCode'] or '?', candidate.distance, side,
+                                              record['STREETNAME'], record['SignMainGeneralOID'])
+            menu.addAction(text).triggered.connect(partial(self.fillSignFromInventory, shape, record))
+        button = bndBoxWidget.nearbyButton
+        menu.exec_(button.mapToGlobal(QPoint(0, button.height())))
+
+    def fillSignFromInventory(self, shape, record, _value=False):
+        """Take every attribute of an inventory sign, the class of the box
+        is kept and the subclass is its MUTCD code."""
+        bndBoxWidget = self.shapesToBndWidgets.get(shape)
+        if bndBoxWidget is None:
+            return
+        sign = self.objects[shape]
+        for name, value in record.items():
+            if name not in ('superclass', 'subclass'):
+                sign[name] = value
+        if record['MUTCDCode']:
+            sign['subclass'] = self.subclasses().lookup(record['MUTCDCode']) or record['MUTCDCode']
+        bndBoxWidget.labelLineEdits['lat'].setText('{:.7f}'.format(sign['latitude']))
+        bndBoxWidget.labelLineEdits['lon'].setText('{:.7f}'.format(sign['longitude']))
+        bndBoxWidget.dropDownBoxs['sub'].setCurrentText(sign['subclass'])
+        self.updateSignDistances([shape])
+        self.showFrameOnMap()
+        self.setDirty()
+
+    def gotoGeo(self, bndBoxWidget, _value=False):
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
             return
 
         try:
-            lat = self.objects[shape]['latitude']
-            long = self.objects[shape]['longitude']
-            imgUrl = 'https://vtrans.github.io/signs-data-viewer/?lon={}&lat={}&zoomLevel=18'.format(float(long),float(lat))
-            self.webViewer.load(QUrl(imgUrl))
-            self.urlbar.setText(imgUrl)
+            lat = float(self.objects[shape]['latitude'])
+            long = float(self.objects[shape]['longitude'])
+            self.mapWidget.centerOn(lat, long)
+            self.webDock.raise_()
+            if self.webViewer is not None and self.webMapDock.isVisible():
+                self.showWebMap(self.webMapUrl((lat, long)))
         except Exception as e:
             print('Exception in gotoGeo:',str(e))
             print('gotoGeo failed')
 
     # jchen 20180428 add the update function for change the line edit of gps information
-    def gpsInfoChanged(self,lat = None,long = None):
-        if(lat == None or long == None):
-            print("in gpsInfoChanged and lat long is none")
-            return
-        try:
-            bndBoxWidget = self.latLineEditToBndWidgets[lat.objectName()]
-            shape = self.bndWidgetsToShapes[bndBoxWidget]
-        except:
-            print('find lat lineEidt and shape failed')
+    def gpsInfoChanged(self, bndBoxWidget, _text=None):
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
             return
+        lat, long = bndBoxWidget.labelLineEdits['lat'], bndBoxWidget.labelLineEdits['lon']
 
+        # Keep what was typed, the distances and the saved file use it
         try:
-            if (self.lastGPS != None):
-                x0 = self.lastGPS[0]
-                y0 = self.lastGPS[1]
-
-                x1 = self.geoInfo[0]  # image lat
-                y1 = self.geoInfo[1]  # image long
-
-                x2 = float(self.objects[shape]['latitude'])
-                y2 = float(self.objects[shape]['longitude'])
-
-                direction = self.calc_bearing(x0, y0, x1, y1)  # angle A1
-                signAngle = self.calc_bearing(x1, y1, x2, y2)  # angle A2
-                actAngle = abs(direction - signAngle)  # angle A3
-                distance = self.calc_geo_dist(x1, y1, x2, y2, 'meter')
-                
-
-                Xd = float(distance) * float(sin(actAngle))
-                Yd = float(distance) * float(cos(actAngle))
-                bndWidget.gpsDistanceNameDict['Xd'].setText(str(Xd))
-                bndWidget.gpsDistanceNameDict['Yd'].setText(str(Yd))
-                bndWidget.gpsDistanceNameDict['Dist'].setText(distance)
-                bndWidget.gpsDistanceNameDict['Xd'].setCursorPosition(0)
-                bndWidget.gpsDistanceNameDict['Yd'].setCursorPosition(0)
-                bndWidget.gpsDistanceNameDict['Dist'].setCursorPosition(0)
-            
-        except Exception as e:
-            print("update the distance failed: "+str(e))
+            latitude, longitude = float(lat.text()), float(long.text())
+        except ValueError:
+            # Not a number (yet), e.g. while typing a minus sign
+            return
+        sign = self.objects[shape]
+        if (sign['latitude'], sign['longitude']) != (latitude, longitude):
+            sign['latitude'], sign['longitude'] = latitude, longitude
+            self.setDirty()
+            self.showFrameOnMap()
+        self.updateSignDistances([shape])
 
     #jchen = 20180402 new
-    def QComboBoxSubChanged(self):
-        QComboBoxSubName = self.sender().objectName()
-        #print('in QComboBoxSubChanged')
-        try:
-            bndBoxWidget = self.QComboBoxSubsToBndWidgets[QComboBoxSubName]
-            shape = self.bndWidgetsToShapes[bndBoxWidget]
-        except:
+    def QComboBoxSubChanged(self, bndBoxWidget, _text=None):
+        shape = self.bndWidgetsToShapes.get(bndBoxWidget)
+        if shape is None:
             return
         try:
             subclassText = bndBoxWidget.dropDownBoxs['sub'].currentText()
@@ -1690,187 +1847,25 @@ class MainWindow(QMainWindow, WindowMixin):
         except Exception as e:
             print('Exception in QComboBoxSubChanged:',str(e))
 
-    def loadThumbnail(self,shape):
-        try:
-            pixmap = QPixmap('icons/thumbnails/{}.png'.format(self.objects[shape]['subclass']))
-            pixmap.scaled(64, 64, Qt.KeepAspectRatio)
-            self.thumbnail.setPixmap(pixmap)
-        except:
-            self.thumbnail.setText('No thumbnail')
-
-    def calc_bearing(self,lat1, lon1, lat2, lon2):
-        # approximate radius of earth in km
-        R = 6373.0
-
-        lat1 = radians(float(lat1))
-        lon1 = radians(float(lon1))
-        lat2 = radians(float(lat2))
-        lon2 = radians(float(lon2))
-
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-
-        by = sin(dlon) * cos(lat2)
-        bx = cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dlon)
-
-        bearing = atan2(by, bx)
-
-        return bearing
-
-    def calc_geo_dist(self,lat1, lon1, lat2, lon2, unit = "meter"):
-        # approximate radius of earth in km
-        R = 6373.0
-
-        lat1 = radians(float(lat1))
-        lon1 = radians(float(lon1))
-        lat2 = radians(float(lat2))
-        lon2 = radians(float(lon2))
-
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-        distance = R * c
+    def thumbnails(self):
+        """The ThumbnailCache of the subclass previews, made on first use."""
+        if self.thumbnailCache is None:
+            self.thumbnailCache = ThumbnailCache(parent=self)
+            self.thumbnailCache.changed.connect(self.thumbnailsChanged)
+        return self.thumbnailCache
 
-        if(unit == "feet"):
-            return ("{:.3f}".format(distance * 1000 * 3.2808))
-        if (unit == "meter"):
-            return ("{:.3f}".format(distance * 1000 ))
-        return None
-
-    def parseXML(self, filepath):
-        assert filepath.endswith(XML_EXT), "Unsupport file format"
-        parser = etree.XMLParser(encoding=ENCODE_METHOD)
-        xmltree = ElementTree.parse(filepath, parser=parser).getroot()
-
-        signInfos = []
-        for object_iter in xmltree.findall('object'):
-            signInfo = {}
-            try:
-                location = object_iter.find("location")
-                latitude = location.find('latitude').text
-                signInfo['latitude'] = latitude
-                longitude = location.find('longitude').text
-                signInfo['longitude'] = longitude
-                altitude = location.find('altitude').text
-                signInfo['altitude'] = altitude
-            except Exception as e:
-                print('Exception in parseXml:',str(e))
+    def thumbnailsChanged(self, names):
+        shape = self.canvas.selectedShape
+        if shape in self.objects and self.objects[shape]['subclass'] in names:
+            self.loadThumbnail(shape)
 
-            try:
-                superclass = object_iter.find('superclass').text
-                signInfo['superclass'] = superclass
-            except:
-                print('Exception in parseXml superclass')
-            try:
-                subclass = object_iter.find('subclass').text
-                signInfo['subclass'] = subclass
-            except:
-                print('Exception in parseXml subclass')
-            try:
-                SignMainGeneralOID = object_iter.find('SignMainGeneralOID').text
-                signInfo['SignMainGeneralOID'] = SignMainGeneralOID
-            except:
-                print('Exception in parseXml SignMainGeneralOID')
-            try:
-                ID = object_iter.find('ID').text
-                signInfo['ID'] = ID
-            except:
-                print('Exception in parseXml ID')
-            try:
-                LaneDirection = object_iter.find('LaneDirection').text
-                signInfo['LaneDirection'] = LaneDirection
-            except:
-                print('Exception in parseXml LaneDirection')
-            try:
-                Marker = object_iter.find('Marker').text
-                signInfo['Marker'] = Marker
-            except:
-                print('Exception in parseXml Marker')
-            try:
-                City = object_iter.find('City').text
-                signInfo['City'] = City
-            except:
-                print('Exception in parseXml City')
-            try:
-                County = object_iter.find('County').text
-                signInfo['County'] = County
-            except:
-                print('Exception in parseXml County')
-            try:
-                District = object_iter.find('District').text
-                signInfo['District'] = District
-            except:
-                print('Exception in parseXml District')
-            try:
-                STREETNAME = object_iter.find('STREETNAME').text
-                signInfo['STREETNAME'] = STREETNAME
-            except:
-                print('Exception in parseXml STREETNAME')
-            try:
-                MUTCDCode = object_iter.find('MUTCDCode').text
-                signInfo['MUTCDCode'] = MUTCDCode
-            except:
-                print('Exception in parseXml MUTCDCode')
-            try:
-                Retired = object_iter.find('Retired').text
-                signInfo['Retired'] = Retired
-            except:
-                print('Exception in parseXml Retired')
-            try:
-                Replaced = object_iter.find('Replaced').text
-                signInfo['Replaced'] = Replaced
-            except:
-                print('Exception in parseXml Replaced')
-            try:
-                SignAge = object_iter.find('SignAge').text
-                signInfo['SignAge'] = SignAge
-            except:
-                print('Exception in parseXml SignAge')
-            try:
-                TWN_TID = object_iter.find('TWN_TID').text
-                signInfo['TWN_TID'] = TWN_TID
-            except:
-                print('Exception in parseXml TWN_TID')
-            try:
-                TWN_MI = object_iter.find('TWN_MI').text
-                signInfo['TWN_MI'] = TWN_MI
-            except:
-                print('Exception in parseXml TWN_MI')
-            try:
-                QCFLAG = object_iter.find('QCFLAG').text
-                signInfo['QCFLAG'] = QCFLAG
-            except:
-                print('Exception in parseXml QCFLAG')
-            try:
-                MIN_TWN_FMI = object_iter.find('MIN_TWN_FMI').text
-                signInfo['MIN_TWN_FMI'] = MIN_TWN_FMI
-            except:
-                print('Exception in parseXml MIN_TWN_FMI')
-            try:
-                MAX_TWN_TMI = object_iter.find('MAX_TWN_TMI').text
-                signInfo['MAX_TWN_TMI'] = MAX_TWN_TMI
-            except:
-                print('Exception in parseXml MAX_TWN_TMI')
-            try:
-                SR_SID = object_iter.find('SR_SID').text
-                signInfo['SR_SID'] = SR_SID
-            except:
-                print('Exception in parseXml SR_SID')
-            try:
-                OFFSET = object_iter.find('OFFSET').text
-                signInfo['OFFSET'] = OFFSET
-            except:
-                print('Exception in parseXml OFFSET')
-            try:
-                PublishDate = object_iter.find('PublishDate').text
-                signInfo['PublishDate'] = PublishDate
-            except:
-                print('Exception in parseXml PublishDate')
-            signInfos.append(signInfo)
-        return signInfos
+    def loadThumbnail(self,shape):
+        sign = self.objects.get(shape)
+        pixmap = self.thumbnails().pixmap(sign['subclass'] or '') if sign is not None else None
+        if pixmap is None:
+            self.thumbnail.setText('No thumbnail')
+        else:
+            self.thumbnail.setPixmap(pixmap)
 
     def resizeEvent(self, event):
         if self.canvas and not self.image.isNull()\
@@ -1937,9 +1932,19 @@ class MainWindow(QMainWindow, WindowMixin):
 
         settings[SETTING_AUTO_SAVE] = self.autoSaving.isChecked()
         settings[SETTING_SINGLE_CLASS] = self.singleClassMode.isChecked()
+        settings[SETTING_MAP_DATA_DIR] = self.mapWidget.dataDir or ''
         #save setting
 
         settings.save()
+        if event.isAccepted():
+            # Write whatever autosave still has queued
+            self.saveQueue.stop()
+            self.prefetcher.shutdown()
+            self.stopDirScan()
+            self.stopGeoIndex()
+            # The next session reads the previews from the atlas
+            if self.thumbnailCache is not None and not self.thumbnailCache.atlasIsCurrent():
+                self.thumbnailCache.saveAtlas()
     ## User Dialogs ##
 
     def loadRecent(self, filename):
@@ -1947,17 +1952,7 @@ class MainWindow(QMainWindow, WindowMixin):
             self.loadFile(filename)
 
     def scanAllImages(self, folderPath):
-        extensions = ['.jpeg', '.jpg', '.png', '.bmp']
-        images = []
-
-        for root, dirs, files in os.walk(folderPath):
-            for file in files:
-                if file.lower().endswith(tuple(extensions)):
-                    relativePath = os.path.join(root, file)
-                    path = ustr(os.path.abspath(relativePath))
-                    images.append(path)
-        images.sort(key=lambda x: x.lower())
-        return images
+        return list(scanImages(folderPath))
 
     def changeSavedirDialog(self, _value=False):
         if self.defaultSaveDir is not None:
@@ -1971,6 +1966,7 @@ class MainWindow(QMainWindow, WindowMixin):
 
         if dirpath is not None and len(dirpath) > 1:
             self.defaultSaveDir = dirpath
+            self.fileListModel.invalidateStatus()
 
         self.statusBar().showMessage('%s . Annotation will be saved to %s' %
                                      ('Change saved folder', self.defaultSaveDir))
@@ -2011,15 +2007,90 @@ class MainWindow(QMainWindow, WindowMixin):
         if not self.mayContinue() or not dirpath:
             return
 
+        self.stopDirScan()
+        self.stopGeoIndex()
         self.lastOpenDir = dirpath
         self.dirname = dirpath
         self.filePath = None
-        self.fileListWidget.clear()
-        self.mImgList = self.scanAllImages(dirpath)
-        self.openNextImg()
-        for imgPath in self.mImgList:
-            item = QListWidgetItem(imgPath)
-            self.fileListWidget.addItem(item)
+        self.fileListModel.clear()
+        # Scan on a worker thread, the list fills in as batches arrive
+        self.dirScanner = DirScanner(dirpath, self)
+        self.dirScanner.batchFound.connect(self.dirScanBatchFound)
+        self.dirScanner.scanned.connect(self.dirScanFinished)
+        self.stopScanButton.setVisible(True)
+        self.status('Scanning %s ...' % dirpath, 0)
+        self.dirScanner.start()
+
+    def dirScanBatchFound(self, paths):
+        if self.sender() is not self.dirScanner:
+            return  # batch of a cancelled scan
+        openFirst = not self.mImgList and self.filePath is None
+        self.fileListModel.extend(paths)
+        self.status('Scanning %s: %d images found' % (self.dirname, len(self.mImgList)), 0)
+        if openFirst:
+            self.openNextImg()
+
+    def dirScanFinished(self, total, cancelled):
+        if self.sender() is not self.dirScanner:
+            return
+        dirpath = self.dirScanner.folderPath
+        self.stopScanButton.setVisible(False)
+        self.dirScanner = None
+        self.status('Found %d images in %s' % (total, dirpath))
+        self.startGeoIndex(dirpath)
+
+    def stopDirScan(self):
+        if self.dirScanner is not None:
+            scanner = self.dirScanner
+            scanner.cancel()
+            scanner.wait()
+            # Queued signals of the stopped scanner are ignored from now on
+            self.dirScanner = None
+            self.stopScanButton.setVisible(False)
+            self.status('Scan of %s stopped, %d images found' % (scanner.folderPath, len(self.mImgList)))
+
+    def startGeoIndex(self, dirpath):
+        """Bring the GPS index of dirpath up to date in the background."""
+        self.stopGeoIndex()
+        self.gpsTrack = None
+        indexPath = GeoIndex.defaultIndexPath(dirpath, self.defaultSaveDir)
+        if indexPath is None:
+            self.geoIndex = None
+            return
+        try:
+            self.geoIndex = GeoIndex(dirpath, indexPath)
+        except Exception as e:
+            print('open geo index %s failed: %s' % (indexPath, e))
+            self.geoIndex = None
+            return
+        self.geoIndexWorker = GeoIndexWorker(self.geoIndex, self.mImgList, self)
+        self.geoIndexWorker.progress.connect(
+            lambda done, total: self.status('Indexing GPS info %d/%d' % (done, total)))
+        self.geoIndexWorker.indexed.connect(
+            lambda changed: self.status('GPS index up to date (%d images read)' % changed))
+        self.geoIndexWorker.indexed.connect(self.loadGpsTrack)
+        self.geoIndexWorker.start(QThread.LowPriority)
+
+    def loadGpsTrack(self, _changed=None):
+        """Build the GPS track of the folder from its up to date geo index."""
+        if self.geoIndex is None:
+            return
+        try:
+            self.gpsTrack = GpsTrack.fromGeoIndex(self.geoIndex, self.mImgList)
+        except Exception as e:
+            print('building the GPS track failed: %s' % e)
+            self.gpsTrack = None
+            return
+        self.mapWidget.setTrack(self.gpsTrack.latitudes, self.gpsTrack.longitudes)
+        self.showTrackInfo()
+        self.updateSignDistances(self.canvas.shapes)
+        self.showFrameOnMap()
+
+    def stopGeoIndex(self):
+        if self.geoIndexWorker is not None:
+            self.geoIndexWorker.cancel()
+            self.geoIndexWorker.wait()
+            self.geoIndexWorker = None
 
     def verifyImg(self, _value=False):
         # Proceding next image without dialog if having any label
@@ -2056,11 +2127,7 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.filePath is None:
             return
 
-        if (self.geoInfo != None and len(self.geoInfo) > 1):
-            self.lastGPS = [self.geoInfo[0], self.geoInfo[1]]
-            #print("last GPS: lat =  {}, long = {}".format(self.lastGPS[0], self.lastGPS[1]))
-
-        currIndex = self.mImgList.index(self.filePath)
+        currIndex = self.fileListModel.indexOf(self.filePath)
         if currIndex - 1 >= 0:
             filename = self.mImgList[currIndex - 1]
             if filename:
@@ -2086,14 +2153,10 @@ class MainWindow(QMainWindow, WindowMixin):
         if self.filePath is None:
             filename = self.mImgList[0]
         else:
-            currIndex = self.mImgList.index(self.filePath)
+            currIndex = self.fileListModel.indexOf(self.filePath)
             if currIndex + 1 < len(self.mImgList):
                 filename = self.mImgList[currIndex + 1]
 
-        if(self.geoInfo != None and len (self.geoInfo) > 1):
-            self.lastGPS = [self.geoInfo[0],self.geoInfo[1]]
-            #print("last GPS: lat =  {}, long = {}".format(self.lastGPS[0],self.lastGPS[1]))
-
         if filename:
             self.loadFile(filename)
 
@@ -2149,7 +2212,7 @@ class MainWindow(QMainWindow, WindowMixin):
     def _saveFile(self, annotationFilePath):
         if annotationFilePath and self.saveLabels(annotationFilePath):
             self.setClean()
-            self.statusBar().showMessage('Saved to  %s' % annotationFilePath)
+            self.statusBar().showMessage('Saving to  %s' % annotationFilePath)
             self.statusBar().show()
 
     def closeFile(self, _value=False):
@@ -2240,10 +2303,18 @@ class MainWindow(QMainWindow, WindowMixin):
     def loadPascalXMLByFilename(self, xmlPath):
         if self.filePath is None:
             return
+        self.saveQueue.flush(xmlPath)
         if os.path.isfile(xmlPath) is False:
             return
 
         tVocParseReader = PascalVocReader(xmlPath)
+        for error in tVocParseReader.errors:
+            print(error)
+        if tVocParseReader.errors and not tVocParseReader.shapes:
+            self.errorMessage(u'Error reading annotation',
+                              u'<p>%s</p>' % u'<br/>'.join(tVocParseReader.errors))
+        elif tVocParseReader.errors:
+            self.status(u'%d objects of %s could not be read' % (len(tVocParseReader.errors), xmlPath))
         shapes = tVocParseReader.getShapes()
         self.loadLabels(shapes)
         self.canvas.verified = tVocParseReader.verified
@@ -2280,14 +2351,29 @@ def read(filename, default=None):
 
 
 
+def shareOpenGLContexts():
+    """QtWebEngine, imported on first use by showWebMap(), only loads when
+    this is set before the QApplication is created."""
+    if hasattr(Qt, 'AA_ShareOpenGLContexts'):
+        QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+
+
 def get_main_app(argv=[]):
     """
     Standard boilerplate Qt application code.
     Do everything but app.exec_() -- so that we can test the application in one thread
     """
-    app = QApplication(argv)
+    # --profile-startup prints the time spent in each phase of startup
+    # once the window is up.
+    argv, profile = popProfileFlag(argv)
+    # The tests run several windows in one application
+    app = QApplication.instance()
+    if app is None:
+        shareOpenGLContexts()
+        app = QApplication(argv)
     app.setApplicationName(__appname__)
     app.setWindowIcon(newIcon("app"))
+    startupProfile.mark('QApplication')
     # Tzutalin 201705+: Accept extra agruments to change predefined class file
     # Usage : labelImg.py image predefClassFile
     win = MainWindow(argv[1] if len(argv) >= 2 else None,
@@ -2295,6 +2381,12 @@ def get_main_app(argv=[]):
                          os.path.dirname(sys.argv[0]),
                          'data', 'predefined_classes.txt'))
     win.show()
+    startupProfile.mark('show')
+    if profile:
+        def reportStartup():
+            startupProfile.mark('first events')
+            startupProfile.report()
+        QTimer.singleShot(0, reportStartup)
     return app, win
 
 
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Headless batch tasks over a tree of PASCAL VOC annotations.
+
+    labelImgBatch validate xmls/
+    labelImgBatch fill-location xmls/ --images photos/
+    labelImgBatch truncated xmls/ --dry-run
+    labelImgBatch refresh-inventory xmls/ --inventory signs.csv --report changes.csv
+    labelImgBatch thumbnails xmls/ --images photos/
+    labelImgBatch chips xmls/ --images photos/ --out chips/ --format npy
+
+No Qt is loaded; files are processed by a pool of worker processes.
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from functools import partial
+from multiprocessing import Pool, cpu_count
+
+from libs.batchTasks import REFRESH_FIELDS, TaskResult, bestThumbnailCrops, findAnnotations, findCrops, runTask, \
+    writeThumbnails
+from libs.chipExport import FORMATS, ChipWriter, cutChips
+from libs.pascal_voc_io import SIGN_FIELDS
+from libs.signInventory import SignInventory
+
+# Files handed to a worker at once
+CHUNK_SIZE = 32
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+SIGN_FIELD_NAMES = [field.name for field in SIGN_FIELDS]
+# The subclass previews the window shows
+THUMBNAIL_DIR = os.path.join('icons', 'thumbnails')
+
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(prog='labelImgBatch', description=__doc__.strip().split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+
+    def addCommand(name, helpText):
+        command = commands.add_parser(name, help=helpText)
+        command.add_argument('paths', nargs='+', help='XML files or directories to walk')
+        command.add_argument('-j', '--jobs', type=int, default=cpu_count(),
+                             help='worker processes (default: %(default)s)')
+        return command
+
+    command = addCommand('validate', 'check that annotations are well formed')
+    command.add_argument('--images', help='directory holding the images')
+    command.add_argument('--check-images', action='store_true', help='report annotations without an image')
+
+    command = addCommand('fill-location', 'fill the image-level Location from the image EXIF')
+    command.add_argument('--images', help='directory holding the images')
+    command.add_argument('--overwrite', action='store_true', help='replace an existing Location')
+    command.add_argument('--dry-run', action='store_true', help='report only, write nothing')
+
+    command = addCommand('truncated', 'recompute <truncated> from the boxes and image size')
+    command.add_argument('--dry-run', action='store_true', help='report only, write nothing')
+
+    command = addCommand('refresh-inventory', 'update sign attributes from an inventory snapshot')
+    command.add_argument('--inventory', required=True,
+                         help='inventory export (CSV or GeoJSON) or a sign inventory database')
+    command.add_argument('--fields',
+                         help='comma separated attributes to refresh, each must be in the inventory '
+                              '(default: those of %s the inventory has)' % ','.join(REFRESH_FIELDS))
+    command.add_argument('--report', help='write every change to this CSV file')
+    command.add_argument('--dry-run', action='store_true', help='report only, write nothing')
+
+    command = addCommand('thumbnails', 'save a subclass preview from the best box of every subclass')
+    command.add_argument('--images', help='directory holding the images')
+    command.add_argument('--out', default=THUMBNAIL_DIR, help='preview directory (default: %(default)s)')
+    command.add_argument('--size', type=int, default=200,
+                         help='longest side of the previews in pixels (default: %(default)s)')
+    command.add_argument('--overwrite', action='store_true', help='replace the previews there already are')
+    command.add_argument('--dry-run', action='store_true', help='report only, write nothing')
+
+    command = addCommand('chips', 'export the boxes as training chips labeled by subclass')
+    command.add_argument('--images', help='directory holding the images')
+    command.add_argument('--out', required=True, help='directory of the shards, an export there is continued')
+    command.add_argument('--format', choices=FORMATS, default='tar',
+                         help='WebDataset tar files or NumPy arrays (default: %(default)s)')
+    command.add_argument('--size', type=int, default=64, help='side of the chips in pixels (default: %(default)s)')
+    command.add_argument('--padding', type=float, default=0.1,
+                         help='context around the box, a fraction of its side (default: %(default)s)')
+    command.add_argument('--shard-size', type=int, default=5000, help='chips per shard (default: %(default)s)')
+    command.add_argument('--skip-truncated', action='store_true', help='leave out truncated boxes')
+    command.add_argument('--skip-difficult', action='store_true', help='leave out difficult boxes')
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.error('a command is required')
+    if args.command == 'refresh-inventory' and args.fields is not None:
+        unknown = [name for name in fieldList(args.fields) if name not in SIGN_FIELD_NAMES]
+        if unknown:
+            parser.error('unknown fields: %s' % ', '.join(unknown))
+    return args
+
+
+def fieldList(text):
+    return tuple(name.strip() for name in text.split(',') if name.strip())
+
+
+def taskOptions(args):
+    if args.command == 'validate':
+        return {'imageDir': args.images, 'checkImages': args.check_images}
+    if args.command == 'fill-location':
+        return {'imageDir': args.images, 'overwrite': args.overwrite, 'dryRun': args.dry_run}
+    if args.command == 'refresh-inventory':
+        fields = REFRESH_FIELDS if args.fields is None else fieldList(args.fields)
+        return {'inventoryPath': args.inventoryPath, 'fields': fields, 'dryRun': args.dry_run}
+    return {'dryRun': args.dry_run}
+
+
+def openInventory(path, tmpDir, report=sys.stderr):
+    """Path of a sign inventory database for path; exports are imported
+    into a database in tmpDir."""
+    if os.path.splitext(path)[1].lower() == '.db':
+        return path
+    dbPath = os.path.join(tmpDir, 'inventory.db')
+    start = time.time()
+    count = SignInventory(dbPath).importFile(path)
+    report.write('inventory: %d signs from %s in %.1fs\n' % (count, path, time.time() - start))
+    return dbPath
+
+
+def runBatch(command, options, xmlPaths, jobs, report=sys.stderr, changeLog=None):
+    """Run command over xmlPaths and return (done, changed, failed).
+
+    Attribute changes are printed and, with a changeLog (a csv.writer),
+    written one per row.
+    """
+    task = partial(runTask, command, options)
+    total = len(xmlPaths)
+    done = changed = failed = 0
+    changedFields = Counter()
+    start = lastReport = time.time()
+    pool = Pool(jobs) if jobs > 1 and total > CHUNK_SIZE else None
+    try:
+        results = pool.imap_unordered(task, xmlPaths, CHUNK_SIZE) if pool else map(task, xmlPaths)
+        for result in results:
+            done += 1
+            changed += result.changed
+            if result.problems:
+                failed += 1
+                for problem in result.problems:
+                    print('%s: %s' % (result.path, problem))
+            for change in result.changes:
+                changedFields[change.field] += 1
+                sign = change.oid if change.oid is not None else change.signId
+                print('%s: object %d (sign %s): %s %r -> %r' % (result.path, change.objectIndex, sign,
+                                                               change.field, change.old, change.new))
+                if changeLog is not None:
+                    changeLog.writerow([result.path, change.objectIndex, change.oid, change.signId, change.field,
+                                        change.old, change.new])
+            now = time.time()
+            if now - lastReport >= PROGRESS_INTERVAL:
+                lastReport = now
+                report.write('%d/%d files (%.0f files/s)\n' % (done, total, done / (now - start)))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = max(time.time() - start, 1e-6)
+    report.write('%s: %d files in %.1fs (%.0f files/s), %d changed, %d with problems\n' %
+                 (command, done, elapsed, done / elapsed, changed, failed))
+    for field, count in sorted(changedFields.items()):
+        report.write('  %s: %d signs changed\n' % (field, count))
+    return done, changed, failed
+
+
+def poolMap(func, items, jobs, chunkSize, ordered=False):
+    """func over items in jobs worker processes, in no particular order
+    unless ordered."""
+    pool = Pool(jobs) if jobs > 1 and len(items) > chunkSize else None
+    try:
+        if pool is not None:
+            results = (pool.imap if ordered else pool.imap_unordered)(func, items, chunkSize)
+        else:
+            results = map(func, items)
+        for result in results:
+            yield result
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def cropsTask(imageDir, xmlPath):
+    try:
+        crops, problems = findCrops(xmlPath, imageDir)
+    except Exception as e:
+        crops, problems = [], ['reading boxes failed: %s' % e]
+    return xmlPath, crops, problems
+
+
+def thumbnailTask(size, job):
+    imagePath, targets = job
+    try:
+        return writeThumbnails(imagePath, targets, size)
+    except Exception as e:
+        return TaskResult(imagePath, False, ['thumbnails failed: %s' % e])
+
+
+def makeThumbnails(args, xmlPaths, report=sys.stderr):
+    """Save the preview of every subclass from its best box; every image
+    is decoded once however many previews come from it."""
+    start = time.time()
+    crops = []
+    for xmlPath, found, problems in poolMap(partial(cropsTask, args.images), xmlPaths, max(1, args.jobs),
+                                            CHUNK_SIZE):
+        crops.extend(found)
+        for problem in problems:
+            print('%s: %s' % (xmlPath, problem))
+    best = bestThumbnailCrops(crops)
+    unusable = sorted(set(crop.subclass for crop in crops if crop.subclass) - set(best))
+    if unusable:
+        print('only truncated or difficult boxes of: %s' % ', '.join(unusable))
+    existing = {}
+    if os.path.isdir(args.out):
+        for fileName in os.listdir(args.out):
+            name, ext = os.path.splitext(fileName)
+            if ext.lower() == '.png':
+                existing[name] = fileName
+    byImage = {}
+    kept = 0
+    for subclass, crop in sorted(best.items()):
+        if os.path.basename(subclass) != subclass or subclass.startswith('.'):
+            print('%s: object %d: subclass %r is not a file name' % (crop.xmlPath, crop.objectIndex, subclass))
+            continue
+        if subclass in existing and not args.overwrite:
+            kept += 1
+            continue
+        path = os.path.join(args.out, existing.get(subclass, subclass + '.png'))
+        print('%s <- %s object %d %s' % (path, crop.xmlPath, crop.objectIndex, crop.box))
+        byImage.setdefault(crop.imagePath, []).append((crop, path))
+    report.write('%d boxes in %d files, %d subclasses, %d previews kept\n' %
+                 (len(crops), len(xmlPaths), len(best), kept))
+    if args.dry_run or not byImage:
+        return 0
+    if not os.path.isdir(args.out):
+        os.makedirs(args.out)
+    written = failed = 0
+    for result in poolMap(partial(thumbnailTask, args.size), sorted(byImage.items()), max(1, args.jobs), 1):
+        if result.changed:
+            written += len(byImage[result.path]) - len(result.problems)
+        failed += bool(result.problems)
+        for problem in result.problems:
+            print('%s: %s' % (result.path, problem))
+    report.write('thumbnails: %d previews from %d images in %.1fs, %d images with problems\n' %
+                 (written, len(byImage), time.time() - start, failed))
+    return 0
+
+
+def chipsTask(options, job):
+    imagePath, crops = job
+    try:
+        return imagePath, cutChips(imagePath, crops, **options), []
+    except Exception as e:
+        return imagePath, [], ['cutting chips failed: %s' % e]
+
+
+def makeChips(args, xmlPaths, report=sys.stderr):
+    """Cut the chips of every box with a subclass; every image is decoded
+    once, images of an earlier run into args.out are skipped."""
+    try:
+        writer = ChipWriter(args.out, args.format, max(1, args.shard_size))
+    except (IOError, OSError, ValueError) as e:
+        print('cannot continue the export in %s: %s' % (args.out, e))
+        return 1
+    start = time.time()
+    byImage = {}
+    skipped = 0
+    for xmlPath, found, problems in poolMap(partial(cropsTask, args.images), xmlPaths, max(1, args.jobs),
+                                            CHUNK_SIZE):
+        for problem in problems:
+            print('%s: %s' % (xmlPath, problem))
+        for crop in found:
+            if not crop.subclass or (args.skip_truncated and crop.truncated) or \
+                    (args.skip_difficult and crop.difficult):
+                skipped += 1
+            else:
+                byImage.setdefault(crop.imagePath, []).append(crop)
+    jobs = sorted((imagePath, crops) for imagePath, crops in byImage.items() if imagePath not in writer.doneImages)
+    report.write('%d images with chips, %d done before, %d boxes skipped\n' %
+                 (len(byImage), len(byImage) - len(jobs), skipped))
+    options = {'size': args.size, 'padding': args.padding, 'encode': args.format == 'tar'}
+    done = failed = 0
+    lastReport = time.time()
+    try:
+        # In order, the shards of the same input are the same
+        for imagePath, chips, problems in poolMap(partial(chipsTask, options), jobs, max(1, args.jobs), 4,
+                                                  ordered=True):
+            done += 1
+            if problems:
+                failed += 1
+                for problem in problems:
+                    print('%s: %s' % (imagePath, problem))
+                continue
+            writer.add(imagePath, chips)
+            now = time.time()
+            if now - lastReport >= PROGRESS_INTERVAL:
+                lastReport = now
+                report.write('%d/%d images, %d chips in %d shards\n' %
+                             (done, len(jobs), writer.chipCount, writer.shardCount))
+    finally:
+        writer.close()
+    report.write('chips: %d images in %.1fs, %d chips in %d shards, %d labels, %d images with problems\n' %
+                 (done, time.time() - start, writer.chipCount, writer.shardCount, len(writer.labels), failed))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = parseArgs(sys.argv[1:] if argv is None else argv)
+    xmlPaths = list(findAnnotations(args.paths))
+    if not xmlPaths:
+        print('no annotations found under %s' % ', '.join(args.paths))
+        return 1
+    if args.command == 'thumbnails':
+        return makeThumbnails(args, xmlPaths)
+    if args.command == 'chips':
+        return makeChips(args, xmlPaths)
+    if args.command != 'refresh-inventory':
+        _, _, failed = runBatch(args.command, taskOptions(args), xmlPaths, max(1, args.jobs))
+        return 1 if failed and args.command == 'validate' else 0
+
+    tmpDir = tempfile.mkdtemp(prefix='labelImgInventory')
+    reportFile = None
+    try:
+        try:
+            args.inventoryPath = openInventory(args.inventory, tmpDir)
+        except (IOError, OSError, ValueError) as e:
+            print('cannot read inventory %s: %s' % (args.inventory, e))
+            return 1
+        if args.fields is not None:
+            inventory = SignInventory(args.inventoryPath)
+            columns = inventory.columns()
+            inventory.close()
+            missing = [name for name in fieldList(args.fields) if name not in columns]
+            if missing:
+                print('fields not in inventory %s: %s' % (args.inventory, ', '.join(missing)))
+                return 1
+        changeLog = None
+        if args.report:
+            reportFile = open(args.report, 'w', newline='')
+            changeLog = csv.writer(reportFile)
+            changeLog.writerow(['path', 'object', 'SignMainGeneralOID', 'ID', 'field', 'old', 'new'])
+        _, _, failed = runBatch(args.command, taskOptions(args), xmlPaths, max(1, args.jobs),
+                                changeLog=changeLog)
+    finally:
+        if reportFile is not None:
+            reportFile.close()
+        shutil.rmtree(tmpDir, ignore_errors=True)
+    # Signs not in the inventory or unreadable files
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""Annotation tasks run by labelImgBatch, one XML file per call, and the
+crops cut out of the images, one image per call.
+
+Nothing in here imports Qt so the tasks can run in plain worker
+processes. Every task returns a TaskResult and reports problems in it
+instead of raising.
+"""
+import math
+import os
+from collections import namedtuple
+
+from lxml import etree
+
+from libs.getExImgInfo import read_gps_header
+from libs.pascal_voc_io import XML_EXT, LOCATION_FIELDS, SIGN_FIELDS, isTruncated, readSignRecord, \
+    signFieldText, writeXmlTree
+from libs.signInventory import SignInventory
+
+# changes: SignChanges of the tasks that edit sign attributes
+TaskResult = namedtuple('TaskResult', ['path', 'changed', 'problems', 'changes'])
+TaskResult.__new__.__defaults__ = ((),)
+# old and new are the texts written to the XML
+SignChange = namedtuple('SignChange', ['objectIndex', 'oid', 'signId', 'field', 'old', 'new'])
+
+# Attributes refresh-inventory takes from the inventory by default. The
+# position, the classes and the join keys are the annotator's.
+REFRESH_FIELDS = tuple(field.name for field in SIGN_FIELDS if field.name not in
+                       LOCATION_FIELDS + ('superclass', 'subclass', 'SignMainGeneralOID', 'ID'))
+
+# box: (xmin, ymin, xmax, ymax) in pixels of the image
+# subclass: '' when the sign has none
+BoxCrop = namedtuple('BoxCrop', ['xmlPath', 'imagePath', 'objectIndex', 'subclass', 'box', 'truncated',
+                                 'difficult'])
+
+_BOX_FIELDS = ('xmin', 'ymin', 'xmax', 'ymax')
+
+
+def findAnnotations(paths):
+    """Yield the XML files among paths, walking directories in sorted order."""
+    for path in paths:
+        if os.path.isfile(path):
+            if path.lower().endswith(XML_EXT):
+                yield path
+            continue
+        for dirPath, dirNames, fileNames in os.walk(path):
+            dirNames.sort()
+            for fileName in sorted(fileNames):
+                if fileName.lower().endswith(XML_EXT):
+                    yield os.path.join(dirPath, fileName)
+
+
+def _parse(xmlPath):
+    parser = etree.XMLParser(remove_blank_text=True)
+    return etree.parse(xmlPath, parser).getroot()
+
+
+def _text(elem, path):
+    found = elem.find(path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip()
+
+
+def _imageSize(root):
+    """Return (width, height) from <size> or None."""
+    try:
+        width, height = int(_text(root, 'size/width')), int(_text(root, 'size/height'))
+    except (TypeError, ValueError):
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
+
+
+def _box(obj):
+    """Return the bndbox of obj as 4 ints, raises ValueError if unusable."""
+    try:
+        return [int(float(_text(obj, 'bndbox/' + name))) for name in _BOX_FIELDS]
+    except TypeError:
+        raise ValueError('missing bndbox')
+
+
+def findImage(xmlPath, root, imageDir=None):
+    """Locate the image an annotation belongs to, or return None.
+
+    Tries imageDir, then the folder of the XML, then the stored <path>.
+    """
+    candidates = []
+    fileName = _text(root, 'filename')
+    if fileName:
+        if imageDir:
+            candidates.append(os.path.join(imageDir, fileName))
+        candidates.append(os.path.join(os.path.dirname(xmlPath), fileName))
+    storedPath = _text(root, 'path')
+    if storedPath:
+        candidates.append(storedPath)
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def validateAnnotation(xmlPath, imageDir=None, checkImages=False):
+    try:
+        root = _parse(xmlPath)
+    except (etree.XMLSyntaxError, IOError) as e:
+        return TaskResult(xmlPath, False, ['cannot parse: %s' % e])
+    problems = []
+    if root.tag != 'annotation':
+        problems.append('root element is <%s>, expected <annotation>' % root.tag)
+    if not _text(root, 'filename'):
+        problems.append('missing <filename>')
+    size = _imageSize(root)
+    if size is None:
+        problems.append('missing or invalid <size>')
+    if checkImages and findImage(xmlPath, root, imageDir) is None:
+        problems.append('image not found')
+    for index, obj in enumerate(root.findall('object')):
+        if not _text(obj, 'name'):
+            problems.append('object %d: missing <name>' % index)
+        record = readSignRecord(obj)
+        for name in record.invalidFields():
+            problems.append('object %d: invalid %s %r' % (index, name, record[name]))
+        try:
+            xmin, ymin, xmax, ymax = _box(obj)
+        except ValueError as e:
+            problems.append('object %d: %s' % (index, e))
+            continue
+        if xmin >= xmax or ymin >= ymax:
+            problems.append('object %d: empty box (%d, %d, %d, %d)' % (index, xmin, ymin, xmax, ymax))
+        elif size is not None and (xmin < 0 or ymin < 0 or xmax > size[0] or ymax > size[1]):
+            problems.append('object %d: box (%d, %d, %d, %d) outside the %dx%d image' %
+                            ((index, xmin, ymin, xmax, ymax) + size))
+    return TaskResult(xmlPath, False, problems)
+
+
+def _isEmpty(value):
+    return value is None or value in ('', 'None')
+
+
+def fillLocation(xmlPath, imageDir=None, overwrite=False, dryRun=False):
+    """Fill the image-level Location of an annotation from the image EXIF."""
+    try:
+        root = _parse(xmlPath)
+    except (etree.XMLSyntaxError, IOError) as e:
+        return TaskResult(xmlPath, False, ['cannot parse: %s' % e])
+    # Older files use <location><latitude>, the writer uses <Location><Latitude>
+    location = root.find('Location')
+    names = ('Latitude', 'Longitude', 'Altitude')
+    if location is None and root.find('location') is not None:
+        location = root.find('location')
+        names = ('latitude', 'longitude', 'altitude')
+    if location is not None and not overwrite and \
+            not _isEmpty(_text(location, names[0])) and not _isEmpty(_text(location, names[1])):
+        return TaskResult(xmlPath, False, [])
+
+    imagePath = findImage(xmlPath, root, imageDir)
+    if imagePath is None:
+        return TaskResult(xmlPath, False, ['image not found'])
+    gps = read_gps_header(imagePath)
+    if gps is None:
+        return TaskResult(xmlPath, False, ['no GPS in %s' % imagePath])
+
+    if location is None:
+        location = etree.Element('Location')
+        size = root.find('size')
+        if size is not None:
+            size.addnext(location)
+        else:
+            root.append(location)
+    for name, value in zip(names, gps):
+        elem = location.find(name)
+        if elem is None:
+            elem = etree.SubElement(location, name)
+        elem.text = signFieldText(value)
+    if not dryRun:
+        writeXmlTree(root, xmlPath)
+    return TaskResult(xmlPath, True, [])
+
+
+def recomputeTruncated(xmlPath, dryRun=False):
+    """Set <truncated> of every object from its box and the image size."""
+    try:
+        root = _parse(xmlPath)
+    except (etree.XMLSyntaxError, IOError) as e:
+        return TaskResult(xmlPath, False, ['cannot parse: %s' % e])
+    size = _imageSize(root)
+    if size is None:
+        return TaskResult(xmlPath, False, ['missing or invalid <size>'])
+    changed = False
+    problems = []
+    for index, obj in enumerate(root.findall('object')):
+        try:
+            xmin, ymin, xmax, ymax = _box(obj)
+        except ValueError as e:
+            problems.append('object %d: %s' % (index, e))
+            continue
+        value = '1' if isTruncated(xmin, ymin, xmax, ymax, size[0], size[1]) else '0'
+        truncated = obj.find('truncated')
+        if truncated is None:
+            truncated = etree.Element('truncated')
+            # Keep the writer's order: name, pose, truncated
+            anchor = obj.find('pose')
+            if anchor is None:
+                anchor = obj.find('name')
+            if anchor is not None:
+                anchor.addnext(truncated)
+            else:
+                obj.insert(0, truncated)
+        if truncated.text != value:
+            truncated.text = value
+            changed = True
+    if changed and not dryRun:
+        writeXmlTree(root, xmlPath)
+    return TaskResult(xmlPath, changed, problems)
+
+
+# Inventories opened by this process, by database path
+_inventories = {}
+
+
+def _inventory(inventoryPath):
+    inventory = _inventories.get(inventoryPath)
+    if inventory is None:
+        inventory = _inventories[inventoryPath] = SignInventory(inventoryPath)
+    return inventory
+
+
+def _setSignField(obj, name, value):
+    parent = obj
+    if name in LOCATION_FIELDS:
+        parent = obj.find('location')
+        if parent is None:
+            parent = etree.SubElement(obj, 'location')
+    elem = parent.find(name)
+    if elem is None:
+        elem = etree.SubElement(parent, name)
+    elem.text = signFieldText(value)
+
+
+def refreshInventory(xmlPath, inventoryPath, fields=REFRESH_FIELDS, dryRun=False):
+    """Update the sign attributes of an annotation from the inventory.
+
+    Signs are matched by SignMainGeneralOID, or by ID when they have no
+    OID; signs with neither are left alone. Fields the inventory export
+    did not have are not refreshed. The file is only written when an
+    attribute changed.
+    """
+    try:
+        root = _parse(xmlPath)
+    except (etree.XMLSyntaxError, IOError) as e:
+        return TaskResult(xmlPath, False, ['cannot parse: %s' % e])
+    inventory = _inventory(inventoryPath)
+    columns = inventory.columns()
+    fields = [name for name in fields if name in columns]
+    problems = []
+    changes = []
+    for index, obj in enumerate(root.findall('object')):
+        record = readSignRecord(obj)
+        oid, signId = record['SignMainGeneralOID'], record['ID']
+        if oid is None and signId is None:
+            continue
+        current = inventory.lookup(oid, signId)
+        if current is None:
+            problems.append('object %d: sign %s not in the inventory' % (index, oid if oid is not None else signId))
+            continue
+        for name in fields:
+            if record[name] != current[name]:
+                changes.append(SignChange(index, oid, signId, name, signFieldText(record[name]),
+                                          signFieldText(current[name])))
+                _setSignField(obj, name, current[name])
+    if changes and not dryRun:
+        writeXmlTree(root, xmlPath)
+    return TaskResult(xmlPath, bool(changes), problems, changes)
+
+
+def _flag(obj, name):
+    text = _text(obj, name)
+    try:
+        return bool(int(text))
+    except (TypeError, ValueError):
+        return text is not None and text.lower() == 'true'
+
+
+def findCrops(xmlPath, imageDir=None):
+    """Return (BoxCrops of the objects of an annotation, problems)."""
+    try:
+        root = _parse(xmlPath)
+    except (etree.XMLSyntaxError, IOError) as e:
+        return [], ['cannot parse: %s' % e]
+    imagePath = findImage(xmlPath, root, imageDir)
+    if imagePath is None:
+        return [], ['image not found']
+    imagePath = os.path.abspath(imagePath)
+    crops = []
+    problems = []
+    for index, obj in enumerate(root.findall('object')):
+        try:
+            xmin, ymin, xmax, ymax = _box(obj)
+        except ValueError as e:
+            problems.append('object %d: %s' % (index, e))
+            continue
+        if xmin >= xmax or ymin >= ymax:
+            problems.append('object %d: empty box (%d, %d, %d, %d)' % (index, xmin, ymin, xmax, ymax))
+            continue
+        subclass = readSignRecord(obj)['subclass']
+        crops.append(BoxCrop(xmlPath, imagePath, index, '' if _isEmpty(subclass) else subclass,
+                             (xmin, ymin, xmax, ymax), _flag(obj, 'truncated'), _flag(obj, 'difficult')))
+    return crops, problems
+
+
+def openForCrops(imagePath, boxes, minSize=None):
+    """Decode imagePath once for cutting out boxes. Returns (RGB image, scale),
+    box coordinates times scale are pixels of the image.
+
+    With a minSize, JPEGs are decoded at the smallest scale (1/2, 1/4,
+    1/8) that leaves the longer side of every box at least minSize pixels.
+    """
+    from PIL import Image
+    image = Image.open(imagePath)
+    width, height = image.size
+    if minSize and boxes:
+        reduction = min(max(xmax - xmin, ymax - ymin) for xmin, ymin, xmax, ymax in boxes) / float(minSize)
+        if reduction > 1:
+            image.draft('RGB', (int(math.ceil(width / reduction)), int(math.ceil(height / reduction))))
+    image = image.convert('RGB')
+    return image, image.size[0] / float(width)
+
+
+def cropBox(image, box, scale=1.0):
+    """The part of image under box, given in full size pixels."""
+    return image.crop(tuple(int(round(value * scale)) for value in box))
+
+
+def bestThumbnailCrops(crops):
+    """{subclass: BoxCrop} of the crop to take the preview of every subclass
+    from: the largest box that is neither truncated nor difficult."""
+    best = {}
+    for crop in crops:
+        if not crop.subclass or crop.truncated or crop.difficult:
+            continue
+        xmin, ymin, xmax, ymax = crop.box
+        rank = (-(xmax - xmin) * (ymax - ymin), crop.xmlPath, crop.objectIndex)
+        if crop.subclass not in best or rank < best[crop.subclass][0]:
+            best[crop.subclass] = (rank, crop)
+    return dict((subclass, crop) for subclass, (_, crop) in best.items())
+
+
+def writeThumbnails(imagePath, targets, size):
+    """Cut the previews of targets, (BoxCrop, PNG path) pairs, out of
+    imagePath, decoded once, fitted into size x size."""
+    from PIL import Image
+    try:
+        image, scale = openForCrops(imagePath, [crop.box for crop, _ in targets], size)
+    except (IOError, OSError) as e:
+        return TaskResult(imagePath, False, ['cannot read image: %s' % e])
+    problems = []
+    for crop, path in targets:
+        thumbnail = cropBox(image, crop.box, scale)
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        # The window watches the folder, it should not see half a file
+        tmpPath = path + '.tmp'
+        try:
+            thumbnail.save(tmpPath, 'PNG')
+            os.replace(tmpPath, path)
+        except (IOError, OSError) as e:
+            problems.append('cannot write %s: %s' % (path, e))
+    return TaskResult(imagePath, len(problems) < len(targets), problems)
+
+
+TASKS = {
+    'validate': validateAnnotation,
+    'fill-location': fillLocation,
+    'truncated': recomputeTruncated,
+    'refresh-inventory': refreshInventory,
+}
+
+
+def runTask(name, options, xmlPath):
+    """Run TASKS[name] on xmlPath; safe to hand to a process pool."""
+    try:
+        return TASKS[name](xmlPath, **options)
+    except Exception as e:
+        return TaskResult(xmlPath, False, ['%s failed: %s' % (name, e)])
@@ -8,7 +8,17 @@ except ImportError:
 
 import os
 
+# Hidden rows kept for reuse by the image info dock; rows released beyond
+# this are deleted.
+SPARE_WIDGETS = 32
+
+
 class BoundingBoxWidget(QWidget):
+    """One row of the image info dock: the sign attributes of a box.
+
+    The rows are recycled from image to image, the window connects the
+    signals of a row once and looks up the shape it currently shows.
+    """
 
     def __init__(self, parent = None):
         QWidget.__init__(self, parent = parent)
@@ -25,89 +35,97 @@ class BoundingBoxWidget(QWidget):
 
         self.checkBox = QCheckBox()
         self.checkBox.setMaximumWidth(20)
-        #self.numberOfBoundingBoxs = QLineEdit()
-        #self.numberOfBoundingBoxs.setMaximumWidth(50)
         self.pasteButton = QPushButton('Paste Geo')
         self.pasteButton.setMaximumWidth(80)
-        self.pasteButton.setMaximumWidth(80)
         self.pasteAllButton =  QPushButton('Paste All')
         self.pasteAllButton.setMaximumWidth(80)
         self.gotoGeoButton = QPushButton('Goto Geo')
         self.gotoGeoButton.setMaximumWidth(80)
+        # Signs of the inventory around the camera, fills every attribute
+        self.nearbyButton = QPushButton('Nearby')
+        self.nearbyButton.setMaximumWidth(80)
 
-        # topLayout = QHBoxLayout()
-        # topLayout.setAlignment(Qt.AlignLeft|Qt.AlignCenter)
         boundingBoxInfoLayout = QGridLayout()
         boundingBoxInfoLayout.setAlignment(Qt.AlignLeft | Qt.AlignCenter)
         boundingBoxInfoLayout.setContentsMargins(0, 0, 0, 0)
         wholeLayout = QHBoxLayout()
         wholeLayout.setContentsMargins(0, 0, 0, 0)
 
-        #all the componment add to grid layout first line.
-        boundingBoxInfoLayout.addWidget(self.checkBox,0,0)
-        #topLayout.addWidget(self.numberOfBoundingBoxs)
-        boundingBoxInfoLayout.addWidget(self.pasteButton,0,1)
-        boundingBoxInfoLayout.addWidget(self.pasteAllButton,0,2)
-        x = 3
-        y = 4
-        for itr in range(len(lineEditLabelsName)):
-            label = QLabel(lineEditLabelsName[itr] + ': ')
+        # Everything is on one line
+        boundingBoxInfoLayout.addWidget(self.checkBox, 0, 0)
+        boundingBoxInfoLayout.addWidget(self.pasteButton, 0, 1)
+        boundingBoxInfoLayout.addWidget(self.pasteAllButton, 0, 2)
+        column = 3
+        for name in lineEditLabelsName:
+            label = QLabel(name + ': ')
             label.setMaximumWidth(40)
             label.setMaximumHeight(30)
-            boundingBoxInfoLayout.addWidget(label,x/10, x % 10)
-            self.labelLineEdits[lineEditLabelsName[itr]] = QLineEdit()
-            self.labelLineEdits[lineEditLabelsName[itr]].setMaximumWidth(90)
-            boundingBoxInfoLayout.addWidget(self.labelLineEdits[lineEditLabelsName[itr]],x/10,y % 10)
-            x += 2
-            y += 2
-
-        for itr in range(len(dropDownBoxLabelsname)):
-            label = QLabel(dropDownBoxLabelsname[itr] + ': ')
+            boundingBoxInfoLayout.addWidget(label, 0, column)
+            self.labelLineEdits[name] = QLineEdit()
+            self.labelLineEdits[name].setMaximumWidth(90)
+            boundingBoxInfoLayout.addWidget(self.labelLineEdits[name], 0, column + 1)
+            column += 2
+
+        for name in dropDownBoxLabelsname:
+            label = QLabel(name + ': ')
             label.setMaximumWidth(40)
             label.setMaximumHeight(30)
-            boundingBoxInfoLayout.addWidget(label,x/9,x % 9)
-            self.dropDownBoxs[dropDownBoxLabelsname[itr]] = QComboBox()
-            #self.dropDownBoxs[dropDownBoxLabelsname[itr]].setMinimumWidth(50)
-            self.dropDownBoxs[dropDownBoxLabelsname[itr]].setMaximumWidth(80)
-            boundingBoxInfoLayout.addWidget(self.dropDownBoxs[dropDownBoxLabelsname[itr]],x/9 , y % 9)
-            x += 2
-            y += 2
+            boundingBoxInfoLayout.addWidget(label, 0, column)
+            self.dropDownBoxs[name] = QComboBox()
+            self.dropDownBoxs[name].setMaximumWidth(80)
+            boundingBoxInfoLayout.addWidget(self.dropDownBoxs[name], 0, column + 1)
+            column += 2
 
         self.thumbnail = QLabel()
         self.thumbnail.setFixedHeight(80)
         self.thumbnail.setFixedWidth(80)
         self.thumbnail.setScaledContents(True)
-        #self.thumbnail.setPixmap(QPixmap(os.getcwd() + "/icons/close.png"))
-        #print(os.getcwd() + "icons/color_line.png")
-        #boundingBoxInfoLayout.addWidget( self.thumbnail, x / 11, x % 11)
 
-        boundingBoxInfoLayout.addWidget(self.gotoGeoButton, x / 12, x % 12)
-        # all before is the first line widgets
+        boundingBoxInfoLayout.addWidget(self.gotoGeoButton, 0, column)
+        boundingBoxInfoLayout.addWidget(self.nearbyButton, 0, column + 1)
+        column += 2
 
-        z = 10
-        for itr in range(len(gpsDistanceName)):
-            label = QLabel(gpsDistanceName[itr] + ': ')
+        for name in gpsDistanceName:
+            label = QLabel(name + ': ')
             label.setMaximumWidth(40)
             label.setMaximumHeight(30)
-            boundingBoxInfoLayout.addWidget(label,z/16,z % 16+1)
-            self.gpsDistanceNameDict[gpsDistanceName[itr]] = QLineEdit()
-            tEdit = self.gpsDistanceNameDict[gpsDistanceName[itr]]
+            boundingBoxInfoLayout.addWidget(label, 0, column)
+            self.gpsDistanceNameDict[name] = QLineEdit()
+            tEdit = self.gpsDistanceNameDict[name]
             tEdit.setFixedWidth(60)
             tEdit.setReadOnly(True)
-            boundingBoxInfoLayout.addWidget(self.gpsDistanceNameDict[gpsDistanceName[itr]],z/16 , z % 16+2)
-            z += 2
-
-        # from here is the second line widgets.
-
+            boundingBoxInfoLayout.addWidget(tEdit, 0, column + 1)
+            column += 2
 
         boundingBoxInfoLayout.setAlignment(Qt.AlignTop |Qt.AlignLeft)
-        #wholeLayout.addLayout(topLayout)
         wholeLayout.addLayout(boundingBoxInfoLayout)
         self.boundingBoxInfoLayoutContainer = QWidget()
         self.boundingBoxInfoLayoutContainer.setLayout(wholeLayout)
         self.boundingBoxInfoLayoutContainer.setAutoFillBackground(True)
+        self.boundingBoxInfoLayoutContainer.setMaximumHeight(50)
+        self.setSelected(False)
+
+    def setSelected(self, selected):
+        """Check and darken the row of the selected box."""
+        self.checkBox.setCheckable(selected)
+        self.checkBox.setChecked(selected)
         p = self.boundingBoxInfoLayoutContainer.palette()
-        p.setColor(self.boundingBoxInfoLayoutContainer.backgroundRole(), Qt.white)
+        p.setColor(self.boundingBoxInfoLayoutContainer.backgroundRole(), Qt.darkGray if selected else Qt.white)
         self.boundingBoxInfoLayoutContainer.setPalette(p)
-        self.boundingBoxInfoLayoutContainer.setMaximumHeight(50)
-        #self.boundingBoxInfoLayoutContainer.setStyleSheet("background-color: white ")
\ No newline at end of file
+
+    def setSign(self, latitude, longitude, subclass):
+        """Show the values of another sign without emitting the edit signals."""
+        edits = (self.labelLineEdits['lat'], self.labelLineEdits['lon'], self.dropDownBoxs['sub'])
+        for edit in edits:
+            edit.blockSignals(True)
+        try:
+            self.labelLineEdits['lat'].setText(latitude)
+            self.labelLineEdits['lon'].setText(longitude)
+            self.dropDownBoxs['sub'].setCurrentText(subclass)
+        finally:
+            for edit in edits:
+                edit.blockSignals(False)
+        self.labelLineEdits['lat'].setCursorPosition(0)
+        self.labelLineEdits['lon'].setCursorPosition(0)
+        for edit in self.gpsDistanceNameDict.values():
+            edit.clear()
@@ -11,6 +11,8 @@ except ImportError:
 
 from libs.shape import Shape
 from libs.lib import distance
+from libs.spatialIndex import GridIndex
+from libs.tiledImage import TiledImage, BAND_POLL_INTERVAL
 
 CURSOR_DEFAULT = Qt.ArrowCursor
 CURSOR_POINT = Qt.PointingHandCursor
@@ -38,6 +40,8 @@ class Canvas(QWidget):
         # Initialise local state.
         self.mode = self.EDIT
         self.shapes = []
+        # Grid over the bounding rects of self.shapes, kept in step with it
+        self.shapeIndex = GridIndex()
         self.current = None
         self.selectedShape = None  # save the selected shape here
         self.selectedShapeCopy = None
@@ -47,6 +51,7 @@ class Canvas(QWidget):
         self.prevPoint = QPointF()
         self.offsets = QPointF(), QPointF()
         self.scale = 1.0
+        # A QPixmap, or a TiledImage for very large images
         self.pixmap = QPixmap()
         self.visible = {}
         self._hideBackround = False
@@ -57,11 +62,35 @@ class Canvas(QWidget):
         self._cursor = CURSOR_DEFAULT
         # Menus:
         self.menus = (QMenu(), QMenu())
+        # The pixmap pre-scaled to the current zoom, see scaledPixmap()
+        self._scaledPixmap = None
+        self._scaledKey = None
+        # Makes the tiles a TiledImage is missing, a few per pass
+        self._tileTimer = QTimer(self)
+        self._tileTimer.setSingleShot(True)
+        self._tileTimer.setInterval(0)
+        self._tileTimer.timeout.connect(self.makeTiles)
         # Set widget options.
         self.setMouseTracking(True)
         self.setFocusPolicy(Qt.WheelFocus)
+        self.setAutoFillBackground(True)
         self.verified = False
 
+    @property
+    def verified(self):
+        return self._verified
+
+    @verified.setter
+    def verified(self, value):
+        self._verified = value
+        pal = self.palette()
+        if value:
+            pal.setColor(self.backgroundRole(), QColor(184, 239, 38, 128))
+        else:
+            pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
+        self.setPalette(pal)
+        self.update()
+
     def setDrawingColor(self, qColor):
         self.drawingLineColor = qColor
         self.drawingRectColor = qColor
@@ -100,6 +129,57 @@ class Canvas(QWidget):
     def selectedVertex(self):
         return self.hVertex is not None
 
+    def indexShape(self, shape):
+        """Add shape to the index, or follow its move if it is already there."""
+        rect = shape.boundingRect()
+        self.shapeIndex.update(shape, (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+    def reindexShape(self, shape):
+        if shape in self.shapeIndex:
+            self.indexShape(shape)
+
+    def rebuildShapeIndex(self):
+        self.shapeIndex.clear()
+        for shape in self.shapes:
+            self.indexShape(shape)
+
+    def imageToWidgetRect(self, rect):
+        """Widget pixels covered by rect given in image coordinates."""
+        if rect.isNull():
+            return QRect()
+        offset = self.offsetToCenter()
+        s = self.scale
+        return QRectF((rect.x() + offset.x()) * s, (rect.y() + offset.y()) * s,
+                      rect.width() * s, rect.height() * s).toAlignedRect().adjusted(-1, -1, 1, 1)
+
+    def widgetToImageRect(self, rect):
+        offset = self.offsetToCenter()
+        s = self.scale
+        return QRectF(rect.x() / s - offset.x(), rect.y() / s - offset.y(),
+                      rect.width() / s, rect.height() / s).adjusted(-1, -1, 1, 1)
+
+    def updateShape(self, shape):
+        """Schedule a repaint of the area shape is drawn on."""
+        if shape is not None and len(shape):
+            self.update(self.imageToWidgetRect(shape.paintRect()))
+
+    def updateDrawing(self):
+        """Schedule a repaint of the rubber band, the shape being drawn and the crosshair."""
+        if self.current:
+            self.updateShape(self.current)
+            self.updateShape(self.line)
+        if self.drawing() and not self.prevPoint.isNull():
+            offset = self.offsetToCenter()
+            x = int((self.prevPoint.x() + offset.x()) * self.scale)
+            y = int((self.prevPoint.y() + offset.y()) * self.scale)
+            self.update(QRect(x - 2, 0, 5, self.height()))
+            self.update(QRect(0, y - 2, self.width(), 5))
+
+    def shapesAt(self, point, margin=0):
+        """Visible shapes whose bounding rect grown by margin holds point, topmost first."""
+        return [shape for shape in self.shapeIndex.query(point.x(), point.y(), margin)
+                if self.isVisible(shape)]
+
     def mouseMoveEvent(self, ev):
         """Update line with last point and current coordinates."""
         pos = self.transformPos(ev.pos())
@@ -113,6 +193,8 @@ class Canvas(QWidget):
         # Polygon drawing.
         if self.drawing():
             self.overrideCursor(CURSOR_DRAW)
+            # Repaint where things were and where they end up
+            self.updateDrawing()
             if self.current:
                 color = self.drawingLineColor
                 if self.outOfPixmap(pos):
@@ -132,39 +214,43 @@ class Canvas(QWidget):
                 self.current.highlightClear()
             else:
                 self.prevPoint = pos
-            self.repaint()
+            self.updateDrawing()
             return
 
         # Polygon copy moving.
         if Qt.RightButton & ev.buttons():
             if self.selectedShapeCopy and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                self.updateShape(self.selectedShapeCopy)
                 self.boundedMoveShape(self.selectedShapeCopy, pos)
-                self.repaint()
+                self.updateShape(self.selectedShapeCopy)
             elif self.selectedShape:
                 self.selectedShapeCopy = self.selectedShape.copy()
-                self.repaint()
+                self.updateShape(self.selectedShapeCopy)
             return
 
         # Polygon/Vertex moving.
         if Qt.LeftButton & ev.buttons():
             if self.selectedVertex():
+                self.updateShape(self.hShape)
                 self.boundedMoveVertex(pos)
+                self.updateShape(self.hShape)
                 self.shapeMoved.emit()
-                self.repaint()
             elif self.selectedShape and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                self.updateShape(self.selectedShape)
                 self.boundedMoveShape(self.selectedShape, pos)
+                self.updateShape(self.selectedShape)
                 self.shapeMoved.emit()
-                self.repaint()
             return
 
         # Just hovering over the canvas, 2 posibilities:
         # - Highlight shapes
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
+        previous = self.hShape, self.hVertex
         self.setToolTip("Image")
-        for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
+        for shape in self.shapesAt(pos, self.epsilon):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
             index = shape.nearestVertex(pos, self.epsilon)
@@ -176,7 +262,6 @@ class Canvas(QWidget):
                 self.overrideCursor(CURSOR_POINT)
                 self.setToolTip("Click & drag to move point")
                 self.setStatusTip(self.toolTip())
-                self.update()
                 break
             elif shape.containsPoint(pos):
                 if self.selectedVertex():
@@ -186,14 +271,15 @@ class Canvas(QWidget):
                     "Click & drag to move shape '%s'" % shape.label)
                 self.setStatusTip(self.toolTip())
                 self.overrideCursor(CURSOR_GRAB)
-                self.update()
                 break
         else:  # Nothing found, clear highlights, reset state.
             if self.hShape:
                 self.hShape.highlightClear()
-                self.update()
             self.hVertex, self.hShape = None, None
             self.overrideCursor(CURSOR_DEFAULT)
+        if (self.hShape, self.hVertex) != previous:
+            self.updateShape(previous[0])
+            self.updateShape(self.hShape)
 
     def mousePressEvent(self, ev):
         pos = self.transformPos(ev.pos())
@@ -204,11 +290,11 @@ class Canvas(QWidget):
             else:
                 self.selectShapePoint(pos)
                 self.prevPoint = pos
-                self.repaint()
+                self.update()
         elif ev.button() == Qt.RightButton and self.editing():
             self.selectShapePoint(pos)
             self.prevPoint = pos
-            self.repaint()
+            self.update()
 
     def mouseReleaseEvent(self, ev):
         if ev.button() == Qt.RightButton:
@@ -218,7 +304,7 @@ class Canvas(QWidget):
                and self.selectedShapeCopy:
                 # Cancel the move by deleting the shadow copy.
                 self.selectedShapeCopy = None
-                self.repaint()
+                self.update()
         elif ev.button() == Qt.LeftButton and self.selectedShape:
             if self.selectedVertex():
                 self.overrideCursor(CURSOR_POINT)
@@ -236,12 +322,14 @@ class Canvas(QWidget):
         #del shape.line_color
         if copy:
             self.shapes.append(shape)
+            self.indexShape(shape)
             self.selectedShape.selected = False
             self.selectedShape = shape
-            self.repaint()
         else:
             self.selectedShape.points = [p for p in shape.points]
+            self.reindexShape(self.selectedShape)
         self.selectedShapeCopy = None
+        self.update()
 
     def hideBackroundShapes(self, value):
         self.hideBackround = value
@@ -300,8 +388,8 @@ class Canvas(QWidget):
             shape.highlightVertex(index, shape.MOVE_VERTEX)
             self.selectShape(shape)
             return
-        for shape in reversed(self.shapes):
-            if self.isVisible(shape) and shape.containsPoint(point):
+        for shape in self.shapesAt(point):
+            if shape.containsPoint(point):
                 self.selectShape(shape)
                 self.calculateOffsets(shape, point)
                 return
@@ -335,6 +423,7 @@ class Canvas(QWidget):
             rshift = QPointF(0, shiftPos.y())
         shape.moveVertexBy(rindex, rshift)
         shape.moveVertexBy(lindex, lshift)
+        self.reindexShape(shape)
 
     def boundedMoveShape(self, shape, pos):
         if self.outOfPixmap(pos):
@@ -354,6 +443,7 @@ class Canvas(QWidget):
         dp = pos - self.prevPoint
         if dp:
             shape.moveBy(dp)
+            self.reindexShape(shape)
             self.prevPoint = pos
             return True
         return False
@@ -370,6 +460,7 @@ class Canvas(QWidget):
         if self.selectedShape:
             shape = self.selectedShape
             self.shapes.remove(self.selectedShape)
+            self.shapeIndex.remove(shape)
             self.selectedShape = None
             self.update()
             return shape
@@ -379,6 +470,7 @@ class Canvas(QWidget):
             shape = self.selectedShape.copy()
             self.deSelectShape()
             self.shapes.append(shape)
+            self.indexShape(shape)
             shape.selected = True
             self.selectedShape = shape
             self.boundedShiftShape(shape)
@@ -389,6 +481,7 @@ class Canvas(QWidget):
             shape = copiedshape.copy()
             self.deSelectShape()
             self.shapes.append(shape)
+            self.indexShape(shape)
             shape.selected = True
             self.selectedShape = shape
             self.boundedShiftShape(shape)
@@ -404,25 +497,82 @@ class Canvas(QWidget):
         if not self.boundedMoveShape(shape, point - offset):
             self.boundedMoveShape(shape, point + offset)
 
+    def scaledPixmap(self):
+        """The pixmap scaled to the current zoom, made once per pixmap and zoom."""
+        key = (self.pixmap.cacheKey(), self.scale)
+        if self._scaledKey != key:
+            self._scaledPixmap = self.pixmap.scaled(self.pixmap.size() * self.scale,
+                                                    Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            self._scaledKey = key
+        return self._scaledPixmap
+
+    def makeTiles(self):
+        if not isinstance(self.pixmap, TiledImage):
+            return
+        made = self.pixmap.makePending()
+        for rect in made:
+            self.update(self.imageToWidgetRect(rect))
+        # The repaint only covers the tiles just made, it would not queue
+        # another pass for the ones still missing. Nothing made: their
+        # bands are still being decoded, look again a bit later.
+        if self.pixmap.hasPending():
+            self._tileTimer.start(0 if made else BAND_POLL_INTERVAL)
+
+    def paintBackground(self, p, exposed, imageRect):
+        """Draw the part of the image under exposed (widget coordinates)."""
+        offset = self.offsetToCenter()
+        if isinstance(self.pixmap, TiledImage):
+            p.save()
+            p.setRenderHint(QPainter.SmoothPixmapTransform)
+            p.scale(self.scale, self.scale)
+            p.translate(offset)
+            if self.pixmap.paint(p, imageRect, self.scale):
+                self._tileTimer.start(0)
+            p.restore()
+            return
+        if self.scale < 1:
+            # Zoomed out: blit from the pre-scaled copy instead of resampling
+            # the full resolution pixmap on every frame.
+            scaled = self.scaledPixmap()
+            origin = QPointF(offset.x() * self.scale, offset.y() * self.scale)
+            target = QRectF(exposed).intersected(QRectF(origin, QSizeF(scaled.size())))
+            if not target.isEmpty():
+                p.drawPixmap(target, scaled, target.translated(-origin))
+            return
+        # Zoomed in only a small part of the pixmap is on screen
+        source = imageRect.intersected(QRectF(self.pixmap.rect()))
+        if source.isEmpty():
+            return
+        p.save()
+        p.setRenderHint(QPainter.SmoothPixmapTransform)
+        p.scale(self.scale, self.scale)
+        p.translate(offset)
+        p.drawPixmap(source, self.pixmap, source)
+        p.restore()
+
     def paintEvent(self, event):
         if not self.pixmap:
             return super(Canvas, self).paintEvent(event)
 
+        # Only what intersects the damaged area is drawn.
+        exposed = event.rect()
+        imageRect = self.widgetToImageRect(exposed)
+
         p = self._painter
         p.begin(self)
+        self.paintBackground(p, exposed, imageRect)
+
         p.setRenderHint(QPainter.Antialiasing)
         p.setRenderHint(QPainter.HighQualityAntialiasing)
-        p.setRenderHint(QPainter.SmoothPixmapTransform)
-
         p.scale(self.scale, self.scale)
         p.translate(self.offsetToCenter())
 
-        p.drawPixmap(0, 0, self.pixmap)
         Shape.scale = self.scale
         for shape in self.shapes:
             if (shape.selected or not self._hideBackround) and self.isVisible(shape):
                 shape.fill = shape.selected or shape == self.hShape
-                shape.paint(p)
+                if shape.paintRect().intersects(imageRect):
+                    shape.paint(p)
         if self.current:
             self.current.paint(p)
             self.line.paint(p)
@@ -438,22 +588,12 @@ class Canvas(QWidget):
             p.setPen(self.drawingRectColor)
             brush = QBrush(Qt.BDiagPattern)
             p.setBrush(brush)
-            p.drawRect(leftTop.x(), leftTop.y(), rectWidth, rectHeight)
+            p.drawRect(QRectF(leftTop.x(), leftTop.y(), rectWidth, rectHeight))
 
         if self.drawing() and not self.prevPoint.isNull() and not self.outOfPixmap(self.prevPoint):
             p.setPen(QColor(0, 0, 0))
-            p.drawLine(self.prevPoint.x(), 0, self.prevPoint.x(), self.pixmap.height())
-            p.drawLine(0, self.prevPoint.y(), self.pixmap.width(), self.prevPoint.y())
-
-        self.setAutoFillBackground(True)
-        if self.verified:
-            pal = self.palette()
-            pal.setColor(self.backgroundRole(), QColor(184, 239, 38, 128))
-            self.setPalette(pal)
-        else:
-            pal = self.palette()
-            pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
-            self.setPalette(pal)
+            p.drawLine(QLineF(self.prevPoint.x(), 0, self.prevPoint.x(), self.pixmap.height()))
+            p.drawLine(QLineF(0, self.prevPoint.y(), self.pixmap.width(), self.prevPoint.y()))
 
         p.end()
 
@@ -484,6 +624,7 @@ class Canvas(QWidget):
 
         self.current.close()
         self.shapes.append(self.current)
+        self.indexShape(self.current)
         self.current = None
         self.setHiding(False)
         self.newShape.emit()
@@ -594,33 +735,14 @@ class Canvas(QWidget):
             self.moveOnePixel('Down')
 
     def moveOnePixel(self, direction):
-        # print(self.selectedShape.points)
-        if direction == 'Left' and not self.moveOutOfBound(QPointF(-1.0, 0)):
-            # print("move Left one pixel")
-            self.selectedShape.points[0] += QPointF(-1.0, 0)
-            self.selectedShape.points[1] += QPointF(-1.0, 0)
-            self.selectedShape.points[2] += QPointF(-1.0, 0)
-            self.selectedShape.points[3] += QPointF(-1.0, 0)
-        elif direction == 'Right' and not self.moveOutOfBound(QPointF(1.0, 0)):
-            # print("move Right one pixel")
-            self.selectedShape.points[0] += QPointF(1.0, 0)
-            self.selectedShape.points[1] += QPointF(1.0, 0)
-            self.selectedShape.points[2] += QPointF(1.0, 0)
-            self.selectedShape.points[3] += QPointF(1.0, 0)
-        elif direction == 'Up' and not self.moveOutOfBound(QPointF(0, -1.0)):
-            # print("move Up one pixel")
-            self.selectedShape.points[0] += QPointF(0, -1.0)
-            self.selectedShape.points[1] += QPointF(0, -1.0)
-            self.selectedShape.points[2] += QPointF(0, -1.0)
-            self.selectedShape.points[3] += QPointF(0, -1.0)
-        elif direction == 'Down' and not self.moveOutOfBound(QPointF(0, 1.0)):
-            # print("move Down one pixel")
-            self.selectedShape.points[0] += QPointF(0, 1.0)
-            self.selectedShape.points[1] += QPointF(0, 1.0)
-            self.selectedShape.points[2] += QPointF(0, 1.0)
-            self.selectedShape.points[3] += QPointF(0, 1.0)
+        step = {'Left': QPointF(-1.0, 0), 'Right': QPointF(1.0, 0),
+                'Up': QPointF(0, -1.0), 'Down': QPointF(0, 1.0)}[direction]
+        if not self.moveOutOfBound(step):
+            self.updateShape(self.selectedShape)
+            self.selectedShape.moveBy(step)
+            self.reindexShape(self.selectedShape)
+            self.updateShape(self.selectedShape)
         self.shapeMoved.emit()
-        self.repaint()
 
     def moveOutOfBound(self, step):
         points = [p1+p2 for p1, p2 in zip(self.selectedShape.points, [step]*4)]
@@ -640,6 +762,7 @@ class Canvas(QWidget):
     def undoLastLine(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.shapeIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
@@ -647,6 +770,7 @@ class Canvas(QWidget):
     def resetAllLines(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.shapeIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
@@ -654,13 +778,31 @@ class Canvas(QWidget):
         self.drawingPolygon.emit(False)
         self.update()
 
+    def loadImage(self, image):
+        """Show a QImage, or a TiledImage (see imageLoader.decodeImage())."""
+        if isinstance(image, TiledImage):
+            self.loadPixmap(image)
+        else:
+            self.loadPixmap(QPixmap.fromImage(image))
+
+    def releaseTiles(self):
+        # A TiledImage may still be held by the prefetcher, only its tiles go
+        if isinstance(self.pixmap, TiledImage):
+            self.pixmap.release()
+        self._tileTimer.stop()
+
     def loadPixmap(self, pixmap):
+        if pixmap is not self.pixmap:
+            self.releaseTiles()
         self.pixmap = pixmap
+        self._scaledPixmap = self._scaledKey = None
         self.shapes = []
+        self.shapeIndex.clear()
         self.repaint()
 
     def loadShapes(self, shapes):
         self.shapes = list(shapes)
+        self.rebuildShapeIndex()
         self.current = None
         self.repaint()
 
@@ -686,5 +828,7 @@ class Canvas(QWidget):
 
     def resetState(self):
         self.restoreCursor()
+        self.releaseTiles()
         self.pixmap = None
+        self._scaledPixmap = self._scaledKey = None
         self.update()
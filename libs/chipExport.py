@@ -0,0 +1,178 @@
+"""Chips of the annotated boxes, the training data of the sign classifier.
+
+Every box with a subclass is cut out of its image, squared, padded and
+resized, then written in shards: WebDataset style tar files (<key>.png,
+<key>.cls and <key>.json per chip) or NumPy arrays that open with
+mmap_mode='r'. labels.txt holds the subclass of every label number and
+manifest.jsonl the images of every finished shard, so an interrupted
+export picks up at the first image it had not written.
+
+Nothing in here imports Qt so chips can be cut in worker processes.
+"""
+import io
+import json
+import os
+import tarfile
+
+import numpy as np
+
+from libs.batchTasks import cropBox, openForCrops
+
+FORMATS = ('tar', 'npy')
+LABELS_FILENAME = 'labels.txt'
+MANIFEST_FILENAME = 'manifest.jsonl'
+
+
+def chipBox(box, padding):
+    """box made square around its center, then grown by padding times
+    its side on every side. May reach outside the image."""
+    xmin, ymin, xmax, ymax = box
+    side = max(xmax - xmin, ymax - ymin) * (1.0 + 2.0 * padding)
+    centerX, centerY = (xmin + xmax) / 2.0, (ymin + ymax) / 2.0
+    return (centerX - side / 2.0, centerY - side / 2.0, centerX + side / 2.0, centerY + side / 2.0)
+
+
+def cutChips(imagePath, crops, size, padding=0.0, encode=True):
+    """Cut crops (BoxCrops of imagePath) out of the image, decoded once,
+    as size x size chips. Outside the image is black.
+
+    Returns [(BoxCrop, chip)], chip being PNG bytes when encode, else a
+    size x size x 3 uint8 array.
+    """
+    from PIL import Image
+    boxes = [chipBox(crop.box, padding) for crop in crops]
+    image, scale = openForCrops(imagePath, boxes, size)
+    chips = []
+    for crop, box in zip(crops, boxes):
+        chip = cropBox(image, box, scale).resize((size, size), Image.LANCZOS)
+        if encode:
+            data = io.BytesIO()
+            chip.save(data, 'PNG')
+            chips.append((crop, data.getvalue()))
+        else:
+            chips.append((crop, np.asarray(chip, dtype=np.uint8)))
+    return chips
+
+
+def _replace(path, write, mode='wb'):
+    """Write path through a temporary file, a crash never leaves half of it."""
+    tmpPath = path + '.tmp'
+    with open(tmpPath, mode) as f:
+        write(f)
+    os.replace(tmpPath, path)
+
+
+class ChipWriter(object):
+    """Shards of chips in outDir, continuing the export found there.
+
+    add() takes all chips of one image, so an image is either in a
+    finished shard or done again after an interruption.
+    """
+
+    def __init__(self, outDir, fmt='tar', shardSize=5000):
+        if fmt not in FORMATS:
+            raise ValueError('unknown chip format: %s' % fmt)
+        self.outDir = outDir
+        self.fmt = fmt
+        self.shardSize = shardSize
+        self.labels = []
+        self.doneImages = set()
+        self.shardCount = 0
+        self.chipCount = 0
+        self._pending = []
+        self._pendingImages = []
+        if not os.path.isdir(outDir):
+            os.makedirs(outDir)
+        labelsPath = os.path.join(outDir, LABELS_FILENAME)
+        if os.path.isfile(labelsPath):
+            with open(labelsPath, 'r') as f:
+                self.labels = [line.rstrip('\n') for line in f if line.strip()]
+        self._labelIndex = dict((subclass, label) for label, subclass in enumerate(self.labels))
+        manifestPath = os.path.join(outDir, MANIFEST_FILENAME)
+        if os.path.isfile(manifestPath):
+            lines = []
+            with open(manifestPath, 'r') as f:
+                for line in f:
+                    try:
+                        shard = json.loads(line)
+                    except ValueError:
+                        # Cut short by an interruption, the shard is done again
+                        break
+                    if shard.get('format') != fmt:
+                        raise ValueError('%s holds %s shards' % (outDir, shard.get('format')))
+                    lines.append(line if line.endswith('\n') else line + '\n')
+                    self.shardCount += 1
+                    self.chipCount += shard['count']
+                    self.doneImages.update(shard['images'])
+                else:
+                    lines = None
+            if lines is not None:
+                _replace(manifestPath, lambda f: f.writelines(lines), 'w')
+
+    def label(self, subclass):
+        """The label number of subclass, new subclasses get the next one."""
+        label = self._labelIndex.get(subclass)
+        if label is None:
+            label = self._labelIndex[subclass] = len(self.labels)
+            self.labels.append(subclass)
+        return label
+
+    def add(self, imagePath, chips):
+        """Queue the chips (from cutChips()) of imagePath; a shard is
+        written once shardSize chips are queued."""
+        self._pending.extend(chips)
+        self._pendingImages.append(imagePath)
+        if len(self._pending) >= self.shardSize:
+            self.flush()
+
+    def flush(self):
+        """Write the queued chips as the next shard."""
+        if not self._pendingImages:
+            return
+        name = 'shard-%06d' % self.shardCount
+        samples = []
+        for i, (crop, chip) in enumerate(self._pending):
+            samples.append((chip, {
+                'key': '%09d' % (self.chipCount + i),
+                'label': self.label(crop.subclass),
+                'subclass': crop.subclass,
+                'xml': crop.xmlPath,
+                'image': crop.imagePath,
+                'object': crop.objectIndex,
+                'box': list(crop.box),
+                'truncated': crop.truncated,
+                'difficult': crop.difficult,
+            }))
+        if self.fmt == 'tar':
+            _replace(os.path.join(self.outDir, name + '.tar'), lambda f: self._writeTar(f, samples))
+        else:
+            chips = np.stack([chip for chip, _ in samples])
+            labels = np.array([meta['label'] for _, meta in samples], dtype=np.int32)
+            _replace(os.path.join(self.outDir, name + '.npy'), lambda f: np.save(f, chips))
+            _replace(os.path.join(self.outDir, name + '.labels.npy'), lambda f: np.save(f, labels))
+            _replace(os.path.join(self.outDir, name + '.json'),
+                     lambda f: json.dump([meta for _, meta in samples], f), 'w')
+        _replace(os.path.join(self.outDir, LABELS_FILENAME),
+                 lambda f: f.write(''.join(subclass + '\n' for subclass in self.labels)), 'w')
+        # The shard only counts once it is in the manifest
+        with open(os.path.join(self.outDir, MANIFEST_FILENAME), 'a') as f:
+            f.write(json.dumps({'shard': name, 'format': self.fmt, 'count': len(samples),
+                                'images': self._pendingImages}) + '\n')
+        self.doneImages.update(self._pendingImages)
+        self.shardCount += 1
+        self.chipCount += len(samples)
+        self._pending = []
+        self._pendingImages = []
+
+    @staticmethod
+    def _writeTar(f, samples):
+        with tarfile.open(fileobj=f, mode='w') as tar:
+            for chip, meta in samples:
+                for ext, data in (('png', chip), ('cls', str(meta['label']).encode('ascii')),
+                                  ('json', json.dumps(meta).encode('utf8'))):
+                    info = tarfile.TarInfo('%s.%s' % (meta['key'], ext))
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.flush()
@@ -11,4 +11,5 @@ SETTING_SAVE_DIR = 'savedir'
 SETTING_LAST_OPEN_DIR = 'lastOpenDir'
 SETTING_AUTO_SAVE = 'autosave'
 SETTING_SINGLE_CLASS = 'singleclass'
-SETTING_DOCK_GEOMETRY = "dock/geometry"
\ No newline at end of file
+SETTING_DOCK_GEOMETRY = "dock/geometry"
+SETTING_MAP_DATA_DIR = "map/dataDir"
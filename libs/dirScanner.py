@@ -0,0 +1,104 @@
+try:
+    from PyQt5.QtCore import QThread, pyqtSignal
+except ImportError:
+    from PyQt4.QtCore import QThread, pyqtSignal
+
+import os
+import time
+
+from libs.ustr import ustr
+
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png', '.bmp')
+# Flush found paths to the UI at least this often (seconds) ...
+SCAN_BATCH_INTERVAL = 0.2
+# ... or once this many are waiting.
+SCAN_BATCH_SIZE = 1000
+
+
+def _listImages(folderPath):
+    """Sorted (sort key, isDir, path) of the images and subdirectories of
+    folderPath, None if it cannot be read."""
+    entries = []
+    try:
+        for entry in os.scandir(folderPath):
+            try:
+                # Linked directories are not entered, like os.walk: a link
+                # loop would return the same images again and again
+                isDir = entry.is_dir()
+                if isDir and entry.is_symlink():
+                    continue
+            except OSError:
+                continue
+            if isDir or entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                # A trailing separator sorts 'a/x.jpg' after 'a.jpg' like a full path sort
+                entries.append((entry.name.lower() + (os.sep if isDir else ''), isDir, entry.path))
+    except OSError as e:
+        print('scan %s failed: %s' % (folderPath, e))
+        return None
+    entries.sort()
+    return entries
+
+
+def scanImages(folderPath, isCancelled=None):
+    """Yield the image paths under folderPath as they are found.
+
+    Every directory is listed once with os.scandir and its entries are
+    visited in case-insensitive name order, so the paths come out in the
+    same order as sorting the whole list by lower-cased path. Directories
+    are walked with a stack, not recursion, however deep the tree is.
+    """
+    entries = _listImages(folderPath)
+    if entries is None:
+        return
+    stack = [iter(entries)]
+    while stack:
+        for _, isDir, path in stack[-1]:
+            if isCancelled is not None and isCancelled():
+                return
+            if isDir:
+                entries = _listImages(path)
+                if entries is not None:
+                    stack.append(iter(entries))
+                    break
+            else:
+                yield ustr(os.path.abspath(path))
+        else:
+            stack.pop()
+
+
+class DirScanner(QThread):
+    """Scan a directory tree on a worker thread.
+
+    Paths are sent to the UI in batches; the first one goes out on its own
+    so the first image can be opened right away.
+    """
+    batchFound = pyqtSignal(list)
+    scanned = pyqtSignal(int, bool)
+
+    def __init__(self, folderPath, parent=None):
+        super(DirScanner, self).__init__(parent)
+        self.folderPath = folderPath
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def isCancelled(self):
+        return self._cancelled
+
+    def run(self):
+        batch = []
+        total = 0
+        lastFlush = 0
+        for path in scanImages(self.folderPath, self.isCancelled):
+            batch.append(path)
+            now = time.time()
+            if total == 0 or len(batch) >= SCAN_BATCH_SIZE or now - lastFlush >= SCAN_BATCH_INTERVAL:
+                total += len(batch)
+                self.batchFound.emit(batch)
+                batch = []
+                lastFlush = now
+        if batch and not self._cancelled:
+            total += len(batch)
+            self.batchFound.emit(batch)
+        self.scanned.emit(total, self._cancelled)
@@ -0,0 +1,119 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import os
+
+from lxml import etree
+
+
+class FileListModel(QAbstractTableModel):
+    """The image paths of the opened dir with their annotation status.
+
+    Rows are backed by a plain list of paths plus a path -> row dict, so
+    no per item Qt object exists. The status columns are read from the
+    XML the first time a row is shown and cached until invalidated.
+    """
+    COLUMN_FILE, COLUMN_XML, COLUMN_VERIFIED, COLUMN_BOXES = range(4)
+    HEADERS = ('File', 'XML', 'Verified', 'Boxes')
+
+    def __init__(self, annotationPathFor=None, parent=None):
+        super(FileListModel, self).__init__(parent)
+        # annotationPathFor(imagePath) -> path of its xml (may not exist)
+        self.annotationPathFor = annotationPathFor
+        self.paths = []
+        self._rows = {}
+        self._status = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ToolTipRole:
+            return self.paths[row]
+        if role == Qt.TextAlignmentRole and column != self.COLUMN_FILE:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+        if column == self.COLUMN_FILE:
+            return self.paths[row]
+        hasXml, verified, boxes = self.annotationStatus(row)
+        if column == self.COLUMN_XML:
+            return u'✓' if hasXml else ''
+        if column == self.COLUMN_VERIFIED:
+            return u'✓' if verified else ''
+        return str(boxes) if hasXml else ''
+
+    def clear(self):
+        self.beginResetModel()
+        # Keep the same list object, the window holds on to it as mImgList
+        del self.paths[:]
+        self._rows.clear()
+        self._status.clear()
+        self.endResetModel()
+
+    def extend(self, paths):
+        if not paths:
+            return
+        first = len(self.paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        for row, path in enumerate(paths, first):
+            self._rows[path] = row
+        self.paths.extend(paths)
+        self.endInsertRows()
+
+    def indexOf(self, path):
+        """Row of path, or -1 if it is not in the list."""
+        return self._rows.get(path, -1)
+
+    def path(self, row):
+        return self.paths[row]
+
+    def annotationStatus(self, row):
+        """Return (has xml, verified, box count) of the image at row."""
+        status = self._status.get(row)
+        if status is None:
+            status = self._readStatus(self.paths[row])
+            self._status[row] = status
+        return status
+
+    def _readStatus(self, imagePath):
+        if self.annotationPathFor is None:
+            return False, False, 0
+        xmlPath = self.annotationPathFor(imagePath)
+        if not xmlPath or not os.path.isfile(xmlPath):
+            return False, False, 0
+        try:
+            root = etree.parse(xmlPath).getroot()
+        except (etree.XMLSyntaxError, IOError) as e:
+            print('read status of %s failed: %s' % (xmlPath, e))
+            return True, False, 0
+        return True, root.get('verified') == 'yes', len(root.findall('object'))
+
+    def invalidateStatus(self, path=None):
+        """Re-read the status of path (or of every row) when next shown."""
+        if path is None:
+            self._status.clear()
+            if self.paths:
+                self.dataChanged.emit(self.index(0, self.COLUMN_XML),
+                                      self.index(len(self.paths) - 1, self.COLUMN_BOXES))
+            return
+        row = self.indexOf(path)
+        if row >= 0:
+            self._status.pop(row, None)
+            self.dataChanged.emit(self.index(row, self.COLUMN_XML), self.index(row, self.COLUMN_BOXES))
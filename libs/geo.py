@@ -0,0 +1,105 @@
+"""Distances, bearings and local offsets between GPS positions.
+
+Every function takes latitudes and longitudes in degrees as scalars or
+array-likes, broadcasts them with NumPy and returns float arrays (0-d for
+scalar input), so one call handles all the signs of a frame or all the
+frames of a folder.
+"""
+import numpy as np
+
+# Mean earth radius the sign panel has always used, in meters.
+EARTH_RADIUS = 6373000.0
+# WGS-84 ellipsoid, for vincenty()
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+METERS_TO_FEET = 3.2808
+
+
+def _radians(*values):
+    return [np.radians(np.asarray(value, dtype=float)) for value in values]
+
+
+def haversine(lat1, lon1, lat2, lon2, radius=EARTH_RADIUS):
+    """Great circle distance in meters on a sphere."""
+    lat1, lon1, lat2, lon2 = _radians(lat1, lon1, lat2, lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def vincenty(lat1, lon1, lat2, lon2, maxIterations=200, tolerance=1e-12):
+    """Distance in meters on the WGS-84 ellipsoid (Vincenty's inverse formula).
+
+    Pairs that do not converge, nearly antipodal points, fall back to
+    haversine().
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*_radians(lat1, lon1, lat2, lon2))
+    L = lon2 - lon1
+    U1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(maxIterations):
+            sinLam, cosLam = np.sin(lam), np.cos(lam)
+            sinSigma = np.sqrt((cosU2 * sinLam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cosLam) ** 2)
+            cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+            sigma = np.arctan2(sinSigma, cosSigma)
+            sinAlpha = np.where(sinSigma == 0, 0.0, cosU1 * cosU2 * sinLam / sinSigma)
+            cos2Alpha = 1 - sinAlpha ** 2
+            # Both points on the equator: cos2Alpha is 0
+            cos2SigmaM = np.where(cos2Alpha == 0, 0.0, cosSigma - 2 * sinU1 * sinU2 / cos2Alpha)
+            C = WGS84_F / 16 * cos2Alpha * (4 + WGS84_F * (4 - 3 * cos2Alpha))
+            previous = lam
+            lam = L + (1 - C) * WGS84_F * sinAlpha * (
+                sigma + C * sinSigma * (cos2SigmaM + C * cosSigma * (-1 + 2 * cos2SigmaM ** 2)))
+            converged = np.abs(lam - previous) < tolerance
+            if converged.all():
+                break
+
+        u2 = cos2Alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        deltaSigma = B * sinSigma * (cos2SigmaM + B / 4 * (
+            cosSigma * (-1 + 2 * cos2SigmaM ** 2) -
+            B / 6 * cos2SigmaM * (-3 + 4 * sinSigma ** 2) * (-3 + 4 * cos2SigmaM ** 2)))
+        distance = WGS84_B * A * (sigma - deltaSigma)
+    distance = np.where(converged & np.isfinite(distance), distance,
+                        haversine(np.degrees(lat1), np.degrees(lon1), np.degrees(lat2), np.degrees(lon2)))
+    return distance[()] if distance.ndim == 0 else distance
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial bearing from point 1 to point 2 in radians, clockwise from
+    north, in [-pi, pi]."""
+    lat1, lon1, lat2, lon2 = _radians(lat1, lon1, lat2, lon2)
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.arctan2(y, x)
+
+
+def enu(lat0, lon0, lat, lon, radius=EARTH_RADIUS):
+    """(east, north) in meters of lat/lon in the local tangent plane at
+    lat0/lon0. Accurate to centimeters over the few hundred meters between
+    a camera and the signs it sees."""
+    lat0, lon0, lat, lon = _radians(lat0, lon0, lat, lon)
+    east = (lon - lon0) * np.cos((lat + lat0) / 2) * radius
+    north = (lat - lat0) * radius
+    return east, north
+
+
+def signOffsets(heading, camLat, camLon, signLat, signLon):
+    """(Xd, Yd, distance) in meters of signs seen from a camera.
+
+    heading is the direction of travel in radians, as bearing() gives
+    it. Xd is the distance across it, negative to the left, and Yd along
+    it, negative behind, from the angle between the heading and the
+    bearing to the sign wrapped to [-pi, pi], as the sign panel shows them.
+    """
+    angle = (bearing(camLat, camLon, signLat, signLon) - heading + np.pi) % (2 * np.pi) - np.pi
+    distance = haversine(camLat, camLon, signLat, signLon)
+    return distance * np.sin(angle), distance * np.cos(angle), distance
@@ -0,0 +1,193 @@
+try:
+    from PyQt5.QtCore import QThread, pyqtSignal
+except ImportError:
+    from PyQt4.QtCore import QThread, pyqtSignal
+
+import os
+import sqlite3
+
+from libs.getExImgInfo import read_image_header
+
+INDEX_FILENAME = '.labelImgGeoIndex.db'
+# Rows written per transaction while (re)building the index
+INDEX_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    altitude REAL,
+    captureTime TEXT,
+    width INTEGER,
+    height INTEGER,
+    orientation INTEGER
+)
+"""
+_COLUMNS = ('path', 'mtime', 'size', 'latitude', 'longitude', 'altitude',
+            'captureTime', 'width', 'height', 'orientation')
+
+
+class GeoRecord(object):
+    __slots__ = _COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(_COLUMNS, values):
+            setattr(self, name, value)
+
+    @property
+    def geoInfo(self):
+        """(lat, lon, alt) like the image loader returns, or None."""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return (self.latitude, self.longitude, self.altitude)
+
+
+class GeoIndex(object):
+    """Persistent GPS/EXIF index of the images of one directory.
+
+    Rows are keyed by the path relative to the directory and are only
+    re-read from the image when its mtime or size changed.
+    """
+
+    def __init__(self, dirPath, indexPath=None):
+        self.dirPath = os.path.abspath(dirPath)
+        self.indexPath = indexPath or os.path.join(self.dirPath, INDEX_FILENAME)
+        conn = self._connect()
+        try:
+            conn.execute(_SCHEMA)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def defaultIndexPath(dirPath, saveDir=None):
+        """Next to the images if the folder is writable, else in saveDir as
+        <folder name>-.labelImgGeoIndex.db."""
+        if os.access(dirPath, os.W_OK):
+            return os.path.join(dirPath, INDEX_FILENAME)
+        if saveDir and os.access(saveDir, os.W_OK):
+            name = os.path.basename(os.path.normpath(dirPath)) + '-' + INDEX_FILENAME
+            return os.path.join(saveDir, name)
+        return None
+
+    def _connect(self):
+        # sqlite connections can't be shared between threads, open one per use.
+        conn = sqlite3.connect(self.indexPath, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.dirPath)
+
+    def lookup(self, path):
+        """Return the GeoRecord of path if it is indexed and up to date."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT %s FROM images WHERE path = ?' % ', '.join(_COLUMNS),
+                               (self._key(path),)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[1] != st.st_mtime or row[2] != st.st_size:
+            return None
+        return GeoRecord(*row)
+
+    def records(self):
+        """Return {absolute path: GeoRecord} of every indexed image."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT %s FROM images' % ', '.join(_COLUMNS)).fetchall()
+        finally:
+            conn.close()
+        result = {}
+        for row in rows:
+            record = GeoRecord(*row)
+            result[os.path.join(self.dirPath, record.path)] = record
+        return result
+
+    def update(self, paths, isCancelled=None, progress=None, prune=True):
+        """Index new and changed images among paths.
+
+        With prune, rows of images no longer in paths are dropped.
+        Returns the number of images that had to be (re)read.
+        """
+        conn = self._connect()
+        try:
+            known = dict((row[0], (row[1], row[2])) for row in
+                         conn.execute('SELECT path, mtime, size FROM images'))
+            seen = set()
+            pending = []
+            changed = 0
+            for count, path in enumerate(paths, 1):
+                if isCancelled is not None and isCancelled():
+                    break
+                key = self._key(path)
+                seen.add(key)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(key) == (st.st_mtime, st.st_size):
+                    continue
+                try:
+                    header = read_image_header(path)
+                except (IOError, OSError) as e:
+                    print('geo index: reading %s failed: %s' % (path, e))
+                    continue
+                gps = header.gps or (None, None, None)
+                pending.append((key, st.st_mtime, st.st_size, gps[0], gps[1], gps[2],
+                                header.captureTime, header.width, header.height, header.orientation))
+                changed += 1
+                if len(pending) >= INDEX_BATCH:
+                    self._write(conn, pending)
+                    pending = []
+                    if progress is not None:
+                        progress(count)
+            else:
+                if prune:
+                    stale = [(key,) for key in known if key not in seen]
+                    conn.executemany('DELETE FROM images WHERE path = ?', stale)
+            self._write(conn, pending)
+            conn.commit()
+        finally:
+            conn.close()
+        return changed
+
+    def _write(self, conn, rows):
+        conn.executemany('INSERT OR REPLACE INTO images (%s) VALUES (%s)' %
+                         (', '.join(_COLUMNS), ', '.join('?' * len(_COLUMNS))), rows)
+        conn.commit()
+
+
+class GeoIndexWorker(QThread):
+    """Fill a GeoIndex in the background."""
+    progress = pyqtSignal(int, int)
+    indexed = pyqtSignal(int)
+
+    def __init__(self, geoIndex, paths, parent=None):
+        super(GeoIndexWorker, self).__init__(parent)
+        self.geoIndex = geoIndex
+        self.paths = list(paths)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def isCancelled(self):
+        return self._cancelled
+
+    def run(self):
+        total = len(self.paths)
+        try:
+            changed = self.geoIndex.update(self.paths, self.isCancelled,
+                                           lambda done: self.progress.emit(done, total))
+        except sqlite3.Error as e:
+            print('geo index %s failed: %s' % (self.geoIndex.indexPath, e))
+            return
+        if not self._cancelled:
+            self.indexed.emit(changed)
@@ -1,5 +1,12 @@
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
+import struct
+from collections import namedtuple
+
+# PIL is imported where it is used, the header reader below does not
+# need it and is on the startup path.
+
+# Compact result of the header-only reader below
+GPSRecord = namedtuple('GPSRecord', ['latitude', 'longitude', 'altitude'])
+ImageHeader = namedtuple('ImageHeader', ['gps', 'captureTime', 'width', 'height', 'orientation'])
 
 #the following four functions are used to get the latitude & longitude
 def get_exif_data(image):
@@ -7,6 +14,7 @@ def get_exif_data(image):
     Returns a dictionary from the exif data of an PIL Image item. 
     Also converts the GPS Tags
     """
+    from PIL.ExifTags import TAGS, GPSTAGS
     exif_data = {}
     info = image._getexif()
     if info:
@@ -32,22 +40,23 @@ def _get_if_exist(data, key):
         return data[key]
     return None
 
+def _rational_to_float(value):
+    """
+    Old Pillow returns rationals as (num, den) tuples, newer ones
+    as IFDRational numbers
+    """
+    if isinstance(value, tuple):
+        return float(value[0]) / float(value[1])
+    return float(value)
+
 def _convert_to_degress(value):
     """
     Helper function to convert the GPS coordinates stored 
     in the EXIF to degress in float format
     """
-    d0 = value[0][0]
-    d1 = value[0][1]
-    d = float(d0) / float(d1)
-
-    m0 = value[1][0]
-    m1 = value[1][1]
-    m = float(m0) / float(m1)
-
-    s0 = value[2][0]
-    s1 = value[2][1]
-    s = float(s0) / float(s1)
+    d = _rational_to_float(value[0])
+    m = _rational_to_float(value[1])
+    s = _rational_to_float(value[2])
     return d + (m / 60.0) + (s / 3600.0)
 
 def get_lat_lon(exif_data):
@@ -57,6 +66,7 @@ def get_lat_lon(exif_data):
     """
     lat = None
     lon = None
+    alt = None
 
     if "GPSInfo" in exif_data:
         gps_info = exif_data["GPSInfo"]
@@ -78,6 +88,216 @@ def get_lat_lon(exif_data):
 
         if ('GPSAltitude' in gps_info):
             gps_altitude = _get_if_exist(gps_info, 'GPSAltitude')
-            alt = gps_altitude[0]/gps_altitude[1]
+            alt = _rational_to_float(gps_altitude)
         return lat,lon, alt
     return lat, lon
+
+
+# Header-only EXIF reader.
+#
+# PIL parses and translates every tag of the image just to give us three
+# values back. The functions below walk the JPEG markers up to the APP1
+# segment, and only read IFD0, the GPS IFD and a couple of tags out of it.
+
+_JPEG_SOI = b'\xff\xd8'
+_EXIF_HEADER = b'Exif\x00\x00'
+_TAG_GPS_IFD = 0x8825
+_GPS_LATITUDE_REF = 1
+_GPS_LATITUDE = 2
+_GPS_LONGITUDE_REF = 3
+_GPS_LONGITUDE = 4
+_GPS_ALTITUDE_REF = 5
+_GPS_ALTITUDE = 6
+_GPS_TIMESTAMP = 7
+_GPS_DATESTAMP = 29
+_TAG_ORIENTATION = 0x0112
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME_ORIGINAL = 0x9003
+# Start of frame markers, they carry the image size
+_JPEG_SOF_MARKERS = set(struct.pack('B', m) for m in range(0xc0, 0xd0)) - \
+    set([b'\xc4', b'\xc8', b'\xcc'])
+# TIFF field type -> (struct format, size in bytes)
+_TIFF_TYPES = {
+    1: ('B', 1), 2: ('s', 1), 3: ('H', 2), 4: ('L', 4), 5: ('LL', 8),
+    7: ('B', 1), 9: ('l', 4), 10: ('ll', 8),
+}
+
+def _read_jpeg_header(f, want_size=False):
+    """
+    Returns (TIFF payload of the APP1 Exif segment, (width, height)) of
+    the JPEG file object 'f'; either may be None. Seeks over every other
+    segment and stops at the Exif block unless 'want_size' asks to go on
+    to the frame header.
+    """
+    tiff = None
+    if f.read(2) != _JPEG_SOI:
+        return None, None
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return tiff, None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker or marker in (b'\xd9', b'\xda'):
+            # EOI or start of scan, the headers come before the image data
+            return tiff, None
+        if marker == b'\x01' or b'\xd0' <= marker <= b'\xd7':
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) != 2:
+            return tiff, None
+        length = struct.unpack('>H', length_bytes)[0] - 2
+        if marker == b'\xe1' and tiff is None:
+            segment = f.read(length)
+            if segment.startswith(_EXIF_HEADER):
+                tiff = segment[len(_EXIF_HEADER):]
+                if not want_size:
+                    return tiff, None
+        elif want_size and marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            return tiff, (width, height)
+        else:
+            f.seek(length, 1)
+
+def _read_ifd(tiff, offset, endian):
+    """
+    Returns {tag: (type, count, value_offset)} of the IFD at 'offset'
+    without decoding any of the values
+    """
+    entries = {}
+    count = struct.unpack_from(endian + 'H', tiff, offset)[0]
+    offset += 2
+    for _ in range(count):
+        tag, field_type, n = struct.unpack_from(endian + 'HHL', tiff, offset)
+        entries[tag] = (field_type, n, offset + 8)
+        offset += 12
+    return entries
+
+def _ifd_value(tiff, entry, endian):
+    field_type, count, value_offset = entry
+    fmt, size = _TIFF_TYPES[field_type]
+    if count * size > 4:
+        value_offset = struct.unpack_from(endian + 'L', tiff, value_offset)[0]
+    if field_type == 2:
+        return tiff[value_offset:value_offset + count].rstrip(b'\x00').decode('ascii', 'replace')
+    values = struct.unpack_from(endian + fmt * count, tiff, value_offset)
+    if field_type in (5, 10):
+        values = [float(values[i]) / values[i + 1] if values[i + 1] else 0.0
+                  for i in range(0, len(values), 2)]
+    return values
+
+def _parse_tiff(tiff):
+    """
+    Returns (ifd0 entries, endian) of a TIFF/EXIF block
+    """
+    endian = {b'II': '<', b'MM': '>'}.get(tiff[:2])
+    if endian is None or struct.unpack_from(endian + 'H', tiff, 2)[0] != 42:
+        return None, None
+    ifd0 = struct.unpack_from(endian + 'L', tiff, 4)[0]
+    return _read_ifd(tiff, ifd0, endian), endian
+
+def _gps_record(tiff, ifd0, endian):
+    if _TAG_GPS_IFD not in ifd0:
+        return None
+    gps_offset = _ifd_value(tiff, ifd0[_TAG_GPS_IFD], endian)[0]
+    gps = _read_ifd(tiff, gps_offset, endian)
+    if not all(t in gps for t in (_GPS_LATITUDE_REF, _GPS_LATITUDE,
+                                  _GPS_LONGITUDE_REF, _GPS_LONGITUDE)):
+        return None
+
+    d, m, s = _ifd_value(tiff, gps[_GPS_LATITUDE], endian)
+    lat = d + (m / 60.0) + (s / 3600.0)
+    if _ifd_value(tiff, gps[_GPS_LATITUDE_REF], endian) != 'N':
+        lat = 0 - lat
+    d, m, s = _ifd_value(tiff, gps[_GPS_LONGITUDE], endian)
+    lon = d + (m / 60.0) + (s / 3600.0)
+    if _ifd_value(tiff, gps[_GPS_LONGITUDE_REF], endian) != 'E':
+        lon = 0 - lon
+
+    alt = None
+    if _GPS_ALTITUDE in gps:
+        alt = _ifd_value(tiff, gps[_GPS_ALTITUDE], endian)[0]
+        if _GPS_ALTITUDE_REF in gps and _ifd_value(tiff, gps[_GPS_ALTITUDE_REF], endian)[0] == 1:
+            alt = 0 - alt  # below sea level
+    return GPSRecord(lat, lon, alt)
+
+def read_gps_header(source):
+    """
+    Returns a GPSRecord(latitude, longitude, altitude) read from the EXIF
+    header of a JPEG, or None if it has no GPS position. 'source' is a
+    file path or a binary file object; only the bytes up to the end of the
+    APP1 segment are read. Altitude is None when it is not recorded.
+    """
+    if hasattr(source, 'read'):
+        return _read_gps_header(source)
+    with open(source, 'rb') as f:
+        return _read_gps_header(f)
+
+def _read_gps_header(f):
+    try:
+        tiff, _ = _read_jpeg_header(f)
+        if not tiff:
+            return None
+        ifd0, endian = _parse_tiff(tiff)
+        if ifd0 is None:
+            return None
+        return _gps_record(tiff, ifd0, endian)
+    except (struct.error, KeyError, ValueError):
+        # truncated or corrupt EXIF block
+        return None
+
+
+def read_image_header(path):
+    """
+    Returns an ImageHeader(gps, captureTime, width, height, orientation)
+    without decoding the image. 'captureTime' is the EXIF
+    DateTimeOriginal as an ISO string, 'gps' a GPSRecord; both are None
+    when not recorded. Non JPEG files only get their size, from PIL.
+    """
+    with open(path, 'rb') as f:
+        try:
+            tiff, size = _read_jpeg_header(f, want_size=True)
+        except struct.error:
+            tiff, size = None, None
+    if size is None:
+        from PIL import Image
+        try:
+            size = Image.open(path).size
+        except (IOError, OSError):
+            size = (None, None)
+
+    gps = captureTime = orientation = None
+    if tiff:
+        try:
+            ifd0, endian = _parse_tiff(tiff)
+            if ifd0 is not None:
+                gps = _gps_record(tiff, ifd0, endian)
+                if _TAG_ORIENTATION in ifd0:
+                    orientation = _ifd_value(tiff, ifd0[_TAG_ORIENTATION], endian)[0]
+                captureTime = _capture_time(tiff, ifd0, endian)
+        except (struct.error, KeyError, ValueError):
+            pass
+    return ImageHeader(gps, captureTime, size[0], size[1], orientation)
+
+def _capture_time(tiff, ifd0, endian):
+    value = None
+    if _TAG_EXIF_IFD in ifd0:
+        exif_ifd = _read_ifd(tiff, _ifd_value(tiff, ifd0[_TAG_EXIF_IFD], endian)[0], endian)
+        if _TAG_DATETIME_ORIGINAL in exif_ifd:
+            value = _ifd_value(tiff, exif_ifd[_TAG_DATETIME_ORIGINAL], endian)
+    if not value and _TAG_DATETIME in ifd0:
+        value = _ifd_value(tiff, ifd0[_TAG_DATETIME], endian)
+    if not value and _TAG_GPS_IFD in ifd0:
+        # Survey cameras often only stamp the GPS fix time (UTC)
+        gps = _read_ifd(tiff, _ifd_value(tiff, ifd0[_TAG_GPS_IFD], endian)[0], endian)
+        if _GPS_DATESTAMP in gps and _GPS_TIMESTAMP in gps:
+            h, m, sec = _ifd_value(tiff, gps[_GPS_TIMESTAMP], endian)
+            value = '%s %02d:%02d:%06.3f' % (_ifd_value(tiff, gps[_GPS_DATESTAMP], endian), h, m, sec)
+    if not value:
+        return None
+    # EXIF writes 'YYYY:MM:DD HH:MM:SS'
+    return value[:10].replace(':', '-') + 'T' + value[11:]
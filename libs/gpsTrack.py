@@ -0,0 +1,114 @@
+"""Heading, speed and chainage of every frame of a folder from its GPS track."""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from libs import geo
+
+# Heading and speed are taken over this many frames on each side.
+SMOOTHING_FRAMES = 2
+# Moving less than this (meters) over the window gives no usable heading,
+# the frame keeps the heading of the last frame that moved.
+MIN_HEADING_DISTANCE = 1.0
+
+# heading: radians clockwise from north like geo.bearing(), None if unknown
+# speed: meters per second, None without capture times
+# chainage: meters along the track from its first frame
+# step: meters from the previous frame of the track
+TrackPoint = namedtuple('TrackPoint', ['heading', 'speed', 'chainage', 'step'])
+
+
+def _seconds(captureTimes):
+    """Capture times ('YYYY-MM-DDTHH:MM:SS[.fff]') as float seconds, or None
+    unless every frame has a readable one."""
+    try:
+        times = np.array(captureTimes, dtype='datetime64[ms]')
+    except (TypeError, ValueError):
+        return None
+    if np.isnat(times).any():
+        return None
+    return (times - times[0]).astype(float) / 1000.0
+
+
+class GpsTrack(object):
+    """The GPS positions of the frames of a folder as one ordered track.
+
+    Frames are ordered by capture time when every frame with a position
+    has one, otherwise by their order in the file list. Everything is
+    computed once, over the whole track, so the values of a frame do not
+    depend on which image was looked at before it.
+    """
+
+    def __init__(self, paths, latitudes, longitudes, captureTimes=None, smoothing=SMOOTHING_FRAMES):
+        self.paths = list(paths)
+        lat = np.asarray(latitudes, dtype=float)
+        lon = np.asarray(longitudes, dtype=float)
+        seconds = _seconds(captureTimes) if captureTimes is not None and len(self.paths) else None
+        if seconds is not None:
+            order = np.argsort(seconds, kind='stable')
+            self.paths = [self.paths[i] for i in order]
+            lat, lon, seconds = lat[order], lon[order], seconds[order]
+        self._rows = dict((os.path.abspath(path), row) for row, path in enumerate(self.paths))
+        self.latitudes, self.longitudes = lat, lon
+        count = len(self.paths)
+
+        steps = geo.haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]) if count > 1 else np.zeros(0)
+        self.steps = np.concatenate(([0.0], steps))
+        self.chainage = np.cumsum(self.steps)
+
+        # Window of +-smoothing frames around every frame, cut at the ends
+        rows = np.arange(count)
+        first = np.maximum(rows - smoothing, 0)
+        last = np.minimum(rows + smoothing, count - 1)
+        east, north = geo.enu(lat[0], lon[0], lat, lon) if count else (np.zeros(0), np.zeros(0))
+        dEast, dNorth = east[last] - east[first], north[last] - north[first]
+        moved = np.hypot(dEast, dNorth) >= MIN_HEADING_DISTANCE
+        headings = np.arctan2(dEast, dNorth)
+        # Frames standing still take the heading of the closest earlier frame
+        # that moved, leading ones the first heading there is.
+        if moved.any():
+            source = np.maximum.accumulate(np.where(moved, rows, -1))
+            source[source < 0] = np.argmax(moved)
+            self.headings = headings[source]
+        else:
+            self.headings = np.full(count, np.nan)
+
+        if seconds is not None:
+            elapsed = seconds[last] - seconds[first]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.speeds = np.where(elapsed > 0, (self.chainage[last] - self.chainage[first]) / elapsed, np.nan)
+        else:
+            self.speeds = np.full(count, np.nan)
+
+    @classmethod
+    def fromGeoIndex(cls, geoIndex, paths, smoothing=SMOOTHING_FRAMES):
+        """Track of the frames among paths that have a position in geoIndex."""
+        records = geoIndex.records()
+        frames = []
+        for path in paths:
+            record = records.get(os.path.abspath(path))
+            if record is not None and record.geoInfo is not None:
+                frames.append((path, record.latitude, record.longitude, record.captureTime))
+        if not frames:
+            return cls([], [], [])
+        framePaths, lats, lons, times = zip(*frames)
+        if any(time is None for time in times):
+            times = None
+        return cls(framePaths, lats, lons, times, smoothing)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._rows
+
+    def frame(self, path):
+        """The TrackPoint of path, or None if it is not on the track."""
+        row = self._rows.get(os.path.abspath(path))
+        if row is None:
+            return None
+        heading, speed = self.headings[row], self.speeds[row]
+        return TrackPoint(None if np.isnan(heading) else float(heading),
+                          None if np.isnan(speed) else float(speed),
+                          float(self.chainage[row]), float(self.steps[row]))
@@ -0,0 +1,62 @@
+try:
+    from PyQt5.QtGui import QImage
+except ImportError:
+    from PyQt4.QtGui import QImage
+
+import os
+from io import BytesIO
+
+from libs.getExImgInfo import read_gps_header
+from libs.tiledImage import TiledImage, TILED_MIN_PIXELS, imageReader
+
+
+class ImageRecord(object):
+    """Everything the window needs to know about one image file.
+
+    Built from a single read of the file, callers should reuse it instead
+    of opening the image again.
+    """
+
+    def __init__(self, filePath, mtime, imageData, image, geoInfo):
+        self.filePath = filePath
+        self.mtime = mtime
+        self.imageData = imageData
+        self.image = image
+        self.geoInfo = geoInfo
+        self.width = image.width()
+        self.height = image.height()
+        self.depth = 1 if image.isGrayscale() else 3
+
+    def isNull(self):
+        return self.image.isNull()
+
+    @property
+    def shape(self):
+        # Same layout PascalVocWriter expects for imgSize
+        return [self.height, self.width, self.depth]
+
+
+def readGeoInfo(imageData):
+    """Return the GPSRecord in the EXIF header of already read image bytes."""
+    return read_gps_header(BytesIO(imageData))
+
+
+def decodeImage(imageData):
+    """The QImage of image bytes, or a TiledImage for very large images,
+    which is never decoded at full size. Safe off the UI thread."""
+    size = imageReader(imageData).size()
+    if size.isValid() and size.width() * size.height() >= TILED_MIN_PIXELS:
+        return TiledImage(imageData)
+    return QImage.fromData(imageData)
+
+
+def loadImageRecord(filePath):
+    """Read filePath once and decode pixels, size and GPS from those bytes.
+
+    Only QImage is used here, so it is safe to run off the UI thread.
+    """
+    mtime = os.path.getmtime(filePath)
+    with open(filePath, 'rb') as f:
+        imageData = f.read()
+    image = decodeImage(imageData)
+    return ImageRecord(filePath, mtime, imageData, image, readGeoInfo(imageData))
@@ -29,7 +29,8 @@ class LabelFile(object):
         self.verified = False
 
     def savePascalVocFormat(self, filename, shapes, imagePath, imageData,
-                            lineColor=None, fillColor=None, databaseSrc=None, objects = None, geoInfo = None):
+                            lineColor=None, fillColor=None, databaseSrc=None, objects = None, geoInfo = None,
+                            imageShape = None):
         """
         :param filename:
         :param shapes:
@@ -39,6 +40,7 @@ class LabelFile(object):
         :param fillColor:
         :param databaseSrc:
         :param objectItems: is the objectItems data for xml file to write
+        :param imageShape: [height, width, depth] of the image if already known
         :return:
         """
         imgFolderPath = os.path.dirname(imagePath)
@@ -47,10 +49,11 @@ class LabelFile(object):
         #imgFileNameWithoutExt = os.path.splitext(imgFileName)[0]
         # Read from file path because self.imageData might be empty if saving to
         # Pascal format
-        image = QImage()
-        image.load(imagePath)
-        imageShape = [image.height(), image.width(),
-                      1 if image.isGrayscale() else 3]
+        if imageShape is None:
+            image = QImage()
+            image.load(imagePath)
+            imageShape = [image.height(), image.width(),
+                          1 if image.isGrayscale() else 3]
         writer = PascalVocWriter(imgFolderName, imgFileName,
                                  imageShape, localImgPath=imagePath)
         writer.verified = self.verified
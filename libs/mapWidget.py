@@ -0,0 +1,297 @@
+try:
+    from PyQt5.QtGui import *
+    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import *
+except ImportError:
+    from PyQt4.QtGui import *
+    from PyQt4.QtCore import *
+
+import json
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+TILE_SIZE = 256
+MIN_ZOOM = 2
+MAX_ZOOM = 19
+DEFAULT_ZOOM = 17
+# Raster tiles kept as pixmaps
+TILE_CACHE_TILES = 256
+# Raster tiles are read from <map data dir>/<z>/<x>/<y>.<ext>, the layout
+# of slippy map tile caches.
+TILE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+VECTOR_EXTENSIONS = ('.geojson', '.json')
+# Point labels of the layers are drawn from this zoom on
+LABEL_ZOOM = 18
+# Pixels around the view in which layer points are still drawn: the
+# radius of a point, and on the left the width of a label
+POINT_MARGIN = 4
+LABEL_MARGIN = 200
+
+TRACK_COLOR = QColor(0, 90, 200)
+CURRENT_COLOR = QColor(220, 0, 0)
+SIGN_COLOR = QColor(255, 160, 0)
+LAYER_COLORS = (QColor(0, 150, 0), QColor(140, 0, 160), QColor(0, 150, 150), QColor(120, 80, 0))
+
+
+def mercator(latitude, longitude):
+    """Web Mercator position of lat/lon (degrees) in [0, 1) x [0, 1)."""
+    lat = np.radians(np.clip(np.asarray(latitude, dtype=float), -85.05112878, 85.05112878))
+    x = (np.asarray(longitude, dtype=float) + 180.0) / 360.0
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2
+    return x, y
+
+
+class VectorLayer(object):
+    """Points and lines of a GeoJSON file, projected once."""
+
+    def __init__(self, name, points, lines, labels):
+        self.name = name
+        # (N, 2) mercator positions
+        self.points = points
+        self.labels = labels
+        # list of (M, 2) mercator polylines
+        self.lines = lines
+        self._paths = {}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = json.loads(f.read().decode('utf8'))
+        features = data.get('features', [data]) if isinstance(data, dict) else []
+        points, labels, lines = [], [], []
+        for feature in features:
+            geometry = feature.get('geometry') or {}
+            props = feature.get('properties') or {}
+            kind, coords = geometry.get('type'), geometry.get('coordinates')
+            if kind == 'Point':
+                coords, kind = [coords], 'MultiPoint'
+            if kind == 'MultiPoint':
+                for lon, lat in (c[:2] for c in coords):
+                    points.append((lon, lat))
+                    labels.append(props.get('MUTCDCode') or props.get('name') or '')
+            elif kind in ('LineString', 'MultiLineString'):
+                for line in ([coords] if kind == 'LineString' else coords):
+                    line = np.asarray([c[:2] for c in line], dtype=float)
+                    if len(line):
+                        lines.append(np.column_stack(mercator(line[:, 1], line[:, 0])))
+        if points:
+            lonlat = np.asarray(points, dtype=float)
+            points = np.column_stack(mercator(lonlat[:, 1], lonlat[:, 0]))
+        else:
+            points = np.zeros((0, 2))
+        return cls(os.path.basename(path), points, lines, labels)
+
+    def pointsIn(self, worldSize, left, top, right, bottom):
+        """(pixel positions, indices) of the points in the rect, in pixels
+        of a world worldSize wide."""
+        points = self.points * worldSize
+        inside = (points[:, 0] >= left) & (points[:, 0] <= right) & \
+                 (points[:, 1] >= top) & (points[:, 1] <= bottom)
+        indices = np.flatnonzero(inside)
+        return points[indices], indices
+
+    def linePath(self, worldSize):
+        path = self._paths.get(worldSize)
+        if path is None:
+            path = QPainterPath()
+            for line in self.lines:
+                path.addPolygon(QPolygonF([QPointF(x, y) for x, y in line * worldSize]))
+            self._paths = {worldSize: path}
+        return path
+
+
+class MapWidget(QWidget):
+    """A map drawn from local data: raster tiles and GeoJSON layers of a
+    map data folder, the camera track, the current frame and signs.
+
+    Changing the frame only moves the view, nothing is reloaded.
+    """
+    zoomChanged = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super(MapWidget, self).__init__(parent)
+        self.zoom = DEFAULT_ZOOM
+        # View center in mercator units
+        self.center = (0.5, 0.5)
+        self.dataDir = None
+        self.layers = []
+        self._tiles = OrderedDict()
+        self._track = np.zeros((0, 2))
+        self._trackPaths = {}
+        self._current = None
+        self._signs = []
+        self._dragStart = None
+        self.setMinimumHeight(100)
+        self.setMouseTracking(False)
+        self.setAutoFillBackground(True)
+        pal = self.palette()
+        pal.setColor(self.backgroundRole(), QColor(236, 232, 224))
+        self.setPalette(pal)
+
+    def setDataDir(self, dataDir):
+        """Use the raster tiles and GeoJSON files of dataDir."""
+        self.dataDir = dataDir if dataDir and os.path.isdir(dataDir) else None
+        self._tiles.clear()
+        self.layers = []
+        if self.dataDir is not None:
+            for name in sorted(os.listdir(self.dataDir)):
+                if name.lower().endswith(VECTOR_EXTENSIONS):
+                    try:
+                        self.layers.append(VectorLayer.load(os.path.join(self.dataDir, name)))
+                    except (IOError, ValueError) as e:
+                        print('map layer %s failed: %s' % (name, e))
+        self.update()
+
+    def setTrack(self, latitudes, longitudes):
+        x, y = mercator(latitudes, longitudes)
+        self._track = np.column_stack((x, y)) if len(np.atleast_1d(x)) else np.zeros((0, 2))
+        self._trackPaths = {}
+        self.update()
+
+    def setCurrent(self, latitude, longitude, heading=None):
+        """Mark the camera position, heading in radians clockwise from north,
+        and pan to it."""
+        x, y = mercator(latitude, longitude)
+        self._current = (float(x), float(y), heading)
+        self.center = (float(x), float(y))
+        self.update()
+
+    def clearCurrent(self):
+        self._current = None
+        self.update()
+
+    def setSigns(self, signs):
+        """signs: (latitude, longitude, label) of the signs of the frame."""
+        self._signs = []
+        for lat, lon, label in signs:
+            x, y = mercator(lat, lon)
+            self._signs.append((float(x), float(y), label))
+        self.update()
+
+    def centerOn(self, latitude, longitude):
+        x, y = mercator(latitude, longitude)
+        self.center = (float(x), float(y))
+        self.update()
+
+    def setZoom(self, zoom):
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, int(zoom)))
+        if zoom != self.zoom:
+            self.zoom = zoom
+            self.update()
+            self.zoomChanged.emit(zoom)
+
+    def worldSize(self):
+        return TILE_SIZE << self.zoom
+
+    def origin(self):
+        """World pixel at the top left corner of the widget."""
+        size = self.worldSize()
+        return QPointF(self.center[0] * size - self.width() / 2.0, self.center[1] * size - self.height() / 2.0)
+
+    def _tile(self, x, y):
+        key = (self.zoom, x, y)
+        if key in self._tiles:
+            tile = self._tiles.pop(key)
+            self._tiles[key] = tile
+            return tile
+        tile = None
+        for ext in TILE_EXTENSIONS:
+            path = os.path.join(self.dataDir, str(self.zoom), str(x), str(y) + ext)
+            if os.path.isfile(path):
+                tile = QPixmap(path)
+                break
+        # Missing tiles are cached too, as None
+        self._tiles[key] = tile
+        while len(self._tiles) > TILE_CACHE_TILES:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def _trackPath(self, size):
+        path = self._trackPaths.get(size)
+        if path is None:
+            path = QPainterPath()
+            path.addPolygon(QPolygonF([QPointF(x, y) for x, y in self._track * size]))
+            self._trackPaths = {size: path}
+        return path
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.setRenderHint(QPainter.Antialiasing)
+        origin = self.origin()
+        size = self.worldSize()
+        if self.dataDir is not None:
+            count = 1 << self.zoom
+            left, top = int(origin.x() // TILE_SIZE), int(origin.y() // TILE_SIZE)
+            right = int((origin.x() + self.width()) // TILE_SIZE)
+            bottom = int((origin.y() + self.height()) // TILE_SIZE)
+            for ty in range(max(top, 0), min(bottom, count - 1) + 1):
+                for tx in range(left, right + 1):
+                    tile = self._tile(tx % count, ty)
+                    if tile is not None:
+                        p.drawPixmap(QPointF(tx * TILE_SIZE - origin.x(), ty * TILE_SIZE - origin.y()), tile)
+
+        p.translate(-origin)
+        for index, layer in enumerate(self.layers):
+            color = LAYER_COLORS[index % len(LAYER_COLORS)]
+            p.setPen(QPen(color, 2))
+            p.setBrush(Qt.NoBrush)
+            p.drawPath(layer.linePath(size))
+            p.setBrush(color)
+            # Only the points in view are drawn, a layer may cover a county
+            showLabels = self.zoom >= LABEL_ZOOM
+            left = origin.x() - (LABEL_MARGIN if showLabels else POINT_MARGIN)
+            points, indices = layer.pointsIn(size, left, origin.y() - POINT_MARGIN,
+                                             origin.x() + self.width() + POINT_MARGIN,
+                                             origin.y() + self.height() + POINT_MARGIN)
+            for (x, y), index in zip(points, indices):
+                p.drawEllipse(QPointF(x, y), 3, 3)
+                if showLabels and layer.labels[index]:
+                    p.drawText(QPointF(x + 5, y + 4), layer.labels[index])
+
+        if len(self._track) > 1:
+            p.setPen(QPen(TRACK_COLOR, 2))
+            p.setBrush(Qt.NoBrush)
+            p.drawPath(self._trackPath(size))
+
+        p.setPen(QPen(Qt.black, 1))
+        p.setBrush(SIGN_COLOR)
+        for x, y, label in self._signs:
+            point = QPointF(x * size, y * size)
+            p.drawEllipse(point, 5, 5)
+            if label:
+                p.drawText(point + QPointF(7, 4), label)
+
+        if self._current is not None:
+            x, y, heading = self._current
+            point = QPointF(x * size, y * size)
+            p.setPen(QPen(CURRENT_COLOR, 2))
+            if heading is not None:
+                p.drawLine(point, point + QPointF(20 * math.sin(heading), -20 * math.cos(heading)))
+            p.setBrush(CURRENT_COLOR)
+            p.drawEllipse(point, 5, 5)
+        p.end()
+
+    def mousePressEvent(self, ev):
+        if ev.button() == Qt.LeftButton:
+            self._dragStart = (ev.pos(), self.center)
+
+    def mouseMoveEvent(self, ev):
+        if self._dragStart is None:
+            return
+        start, center = self._dragStart
+        delta = ev.pos() - start
+        size = float(self.worldSize())
+        self.center = (center[0] - delta.x() / size, min(1.0, max(0.0, center[1] - delta.y() / size)))
+        self.update()
+
+    def mouseReleaseEvent(self, ev):
+        self._dragStart = None
+
+    def wheelEvent(self, ev):
+        delta = ev.delta() if hasattr(ev, 'delta') else ev.angleDelta().y()
+        steps = int(delta / 120)
+        if steps:
+            self.setZoom(self.zoom + steps)
@@ -1,14 +1,231 @@
 #!/usr/bin/env python
 # -*- coding: utf8 -*-
+import os
 import sys
-from xml.etree import ElementTree
-from xml.etree.ElementTree import Element, SubElement
+import uuid
+import shutil
 from lxml import etree
-import codecs
+from lxml.etree import Element, SubElement
+from collections import namedtuple
+from datetime import date, datetime
 
 XML_EXT = '.xml'
 ENCODE_METHOD = 'utf-8'
 
+# The sign attributes stored with every object, in the order they are written.
+# Adding an attribute only takes a new line here.
+SignField = namedtuple('SignField', ['name', 'type', 'default'])
+SIGN_FIELDS = (
+    SignField('latitude', float, None),
+    SignField('longitude', float, None),
+    SignField('altitude', float, None),
+    SignField('superclass', str, ''),
+    SignField('subclass', str, ''),
+    SignField('SignMainGeneralOID', int, None),
+    SignField('ID', int, None),
+    SignField('LaneDirection', str, ''),
+    SignField('Marker', str, ''),
+    SignField('City', str, ''),
+    SignField('County', str, ''),
+    SignField('District', str, ''),
+    SignField('STREETNAME', str, ''),
+    SignField('MUTCDCode', str, ''),
+    SignField('Retired', str, ''),
+    SignField('Replaced', str, ''),
+    SignField('SignAge', int, None),
+    SignField('TWN_TID', str, ''),
+    SignField('TWN_MI', float, None),
+    SignField('QCFLAG', str, ''),
+    SignField('MIN_TWN_FMI', float, None),
+    SignField('MAX_TWN_TMI', float, None),
+    SignField('SR_SID', str, ''),
+    SignField('OFFSET', float, None),
+    SignField('PublishDate', date, None),
+)
+# Written inside <location> instead of directly under <object>
+LOCATION_FIELDS = ('latitude', 'longitude', 'altitude')
+_SIGN_TYPES = dict((field.name, field.type) for field in SIGN_FIELDS)
+_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S',
+                 '%Y/%m/%d %H:%M:%S')
+
+
+def _parseDate(value):
+    value = value.strip()
+    for dateFormat in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, dateFormat).date()
+        except ValueError:
+            pass
+    raise ValueError('unknown date format: %s' % value)
+
+
+def convertSignField(name, value):
+    """Convert value to the declared type of field name.
+
+    Empty values give the field default; values that do not convert are
+    kept as they are so nothing typed by the user is lost.
+    """
+    fieldType = _SIGN_TYPES[name]
+    if value is None or value == '' or value == 'None':
+        return None if fieldType is not str else ''
+    if isinstance(value, fieldType) and not isinstance(value, bool):
+        return value
+    try:
+        if fieldType is date:
+            return value.date() if isinstance(value, datetime) else _parseDate(value)
+        if fieldType is int and isinstance(value, float):
+            return int(value) if value.is_integer() else value
+        if fieldType is int and isinstance(value, str):
+            return int(value.strip())
+        return fieldType(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def signFieldText(value):
+    """Text written to the XML for a converted field value."""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class SignRecord(object):
+    """The typed sign attributes of one object.
+
+    Supports the dict style access (record['subclass']) the window code
+    uses; only the fields of SIGN_FIELDS exist.
+    """
+    __slots__ = tuple(field.name for field in SIGN_FIELDS)
+
+    def __init__(self, values=None):
+        for field in SIGN_FIELDS:
+            setattr(self, field.name, field.default)
+        if values:
+            self.update(values)
+
+    def __getitem__(self, name):
+        if name not in _SIGN_TYPES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in _SIGN_TYPES:
+            raise KeyError(name)
+        setattr(self, name, convertSignField(name, value))
+
+    def __contains__(self, name):
+        return name in _SIGN_TYPES
+
+    def get(self, name, default=None):
+        return getattr(self, name) if name in _SIGN_TYPES else default
+
+    def keys(self):
+        return [field.name for field in SIGN_FIELDS]
+
+    def items(self):
+        return [(field.name, getattr(self, field.name)) for field in SIGN_FIELDS]
+
+    def update(self, values):
+        """Set the known fields of values (a dict or SignRecord), ignore the rest."""
+        for name, value in values.items():
+            if name in _SIGN_TYPES:
+                self[name] = value
+
+    def copy(self):
+        return SignRecord(self)
+
+    def invalidFields(self):
+        """Names of the fields whose value did not convert to its type."""
+        return [field.name for field in SIGN_FIELDS
+                if getattr(self, field.name) is not None and
+                not isinstance(getattr(self, field.name), field.type)]
+
+    def __repr__(self):
+        return 'SignRecord(%r)' % dict((name, value) for name, value in self.items() if value not in (None, ''))
+
+
+def readSignRecord(objectElement):
+    """Build the SignRecord of an <object> element; missing fields keep their default."""
+    record = SignRecord()
+    location = objectElement.find('location')
+    for field in SIGN_FIELDS:
+        parent = location if field.name in LOCATION_FIELDS else objectElement
+        elem = parent.find(field.name) if parent is not None else None
+        if elem is not None and elem.text is not None:
+            record[field.name] = elem.text.strip()
+    return record
+
+
+def isTruncated(xmin, ymin, xmax, ymax, width, height):
+    """A box is truncated when it touches the image border."""
+    return int(ymax) == int(height) or int(ymin) == 1 or \
+        int(xmax) == int(width) or int(xmin) == 1
+
+
+def indentXml(elem, level=0):
+    """Indent elem in place with one tab per level, one element per line.
+
+    Whitespace-only text and tails are replaced, text content is left alone.
+    """
+    indent = '\n' + level * '\t'
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = indent + '\t'
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = indent
+        for child in elem:
+            indentXml(child, level + 1)
+        if not child.tail or not child.tail.strip():
+            child.tail = indent
+    elif level and (not elem.tail or not elem.tail.strip()):
+        elem.tail = indent
+
+
+def writeFileAtomic(targetFile, data):
+    """Write bytes to targetFile through a temporary file and a rename.
+
+    A crash or a full disk leaves either the old or the new file, never
+    a truncated one.
+    """
+    targetFile = os.path.abspath(targetFile)
+    dirName, baseName = os.path.split(targetFile)
+    tmpFile = os.path.join(dirName, '.%s.%s.tmp' % (baseName, uuid.uuid4().hex[:8]))
+    try:
+        with open(tmpFile, 'wb') as out_file:
+            out_file.write(data)
+            out_file.flush()
+            os.fsync(out_file.fileno())
+        if os.path.exists(targetFile):
+            shutil.copymode(targetFile, tmpFile)
+        if hasattr(os, 'replace'):
+            os.replace(tmpFile, targetFile)
+        else:
+            # Python 2: rename can't overwrite on Windows
+            if os.name == 'nt' and os.path.exists(targetFile):
+                os.remove(targetFile)
+            os.rename(tmpFile, targetFile)
+    except Exception:
+        if os.path.exists(tmpFile):
+            os.remove(tmpFile)
+        raise
+
+
+if hasattr(etree, 'indent'):
+    # lxml >= 4.5 does the same in C
+    def indentXml(elem, level=0):
+        etree.indent(elem, space='\t', level=level)
+        if level == 0:
+            elem.tail = '\n'
+
+
+def writeXmlTree(root, targetFile):
+    """Write an lxml annotation tree formatted like PascalVocWriter.save."""
+    indentXml(root)
+    writeFileAtomic(targetFile, etree.tostring(root, encoding=ENCODE_METHOD))
+
+
 class PascalVocWriter:
 
     def __init__(self, foldername, filename, imgSize,databaseSrc='Unknown', localImgPath=None):
@@ -27,12 +244,8 @@ class PascalVocWriter:
         """
             Return a pretty-printed XML string for the Element.
         """
-        rough_string = ElementTree.tostring(elem, 'utf8')
-        root = etree.fromstring(rough_string)
-        return etree.tostring(root, pretty_print=True, encoding=ENCODE_METHOD).replace("  ".encode(), "\t".encode())
-        # minidom does not support UTF-8
-        '''reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent="\t", encoding=ENCODE_METHOD)'''
+        indentXml(elem)
+        return etree.tostring(elem, encoding=ENCODE_METHOD)
 
     def genXML(self):
         """
@@ -91,109 +304,9 @@ class PascalVocWriter:
         bndbox = {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
         bndbox['name'] = name
         bndbox['difficult'] = difficult
-        try:
-            bndbox['latitude'] = objectItems['latitude']
-        except:
-            bndbox['latitude'] = ""
-        try:
-            bndbox['longitude'] = objectItems['longitude']
-        except:
-            bndbox['longitude'] = ""
-        try:
-            bndbox['altitude'] = objectItems['altitude']
-        except:
-            bndbox['altitude'] = ""
-        try:
-            bndbox['superclass'] = objectItems['superclass']
-        except:
-            bndbox['superclass'] = ""
-        try:
-            bndbox['subclass'] = objectItems['subclass']
-        except:
-            bndbox['subclass'] = ""
-        try:
-            bndbox['SignMainGeneralOID'] = objectItems['SignMainGeneralOID']
-        except:
-            bndbox['SignMainGeneralOID'] = ""
-        try:
-            bndbox['ID'] = objectItems['ID']
-        except:
-            bndbox['ID'] = ""
-        try:
-            bndbox['LaneDirection'] = objectItems['LaneDirection']
-        except:
-            bndbox['LaneDirection'] = ""
-        try:
-            bndbox['Marker'] = objectItems['Marker']
-        except:
-            bndbox['Marker'] = ""
-        try:
-            bndbox['City'] = objectItems['City']
-        except:
-            bndbox['City'] = ""
-        try:
-            bndbox['County'] = objectItems['County']
-        except:
-            bndbox['County'] = ""
-        try:
-            bndbox['District'] = objectItems['District']
-        except:
-            bndbox['District'] = ""
-        try:
-            bndbox['STREETNAME'] = objectItems['STREETNAME']
-        except:
-            bndbox['STREETNAME'] = ""
-        try:
-            bndbox['MUTCDCode'] = objectItems['MUTCDCode']
-        except:
-            bndbox['MUTCDCode'] = ""
-        try:
-            bndbox['Retired'] = objectItems['Retired']
-        except:
-            bndbox['Retired'] = ""
-        try:
-            bndbox['Replaced'] = objectItems['Replaced']
-        except:
-            bndbox['Replaced'] = ""
-        try:
-            bndbox['SignAge'] = objectItems['SignAge']
-        except:
-            bndbox['SignAge'] = ""
-        try:
-            bndbox['TWN_TID'] = objectItems['TWN_TID']
-        except:
-            bndbox['TWN_TID'] = ""
-        try:
-            bndbox['TWN_MI'] = objectItems['TWN_MI']
-        except:
-            bndbox['TWN_MI'] = ""
-        try:
-            bndbox['QCFLAG'] = objectItems['QCFLAG']
-        except:
-            bndbox['QCFLAG'] = ""
-        try:
-            bndbox['MIN_TWN_FMI'] = objectItems['MIN_TWN_FMI']
-        except:
-            bndbox['MIN_TWN_FMI'] = ""
-        try:
-            bndbox['MAX_TWN_TMI'] = objectItems['MAX_TWN_TMI']
-        except:
-            bndbox['MAX_TWN_TMI'] = ""
-        try:
-            bndbox['SR_SID'] = objectItems['SR_SID']
-        except:
-            bndbox['SR_SID'] = ""
-        try:
-            bndbox['OFFSET'] = objectItems['OFFSET']
-        except:
-            bndbox['OFFSET'] = ""
-        try:
-            bndbox['PublishDate'] = objectItems['PublishDate']
-        except:
-            bndbox['PublishDate'] = ""
+        bndbox['sign'] = SignRecord(objectItems)
         self.boxlist.append(bndbox)
 
-
     def appendObjects(self, top):
         for each_object in self.boxlist:
             object_item = SubElement(top, 'object')
@@ -206,72 +319,21 @@ class PascalVocWriter:
             pose = SubElement(object_item, 'pose')
             pose.text = "Unspecified"
             truncated = SubElement(object_item, 'truncated')
-            if int(each_object['ymax']) == int(self.imgSize[0]) or (int(each_object['ymin'])== 1):
-                truncated.text = "1" # max == height or min
-            elif (int(each_object['xmax'])==int(self.imgSize[1])) or (int(each_object['xmin'])== 1):
-                truncated.text = "1" # max == width or min
+            if isTruncated(each_object['xmin'], each_object['ymin'], each_object['xmax'], each_object['ymax'],
+                           self.imgSize[1], self.imgSize[0]):
+                truncated.text = "1"
             else:
                 truncated.text = "0"
             difficult = SubElement(object_item, 'difficult')
             difficult.text = str( bool(each_object['difficult']) & 1 )
 
             # add new xml labels
+            sign = each_object['sign']
             loaction_item = SubElement(object_item, 'location')
-            latitude = SubElement(loaction_item, 'latitude')
-            latitude.text = str(each_object['latitude'])
-            longitude = SubElement(loaction_item, 'longitude')
-            longitude.text = str(each_object['longitude'])
-
-            altitude = SubElement(loaction_item, 'altitude')
-            altitude.text = str(each_object['altitude'])
-
-            try:
-                superclass = SubElement(object_item, 'superclass')
-                superclass.text = str(each_object['superclass'])
-                subclass = SubElement(object_item, 'subclass')
-                subclass.text = str(each_object['subclass'])
-                SignMainGeneralOID = SubElement(object_item, 'SignMainGeneralOID')
-                SignMainGeneralOID.text = str(each_object['SignMainGeneralOID'])
-                ID = SubElement(object_item, 'ID')
-                ID.text = str(each_object['ID'])
-                LaneDirection = SubElement(object_item, 'LaneDirection')
-                LaneDirection.text = str(each_object['LaneDirection'])
-                Marker = SubElement(object_item, 'Marker')
-                Marker.text = str(each_object['Marker'])
-                City = SubElement(object_item, 'City')
-                City.text = str(each_object['City'])
-                County = SubElement(object_item, 'County')
-                County.text = str(each_object['County'])
-                District = SubElement(object_item, 'District')
-                District.text = str(each_object['District'])
-                STREETNAME = SubElement(object_item, 'STREETNAME')
-                STREETNAME.text = str(each_object['STREETNAME'])
-                MUTCDCode = SubElement(object_item, 'MUTCDCode')
-                MUTCDCode.text = str(each_object['MUTCDCode'])
-                Retired = SubElement(object_item, 'Retired')
-                Retired.text = str(each_object['Retired'])
-                Replaced = SubElement(object_item, 'Replaced')
-                Replaced.text = str(each_object['Replaced'])
-                SignAge = SubElement(object_item, 'SignAge')
-                SignAge.text = str(each_object['SignAge'])
-                TWN_TID = SubElement(object_item, 'TWN_TID')
-                TWN_TID.text = str(each_object['TWN_TID'])
-                TWN_MI = SubElement(object_item, 'TWN_MI')
-                TWN_MI.text = str(each_object['TWN_MI'])
-                QCFLAG = SubElement(object_item, 'QCFLAG')
-                QCFLAG.text = str(each_object['QCFLAG'])
-                MIN_TWN_FMI = SubElement(object_item, 'MIN_TWN_FMI')
-                MIN_TWN_FMI.text = str(each_object['MIN_TWN_FMI'])
-                MAX_TWN_TMI = SubElement(object_item, 'MAX_TWN_TMI')
-                MAX_TWN_TMI.text = str(each_object['MAX_TWN_TMI'])
-                SR_SID = SubElement(object_item, 'SR_SID')
-                SR_SID.text = str(each_object['SR_SID'])
-                OFFSET = SubElement(object_item, 'OFFSET')
-                OFFSET.text = str(each_object['OFFSET'])
-                PublishDate = SubElement(object_item, 'PublishDate')
-                PublishDate.text = str(each_object['PublishDate'])
-            except Exception as e:
-                print('Exception append:',str(e))
+            for field in SIGN_FIELDS:
+                parent = loaction_item if field.name in LOCATION_FIELDS else object_item
+                # None rather than '' keeps empty fields as <tag/>
+                SubElement(parent, field.name).text = signFieldText(getattr(sign, field.name)) or None
 
             # bndbox xml labels
             bndbox = SubElement(object_item, 'bndbox')
@@ -287,63 +349,68 @@ class PascalVocWriter:
     def save(self, targetFile=None):
         root = self.genXML()
         self.appendObjects(root)
-        out_file = None
         if targetFile is None:
-            out_file = codecs.open(
-                self.filename + XML_EXT, 'w', encoding=ENCODE_METHOD)
-        else:
-            out_file = codecs.open(targetFile, 'w', encoding=ENCODE_METHOD)
-
-        prettifyResult = self.prettify(root)
-        out_file.write(prettifyResult.decode('utf8'))
-        out_file.close()
+            targetFile = self.filename + XML_EXT
+        writeFileAtomic(targetFile, self.prettify(root))
 
 
 class PascalVocReader:
 
     def __init__(self, filepath):
         # shapes type:
-        # [labbel, [(x1,y1), (x2,y2), (x3,y3), (x4,y4)], color, color, difficult]
+        # [labbel, [(x1,y1), (x2,y2), (x3,y3), (x4,y4)], color, color, difficult, SignRecord]
         self.shapes = []
         self.filepath = filepath
         self.verified = False
+        # Problems met while reading; objects that can't be read are skipped
+        self.errors = []
         try:
             self.parseXML()
-        except:
-            pass
+        except (AssertionError, etree.XMLSyntaxError, IOError) as e:
+            self.errors.append('cannot read %s: %s' % (filepath, e))
 
     def getShapes(self):
         return self.shapes
 
-    def addShape(self, label, bndbox, difficult):
+    @property
+    def objects(self):
+        """The SignRecord of every shape, in the same order."""
+        return [shape[5] for shape in self.shapes]
+
+    def addShape(self, label, bndbox, difficult, sign=None):
         xmin = int(float(bndbox.find('xmin').text))
         ymin = int(float(bndbox.find('ymin').text))
         xmax = int(float(bndbox.find('xmax').text))
         ymax = int(float(bndbox.find('ymax').text))
         points = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
-        self.shapes.append((label, points, None, None, difficult))
+        self.shapes.append((label, points, None, None, difficult, sign if sign is not None else SignRecord()))
 
     def parseXML(self):
+        """Read boxes and sign attributes in one streaming pass."""
         assert self.filepath.endswith(XML_EXT), "Unsupport file format"
-        parser = etree.XMLParser(encoding=ENCODE_METHOD)
-        xmltree = ElementTree.parse(self.filepath, parser=parser).getroot()
-        filename = xmltree.find('filename').text
-        try:
-            verified = xmltree.attrib['verified']
-            if verified == 'yes':
-                self.verified = True
-        except KeyError:
-            self.verified = False
+        count = 0
+        for event, elem in etree.iterparse(self.filepath, events=('start', 'end'), tag=('annotation', 'object')):
+            if elem.tag == 'annotation':
+                if event == 'start':
+                    self.verified = elem.get('verified') == 'yes'
+                continue
+            if event == 'end':
+                self.addObject(count, elem)
+                count += 1
+                # Objects are not needed once read, keep memory flat on big files
+                elem.clear()
+        return True
 
-        for object_iter in xmltree.findall('object'):
-            try:
-                bndbox = object_iter.find("bndbox")
-            except:
-                bndbox = object_iter.find("object")
-            label = object_iter.find('name').text
-            # Add chris
+    def addObject(self, index, objectElement):
+        label = objectElement.findtext('name')
+        bndbox = objectElement.find('bndbox')
+        if bndbox is None:
+            self.errors.append('object %d (%s): no bndbox' % (index, label))
+            return
+        try:
             difficult = False
-            if object_iter.find('difficult') is not None:
-                difficult = bool(int(object_iter.find('difficult').text))
-            self.addShape(label, bndbox, difficult)
-        return True
+            if objectElement.find('difficult') is not None:
+                difficult = bool(int(objectElement.find('difficult').text))
+            self.addShape(label, bndbox, difficult, readSignRecord(objectElement))
+        except (AttributeError, TypeError, ValueError) as e:
+            self.errors.append('object %d (%s): %s' % (index, label, e))
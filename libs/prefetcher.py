@@ -0,0 +1,110 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from libs.imageLoader import loadImageRecord
+from libs.tiledImage import imageBytes
+
+# How many neighbours of the current image are decoded in the background.
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+# Decoded 12 MP frames are ~50 MB each, keep the cache small.
+PREFETCH_CAPACITY = 6
+# And never hold more than this: a 24 MP frame alone is ~100 MB, big
+# frames push the older ones out instead of piling up.
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+PREFETCH_WORKERS = 2
+
+
+class ImagePrefetcher(object):
+    """Decode the images around the current one on a worker pool.
+
+    Results are kept in an LRU cache keyed by file path, bounded by the
+    number of images and by their decoded size. All cache bookkeeping
+    happens on the caller's (UI) thread, the workers only run `loader`.
+    """
+
+    def __init__(self, loader=loadImageRecord, ahead=PREFETCH_AHEAD, behind=PREFETCH_BEHIND,
+                 capacity=PREFETCH_CAPACITY, workers=PREFETCH_WORKERS, maxBytes=PREFETCH_MAX_BYTES):
+        self.loader = loader
+        self.ahead = ahead
+        self.behind = behind
+        # Always keep room for the current image and its whole window.
+        self.capacity = max(capacity, ahead + behind + 1)
+        self.maxBytes = maxBytes
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._cache = OrderedDict()
+
+    def prefetch(self, imgList, index):
+        """Queue the neighbours of imgList[index], nearest first."""
+        wanted = []
+        for step in range(1, max(self.ahead, self.behind) + 1):
+            if step <= self.ahead and index + step < len(imgList):
+                wanted.append(imgList[index + step])
+            if step <= self.behind and index - step >= 0:
+                wanted.append(imgList[index - step])
+
+        # Submit nearest first, but make the nearest the most recently used.
+        futures = []
+        for filePath in wanted:
+            future = self._cache.pop(filePath, None)
+            if future is None:
+                future = self._executor.submit(self.loader, filePath)
+            futures.append((filePath, future))
+        for filePath, future in reversed(futures):
+            self._cache[filePath] = future
+        self._evict()
+
+    def take(self, filePath):
+        """Return the prefetched image for filePath or None on a miss.
+
+        Blocks if the image is still being decoded; that is never slower
+        than decoding it again on the UI thread.
+        """
+        future = self._cache.pop(filePath, None)
+        if future is None or future.cancelled():
+            return None
+        try:
+            result = future.result()
+        except Exception as e:
+            print('prefetch %s failed: %s' % (filePath, e))
+            return None
+        try:
+            if os.path.getmtime(filePath) != result.mtime:
+                return None
+        except OSError:
+            return None
+        # Keep it around, the user often steps back and forth.
+        self._cache[filePath] = future
+        self._evict()
+        return result
+
+    def invalidate(self, filePath=None):
+        if filePath is None:
+            for future in self._cache.values():
+                future.cancel()
+            self._cache.clear()
+        else:
+            future = self._cache.pop(filePath, None)
+            if future is not None:
+                future.cancel()
+
+    def shutdown(self):
+        self.invalidate()
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _sizeInBytes(future):
+        """Memory held by a decoded record, 0 while it is being decoded."""
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            return 0
+        record = future.result()
+        return imageBytes(record.image) + len(record.imageData or b'')
+
+    def _evict(self):
+        # The most recently used image is always kept, however big it is
+        total = sum(self._sizeInBytes(future) for future in self._cache.values())
+        while len(self._cache) > 1 and (len(self._cache) > self.capacity or total > self.maxBytes):
+            _, future = self._cache.popitem(last=False)
+            total -= self._sizeInBytes(future)
+            future.cancel()
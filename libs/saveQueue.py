@@ -0,0 +1,82 @@
+try:
+    from PyQt5.QtCore import QThread, pyqtSignal
+except ImportError:
+    from PyQt4.QtCore import QThread, pyqtSignal
+
+import threading
+from collections import OrderedDict
+
+
+class SaveQueue(QThread):
+    """Write annotation files on a worker thread.
+
+    Jobs are callables working on a snapshot taken on the UI thread.
+    A job queued for a file that already waits replaces the waiting one,
+    so only the newest snapshot of each file is written.
+    """
+    # annotation path, image path
+    saved = pyqtSignal(str, str)
+    # annotation path, image path, error message
+    failed = pyqtSignal(str, str, str)
+
+    def __init__(self, parent=None):
+        super(SaveQueue, self).__init__(parent)
+        self._pending = OrderedDict()
+        self._current = None
+        self._stopping = False
+        self._cond = threading.Condition()
+
+    def submit(self, annotationPath, imagePath, job):
+        with self._cond:
+            # Assigning to an existing key keeps its place in the queue
+            self._pending[annotationPath] = (imagePath, job)
+            self._cond.notify_all()
+        if not self.isRunning():
+            self.start()
+
+    def _busy(self, path):
+        if path is None:
+            return bool(self._pending) or self._current is not None
+        if self._current is not None and path in self._current:
+            return True
+        return path in self._pending or any(path == imagePath for imagePath, _ in self._pending.values())
+
+    def isPending(self, path=None):
+        """Whether path (annotation or image path), or anything, is not written yet."""
+        with self._cond:
+            return self._busy(path)
+
+    def flush(self, path=None):
+        """Block until path (annotation or image path), or everything, is written."""
+        with self._cond:
+            while self._busy(path):
+                self._cond.wait()
+
+    def stop(self):
+        """Write everything still queued, then end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self.isRunning():
+            self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                annotationPath, (imagePath, job) = self._pending.popitem(last=False)
+                self._current = (annotationPath, imagePath)
+            try:
+                job()
+            except Exception as e:
+                print('saving %s failed: %s' % (annotationPath, e))
+                self.failed.emit(annotationPath, imagePath, str(e))
+            else:
+                self.saved.emit(annotationPath, imagePath)
+            finally:
+                with self._cond:
+                    self._current = None
+                    self._cond.notify_all()
@@ -39,6 +39,9 @@ class Shape(object):
 
     def __init__(self, label=None, line_color=None,difficult = False):
         self.label = label
+        # Path and bounding rect of the points, built on first use.
+        self._path = None
+        self._rect = None
         self.points = []
         self.fill = False
         self.selected = False
@@ -59,6 +62,21 @@ class Shape(object):
             # is used for drawing the pending line a different color.
             self.line_color = line_color
 
+    @property
+    def points(self):
+        """The vertices. Change them with the methods below or by assigning
+        a new list, so the cached path is dropped."""
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self._changed()
+
+    def _changed(self):
+        self._path = None
+        self._rect = None
+
     def close(self):
         self._closed = True
 
@@ -69,11 +87,13 @@ class Shape(object):
 
     def addPoint(self, point):
         if not self.reachMaxPoints():
-            self.points.append(point)
+            self._points.append(point)
+            self._changed()
 
     def popPoint(self):
-        if self.points:
-            return self.points.pop()
+        if self._points:
+            self._changed()
+            return self._points.pop()
         return None
 
     def isClosed(self):
@@ -116,18 +136,46 @@ class Shape(object):
                 min_x = min(min_x, point.x())
                 min_y = min(min_y, point.y())
             if min_x != sys.maxsize and min_y != sys.maxsize:
-                font = QFont()
-                font.setPointSize(8)
-                font.setBold(True)
-                painter.setFont(font)
+                painter.setFont(self.labelFont())
                 if(self.label == None):
                     self.label = ""
-                painter.drawText(min_x, min_y, self.label)
+                painter.drawText(QPointF(min_x, min_y), self.label)
 
             if self.fill:
                 color = self.select_fill_color if self.selected else self.fill_color
                 painter.fillPath(line_path, color)
 
+    _labelMetrics = None
+
+    @staticmethod
+    def labelFont():
+        font = QFont()
+        font.setPointSize(8)
+        font.setBold(True)
+        return font
+
+    @classmethod
+    def labelMetrics(cls):
+        if cls._labelMetrics is None:
+            cls._labelMetrics = QFontMetricsF(cls.labelFont())
+        return cls._labelMetrics
+
+    def paintRect(self):
+        """Area in image coordinates that paint() may touch: the outline,
+        the biggest highlighted vertex, the pen and the label."""
+        if not self.points:
+            return QRectF()
+        rect = self.boundingRect()
+        grow = (self.point_size * max(size for size, _ in self._highlightSettings.values()) / 2.0 + 2.0) / self.scale
+        rect.adjust(-grow, -grow, grow, grow)
+        if self.label:
+            metrics = self.labelMetrics()
+            left = min(p.x() for p in self.points)
+            top = min(p.y() for p in self.points)
+            rect = rect.united(QRectF(left, top - metrics.ascent(),
+                                      metrics.width(self.label) + 2, metrics.height()))
+        return rect
+
     def drawVertex(self, path, i):
         d = self.point_size / self.scale
         shape = self.point_type
@@ -156,19 +204,24 @@ class Shape(object):
         return self.makePath().contains(point)
 
     def makePath(self):
-        path = QPainterPath(self.points[0])
-        for p in self.points[1:]:
-            path.lineTo(p)
-        return path
+        if self._path is None:
+            path = QPainterPath(self.points[0])
+            for p in self.points[1:]:
+                path.lineTo(p)
+            self._path = path
+        return self._path
 
     def boundingRect(self):
-        return self.makePath().boundingRect()
+        if self._rect is None:
+            self._rect = self.makePath().boundingRect()
+        return QRectF(self._rect)
 
     def moveBy(self, offset):
         self.points = [p + offset for p in self.points]
 
     def moveVertexBy(self, i, offset):
-        self.points[i] = self.points[i] + offset
+        self._points[i] = self._points[i] + offset
+        self._changed()
 
     def highlightVertex(self, i, action):
         self._highlightIndex = i
@@ -197,4 +250,5 @@ class Shape(object):
         return self.points[key]
 
     def __setitem__(self, key, value):
-        self.points[key] = value
+        self._points[key] = value
+        self._changed()
@@ -0,0 +1,231 @@
+"""Local copy of the sign inventory, searched by position.
+
+The inventory is imported from a CSV or GeoJSON export into SQLite. The
+sign attributes are stored in the columns of SIGN_FIELDS and positions in
+an R-tree, so the signs around a frame are found without a scan.
+"""
+import csv
+import json
+import math
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import date
+
+from libs import geo
+from libs.pascal_voc_io import SIGN_FIELDS, SignRecord
+
+INVENTORY_FILENAME = '.labelImgSignInventory.db'
+# Signs further than this (meters) from the camera are not offered
+SEARCH_RADIUS = 100.0
+
+# Column names of the exports that hold the position, besides the
+# field names themselves (matched case-insensitively).
+_ALIASES = {
+    'lat': 'latitude', 'y': 'latitude', 'point_y': 'latitude',
+    'lon': 'longitude', 'lng': 'longitude', 'long': 'longitude', 'x': 'longitude', 'point_x': 'longitude',
+    'alt': 'altitude', 'z': 'altitude',
+}
+_FIELD_NAMES = dict((field.name.lower(), field.name) for field in SIGN_FIELDS)
+_COLUMNS = tuple(field.name for field in SIGN_FIELDS)
+_LAT, _LON = _COLUMNS.index('latitude'), _COLUMNS.index('longitude')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS signs (%s)' % ', '.join('"%s"' % name for name in _COLUMNS),
+    'CREATE VIRTUAL TABLE IF NOT EXISTS signPositions USING rtree(id, minLat, maxLat, minLon, maxLon)',
+    'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)',
+    'CREATE INDEX IF NOT EXISTS signsByOid ON signs ("SignMainGeneralOID")',
+    'CREATE INDEX IF NOT EXISTS signsById ON signs ("ID")',
+)
+
+# record: SignRecord of the sign
+# distance: meters from the camera
+# bearing: radians clockwise from north, from the camera to the sign
+# offAxis: radians between the heading and the bearing in [-pi, pi],
+#          None without a heading
+SignCandidate = namedtuple('SignCandidate', ['record', 'distance', 'bearing', 'offAxis'])
+
+
+def _fieldName(column):
+    column = column.strip().lower()
+    return _FIELD_NAMES.get(column) or _ALIASES.get(column)
+
+
+def _storedValue(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def readCsv(path):
+    """{field name: text} of the rows of a CSV export; unknown columns are ignored."""
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
+        names = [_fieldName(column) for column in header]
+        for row in reader:
+            yield dict((name, value) for name, value in zip(names, row) if name)
+
+
+def readGeoJson(path):
+    """{field name: value} of the point features of a GeoJSON export; the
+    position comes from the geometry."""
+    with open(path, 'rb') as f:
+        data = json.loads(f.read().decode('utf8'))
+    features = data.get('features', [data]) if isinstance(data, dict) else []
+    for feature in features:
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') != 'Point':
+            continue
+        values = dict((_fieldName(key), value) for key, value in (feature.get('properties') or {}).items())
+        values.pop(None, None)
+        coordinates = geometry.get('coordinates') or []
+        for name, value in zip(('longitude', 'latitude', 'altitude'), coordinates):
+            values[name] = value
+        yield values
+
+
+def readInventoryFile(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return readCsv(path)
+    if ext in ('.geojson', '.json'):
+        return readGeoJson(path)
+    raise ValueError('unknown inventory format: %s' % path)
+
+
+class SignInventory(object):
+    """The sign inventory in a SQLite database.
+
+    Signs without a usable position are stored but never found by near().
+    """
+
+    def __init__(self, dbPath):
+        self.dbPath = dbPath
+        # Kept open for the lookups, see _reader()
+        self._conn = None
+        conn = self._connect()
+        try:
+            # One transaction, a sync per statement is slow on some disks
+            conn.executescript('BEGIN; %s; COMMIT;' % '; '.join(_SCHEMA))
+        finally:
+            conn.close()
+
+    @staticmethod
+    def defaultPath():
+        """Next to the settings, one inventory per workstation."""
+        return os.path.join(os.getcwd(), INVENTORY_FILENAME)
+
+    def _connect(self):
+        return sqlite3.connect(self.dbPath, timeout=30)
+
+    def _reader(self):
+        """The connection of the queries, opened once: a batch run looks up
+        every object of every annotation."""
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __len__(self):
+        return self._reader().execute('SELECT COUNT(*) FROM signs').fetchone()[0]
+
+    def _meta(self, key):
+        row = self._reader().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def source(self):
+        """Path of the export the inventory was imported from, or None."""
+        return self._meta('source')
+
+    def columns(self):
+        """Names of the fields the export had. Others hold their default
+        in every sign, not a value of the inventory."""
+        columns = self._meta('columns')
+        return set(json.loads(columns)) if columns is not None else set(_COLUMNS)
+
+    def importFile(self, path):
+        """Replace the inventory by the signs of a CSV or GeoJSON export.
+        Returns the number of signs."""
+        return self.importRecords(readInventoryFile(path), os.path.abspath(path))
+
+    def importRecords(self, records, source=None):
+        """Replace the inventory by records (SignRecords or dicts) read
+        from the export source. The keys of the dicts are the columns(),
+        a SignRecord has all of them."""
+        insertSign = 'INSERT INTO signs (%s) VALUES (%s)' % (
+            ', '.join('"%s"' % name for name in _COLUMNS), ', '.join('?' * len(_COLUMNS)))
+        insertPosition = 'INSERT INTO signPositions (id, minLat, maxLat, minLon, maxLon) VALUES (?, ?, ?, ?, ?)'
+        conn = self._connect()
+        count = 0
+        columns = set()
+        try:
+            conn.execute('DELETE FROM signs')
+            conn.execute('DELETE FROM signPositions')
+            for count, record in enumerate(records, 1):
+                if isinstance(record, SignRecord):
+                    columns.update(_COLUMNS)
+                else:
+                    columns.update(name for name in record if name in _COLUMNS)
+                    record = SignRecord(record)
+                cursor = conn.execute(insertSign, [_storedValue(record[name]) for name in _COLUMNS])
+                lat, lon = record['latitude'], record['longitude']
+                if isinstance(lat, float) and isinstance(lon, float) and \
+                        not (math.isnan(lat) or math.isnan(lon)):
+                    conn.execute(insertPosition, (cursor.lastrowid, lat, lat, lon, lon))
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                             [('source', source), ('columns', json.dumps(sorted(columns)))])
+            # One transaction: a failed import keeps the previous inventory
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+
+    def lookup(self, oid=None, signId=None):
+        """SignRecord of the sign with SignMainGeneralOID oid, or with ID
+        signId when there is no oid; None if the inventory has no such sign."""
+        if oid is not None:
+            column, key = 'SignMainGeneralOID', oid
+        elif signId is not None:
+            column, key = 'ID', signId
+        else:
+            return None
+        row = self._reader().execute('SELECT %s FROM signs WHERE "%s" = ? LIMIT 1' % (
+            ', '.join('"%s"' % name for name in _COLUMNS), column), (key,)).fetchone()
+        return SignRecord(dict(zip(_COLUMNS, row))) if row is not None else None
+
+    def near(self, latitude, longitude, radius=SEARCH_RADIUS, heading=None, limit=None):
+        """SignCandidates of the signs within radius meters of lat/lon.
+
+        Closest first. With a heading (radians, like geo.bearing()) the
+        signs ahead of the camera come before the ones behind it.
+        """
+        dLat = math.degrees(radius / geo.EARTH_RADIUS)
+        dLon = dLat / max(math.cos(math.radians(latitude)), 1e-6)
+        rows = self._reader().execute(
+            'SELECT %s FROM signPositions JOIN signs ON signs.rowid = signPositions.id '
+            'WHERE minLat <= ? AND maxLat >= ? AND minLon <= ? AND maxLon >= ?'
+            % ', '.join('signs."%s"' % name for name in _COLUMNS),
+            (latitude + dLat, latitude - dLat, longitude + dLon, longitude - dLon)).fetchall()
+        if not rows:
+            return []
+        lats = [row[_LAT] for row in rows]
+        lons = [row[_LON] for row in rows]
+        distances = geo.haversine(latitude, longitude, lats, lons)
+        bearings = geo.bearing(latitude, longitude, lats, lons)
+        candidates = []
+        for row, distance, bearing in zip(rows, distances, bearings):
+            if distance > radius:
+                continue
+            offAxis = None
+            if heading is not None:
+                offAxis = float((bearing - heading + math.pi) % (2 * math.pi) - math.pi)
+            candidates.append(SignCandidate(SignRecord(dict(zip(_COLUMNS, row))),
+                                            float(distance), float(bearing), offAxis))
+        candidates.sort(key=lambda c: (c.offAxis is not None and abs(c.offAxis) > math.pi / 2, c.distance))
+        return candidates[:limit] if limit else candidates
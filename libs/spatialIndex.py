@@ -0,0 +1,97 @@
+from math import floor
+
+# Side of a grid cell in image pixels. Sign boxes are mostly well below
+# this, so a box usually sits in 1-4 cells.
+GRID_CELL_SIZE = 128
+
+
+class GridIndex(object):
+    """Uniform grid over axis aligned rectangles for point queries.
+
+    Every item carries a z value from an increasing counter, taken when it
+    is inserted, so query() can return the topmost (last added) first.
+    Rectangles are (x1, y1, x2, y2) tuples.
+    """
+
+    def __init__(self, cellSize=GRID_CELL_SIZE):
+        self.cellSize = float(cellSize)
+        self._cells = {}
+        # item -> [z, rect, cells]
+        self._entries = {}
+        self._nextZ = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._nextZ = 0
+
+    def _cellRange(self, x1, y1, x2, y2):
+        size = self.cellSize
+        return (int(floor(min(x1, x2) / size)), int(floor(min(y1, y2) / size)),
+                int(floor(max(x1, x2) / size)), int(floor(max(y1, y2) / size)))
+
+    def _cellsOf(self, rect):
+        cx1, cy1, cx2, cy2 = self._cellRange(*rect)
+        return frozenset((cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1))
+
+    def insert(self, item, rect):
+        """Add item on top of everything already in the index."""
+        if item in self._entries:
+            self.remove(item)
+        cells = self._cellsOf(rect)
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(item)
+        self._entries[item] = [self._nextZ, tuple(rect), cells]
+        self._nextZ += 1
+
+    def update(self, item, rect):
+        """Move item to rect, keeping its z; unknown items are inserted."""
+        entry = self._entries.get(item)
+        if entry is None:
+            self.insert(item, rect)
+            return
+        cells = self._cellsOf(rect)
+        if cells != entry[2]:
+            for cell in entry[2] - cells:
+                bucket = self._cells[cell]
+                bucket.discard(item)
+                if not bucket:
+                    del self._cells[cell]
+            for cell in cells - entry[2]:
+                self._cells.setdefault(cell, set()).add(item)
+            entry[2] = cells
+        entry[1] = tuple(rect)
+
+    def remove(self, item):
+        entry = self._entries.pop(item, None)
+        if entry is None:
+            return
+        for cell in entry[2]:
+            bucket = self._cells[cell]
+            bucket.discard(item)
+            if not bucket:
+                del self._cells[cell]
+
+    def query(self, x, y, margin=0):
+        """Items whose rect grown by margin holds (x, y), topmost first."""
+        cx1, cy1, cx2, cy2 = self._cellRange(x - margin, y - margin, x + margin, y + margin)
+        found = []
+        seen = set()
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for item in self._cells.get((cx, cy), ()):
+                    if item in seen:
+                        continue
+                    seen.add(item)
+                    z, (x1, y1, x2, y2), _ = self._entries[item]
+                    if min(x1, x2) - margin <= x <= max(x1, x2) + margin and \
+                            min(y1, y2) - margin <= y <= max(y1, y2) + margin:
+                        found.append((z, item))
+        found.sort(key=lambda entry: entry[0], reverse=True)
+        return [item for _, item in found]
@@ -0,0 +1,40 @@
+"""Time spent in the phases of startup, reported with --profile-startup."""
+import sys
+import time
+
+PROFILE_STARTUP_FLAG = '--profile-startup'
+
+
+class StartupProfile(object):
+    """Records the time between consecutive mark() calls.
+
+    Marking is cheap and always done; report() is only called when the
+    application runs with --profile-startup.
+    """
+
+    def __init__(self):
+        self.start = self.last = time.time()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.time()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        width = max([len(phase) for phase, _ in self.phases] + [5])
+        for phase, seconds in self.phases:
+            stream.write('%s  %7.1f ms\n' % (phase.ljust(width), seconds * 1000))
+        stream.write('%s  %7.1f ms\n' % ('total'.ljust(width), self.total() * 1000))
+        stream.flush()
+
+
+def popProfileFlag(argv):
+    """argv without --profile-startup, and whether it was given."""
+    argv = list(argv)
+    given = PROFILE_STARTUP_FLAG in argv
+    return [arg for arg in argv if arg != PROFILE_STARTUP_FLAG], given
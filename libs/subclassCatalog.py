@@ -0,0 +1,107 @@
+"""The subclass list shared by every subclass combo box of the window."""
+try:
+    from PyQt5.QtCore import QStringListModel
+    from PyQt5.QtWidgets import QCompleter, QComboBox
+except ImportError:
+    from PyQt4.QtGui import QCompleter, QComboBox, QStringListModel
+
+import bisect
+import difflib
+import os
+import re
+
+SUBCLASS_FILE = os.path.join('data', 'subclass.txt')
+# Suggestions shown by the completer
+MAX_SUGGESTIONS = 30
+
+
+def normalizeCode(text):
+    """'r1-2ap ' -> 'R12AP': MUTCD codes compared without case and punctuation."""
+    return re.sub(r'[^0-9A-Z]', '', text.upper())
+
+
+class SubclassCatalog(object):
+    """The subclass (MUTCD code) list of data/subclass.txt, loaded once.
+
+    Every subclass combo box shows the one shared model; reload() only
+    reads the file again when its mtime changed. suggest() finds the codes
+    for what was typed, ignoring case and punctuation.
+    """
+
+    def __init__(self, path=SUBCLASS_FILE):
+        self.path = path
+        self.codes = []
+        self.model = QStringListModel()
+        self._mtime = None
+        # Sorted (normalized code, code) for prefix lookups
+        self._keys = []
+        self._byKey = {}
+        self.reload()
+
+    def reload(self):
+        """Read the file if it changed since the last call; True if it did."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            if self._mtime is None:
+                print('load subclass list failed: %s' % e)
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        with open(self.path, 'r') as f:
+            codes = [line.strip() for line in f if line.strip()]
+        self.codes = codes
+        self._keys = sorted((normalizeCode(code), code) for code in codes)
+        self._byKey = {}
+        for key, code in self._keys:
+            self._byKey.setdefault(key, code)
+        self.model.setStringList(codes)
+        return True
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return normalizeCode(code) in self._byKey
+
+    def lookup(self, text):
+        """The code of the catalog text stands for, e.g. 'r1-1' -> 'R1-1',
+        None if there is none."""
+        return self._byKey.get(normalizeCode(text or ''))
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """Codes for text: the ones it is a prefix of, close ones if there are none."""
+        key = normalizeCode(text)
+        if not key:
+            return self.codes[:limit]
+        found = []
+        start = bisect.bisect_left(self._keys, (key, ''))
+        for normalized, code in self._keys[start:]:
+            if not normalized.startswith(key) or len(found) >= limit:
+                break
+            found.append(code)
+        if not found:
+            close = difflib.get_close_matches(key, self._byKey, limit, 0.6)
+            found = [self._byKey[k] for k in close]
+        return found
+
+    def bind(self, comboBox):
+        """Make comboBox list the catalog, with suggest() as its completer.
+
+        Nothing typed is added to the shared model.
+        """
+        comboBox.setModel(self.model)
+        comboBox.setEditable(True)
+        comboBox.setInsertPolicy(QComboBox.NoInsert)
+        suggestions = QStringListModel(comboBox)
+        completer = QCompleter(suggestions, comboBox)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        comboBox.setCompleter(completer)
+
+        def textEdited(text):
+            suggestions.setStringList(self.suggest(text))
+            if text:
+                completer.complete()
+        comboBox.lineEdit().textEdited.connect(textEdited)
+        return completer
@@ -0,0 +1,180 @@
+"""Subclass previews of icons/thumbnails, scaled once to the size they are shown at.
+
+The scaled previews live in the QPixmapCache. All of them are also packed
+into one atlas image next to the previews, so a new session gets them
+from a single small file instead of decoding every full size PNG.
+"""
+try:
+    from PyQt5.QtGui import QImage, QPainter, QPixmap, QPixmapCache
+    from PyQt5.QtCore import Qt, QObject, QFileSystemWatcher, pyqtSignal
+except ImportError:
+    from PyQt4.QtGui import QImage, QPainter, QPixmap, QPixmapCache
+    from PyQt4.QtCore import Qt, QObject, QFileSystemWatcher, pyqtSignal
+
+import json
+import math
+import os
+
+THUMBNAIL_DIR = os.path.join('icons', 'thumbnails')
+# Width and height of the label the previews are shown in
+THUMBNAIL_SIZE = 80
+THUMBNAIL_EXT = '.png'
+# .atlas.png and .atlas.json in the thumbnail directory; hidden so they
+# are not taken for a preview
+ATLAS_NAME = '.atlas'
+
+
+def previewSources(directory):
+    """{subclass: [mtime, file size, file name]} of the previews in directory."""
+    sources = {}
+    try:
+        fileNames = os.listdir(directory)
+    except OSError:
+        return sources
+    for fileName in fileNames:
+        name, ext = os.path.splitext(fileName)
+        if fileName.startswith('.') or ext.lower() != THUMBNAIL_EXT:
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, fileName))
+        except OSError:
+            continue
+        sources[name] = [stat.st_mtime, stat.st_size, fileName]
+    return sources
+
+
+def scaledPreview(path, size):
+    """QImage of the image at path fitted into size x size, null if it
+    cannot be read."""
+    image = QImage(path)
+    if image.isNull() or (image.width() <= size and image.height() <= size):
+        return image
+    return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class ThumbnailCache(QObject):
+    """The previews of the subclasses, read and scaled once.
+
+    pixmap() looks in the QPixmapCache first, which drops the least
+    recently used pixmaps past its limit; the atlas fills it on first use.
+    The directory is watched, changed previews are dropped and changed is
+    emitted with their names.
+    """
+
+    changed = pyqtSignal(list)
+
+    def __init__(self, directory=THUMBNAIL_DIR, size=THUMBNAIL_SIZE, watch=True, parent=None):
+        super(ThumbnailCache, self).__init__(parent)
+        self.directory = directory
+        self.size = size
+        self.sources = previewSources(directory)
+        self.atlasPath = os.path.join(directory, ATLAS_NAME + THUMBNAIL_EXT)
+        self.indexPath = os.path.join(directory, ATLAS_NAME + '.json')
+        self._keyPrefix = 'thumbnail:%d:%s/' % (size, os.path.abspath(directory))
+        self._atlasLoaded = False
+        self.watcher = None
+        if watch and os.path.isdir(directory):
+            self.watcher = QFileSystemWatcher([directory], self)
+            self.watcher.directoryChanged.connect(self.rescan)
+
+    def __contains__(self, name):
+        return name in self.sources
+
+    def _key(self, name):
+        return self._keyPrefix + name
+
+    def pixmap(self, name):
+        """The preview of subclass name fitted into size x size, None if
+        there is none."""
+        if name not in self.sources:
+            return None
+        pixmap = QPixmapCache.find(self._key(name))
+        if pixmap is not None:
+            return pixmap
+        if not self._atlasLoaded:
+            self._atlasLoaded = True
+            self.loadAtlas()
+            pixmap = QPixmapCache.find(self._key(name))
+            if pixmap is not None:
+                return pixmap
+        image = scaledPreview(os.path.join(self.directory, self.sources[name][2]), self.size)
+        if image.isNull():
+            return None
+        pixmap = QPixmap.fromImage(image)
+        QPixmapCache.insert(self._key(name), pixmap)
+        return pixmap
+
+    def rescan(self, _path=None):
+        """Look for added, removed and rewritten previews. Returns their
+        names, which are also emitted with changed."""
+        sources = previewSources(self.directory)
+        names = sorted(name for name in set(sources) | set(self.sources)
+                       if sources.get(name) != self.sources.get(name))
+        for name in names:
+            QPixmapCache.remove(self._key(name))
+        self.sources = sources
+        if names:
+            self.changed.emit(names)
+        return names
+
+    def _readIndex(self):
+        try:
+            with open(self.indexPath, 'r') as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or index.get('size') != self.size:
+            return None
+        return index.get('cells') or {}
+
+    def atlasIsCurrent(self):
+        """True if the atlas holds every preview as it is now."""
+        cells = self._readIndex()
+        if cells is None or set(cells) != set(self.sources):
+            return False
+        return all(cell[4:] == self.sources[name] for name, cell in cells.items())
+
+    def loadAtlas(self):
+        """Put the previews of the atlas that are still current in the
+        cache. Returns their number."""
+        cells = self._readIndex()
+        if not cells:
+            return 0
+        atlas = QPixmap(self.atlasPath)
+        if atlas.isNull():
+            return 0
+        count = 0
+        for name, cell in cells.items():
+            if self.sources.get(name) == cell[4:]:
+                QPixmapCache.insert(self._key(name), atlas.copy(*cell[:4]))
+                count += 1
+        return count
+
+    def saveAtlas(self):
+        """Pack every preview into the atlas. Returns the number packed."""
+        images = []
+        for name in sorted(self.sources):
+            pixmap = self.pixmap(name)
+            if pixmap is not None:
+                images.append((name, pixmap.toImage()))
+        columns = max(1, int(math.ceil(math.sqrt(len(images)))))
+        rows = max(1, int(math.ceil(len(images) / float(columns))))
+        atlas = QImage(columns * self.size, rows * self.size, QImage.Format_ARGB32)
+        atlas.fill(Qt.transparent)
+        cells = {}
+        painter = QPainter(atlas)
+        for i, (name, image) in enumerate(images):
+            x, y = (i % columns) * self.size, (i // columns) * self.size
+            painter.drawImage(x, y, image)
+            cells[name] = [x, y, image.width(), image.height()] + self.sources[name]
+        painter.end()
+        # Written under temporary names first, a reader never sees half an atlas
+        atlasTmp, indexTmp = self.atlasPath + '.tmp', self.indexPath + '.tmp'
+        if not atlas.save(atlasTmp, 'PNG'):
+            print('save thumbnail atlas failed: %s' % self.atlasPath)
+            return 0
+        with open(indexTmp, 'w') as f:
+            json.dump({'size': self.size, 'cells': cells}, f)
+        os.replace(atlasTmp, self.atlasPath)
+        os.replace(indexTmp, self.indexPath)
+        return len(cells)
@@ -47,7 +47,9 @@ class ThumbnailDialog(QDialog):
     def save(self):
         try:
             imgFileName = self.imgName.currentText()
-            self.imgData.save(os.getcwd() + '/icons/thumbnails/{}.png'.format(imgFileName), 'PNG')
+            # imgData is the QImage of the box
+            if not self.imgData.save(os.getcwd() + '/icons/thumbnails/{}.png'.format(imgFileName), 'PNG'):
+                raise IOError(imgFileName)
             print('save successed:',imgFileName)
             self.isSaved = True
             self.accept()
@@ -0,0 +1,293 @@
+try:
+    from PyQt5.QtGui import QImage, QImageReader, QPixmap
+    from PyQt5.QtCore import QBuffer, QIODevice, QPoint, QRect, QRectF, QSize
+except ImportError:
+    from PyQt4.QtGui import QImage, QImageReader, QPixmap
+    from PyQt4.QtCore import QBuffer, QIODevice, QPoint, QRect, QRectF, QSize
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Side of a tile in pixels of its level.
+TILE_SIZE = 512
+# 512x512 ARGB tiles are 1 MB each.
+TILE_CACHE_TILES = 128
+# Images with at least this many pixels are shown through a TiledImage,
+# smaller ones stay a single QPixmap.
+TILED_MIN_PIXELS = 24 * 1000 * 1000
+# The coarsest level fits in this many pixels on its long side and is
+# always kept, it is what is shown while finer tiles are being made.
+OVERVIEW_SIZE = 1024
+# Tiles made per makePending() call, keeps the UI responsive.
+TILES_PER_PASS = 4
+# How often (ms) to look for decoded bands while tiles are waiting for them
+BAND_POLL_INTERVAL = 20
+# Decoded bands (a row of tiles) kept to cut tiles from; a band of a
+# 100 MP frame is ~27 MB at level 0.
+BAND_CACHE_BANDS = 2
+
+_bandDecoder = None
+
+
+def bandDecoder():
+    """The thread bands are decoded on, shared by every TiledImage."""
+    global _bandDecoder
+    if _bandDecoder is None:
+        _bandDecoder = ThreadPoolExecutor(max_workers=1)
+    return _bandDecoder
+
+
+def imageBytes(image):
+    """QImage.sizeInBytes(), byteCount() before Qt 5.10."""
+    return image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount()
+
+
+def imageReader(imageData):
+    """A QImageReader over encoded image bytes. Keep the reader, it owns
+    the buffer."""
+    buffer = QBuffer()
+    buffer.setData(imageData)
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    reader.buffer = buffer
+    return reader
+
+
+def readRegion(imageData, size, rect):
+    """rect of the image scaled to size, decoded from imageData without
+    decoding the rest at full size; null if it cannot be read."""
+    reader = imageReader(imageData)
+    if size != reader.size():
+        reader.setScaledSize(size)
+        reader.setScaledClipRect(rect)
+    elif rect != QRect(QPoint(0, 0), size):
+        reader.setClipRect(rect)
+    return reader.read()
+
+
+class TiledImage(object):
+    """A very large image drawn from tiles of a resolution pyramid.
+
+    The image is kept encoded, never decoded at full size. Level 0 is the
+    full resolution, every next level halves it; the coarsest is decoded
+    once as the overview. Tiles become QPixmaps the first time they are
+    visible at the level matching the zoom and are kept in an LRU cache.
+    A missing tile is drawn from the overview and queued; the row of tiles
+    (band) it is in is decoded on a worker thread and makePending() cuts
+    queued tiles from decoded bands a few at a time, so detail fills in
+    progressively.
+
+    Everything is in full resolution image coordinates, and width(),
+    height(), size() and rect() match the QPixmap the canvas would
+    otherwise hold.
+    """
+
+    def __init__(self, imageData, tileSize=TILE_SIZE, capacity=TILE_CACHE_TILES):
+        self.imageData = imageData
+        self.tileSize = tileSize
+        self.capacity = capacity
+        self._size = imageReader(imageData).size()
+        self.maxLevel = 0
+        while max(self._size.width(), self._size.height()) >> self.maxLevel > OVERVIEW_SIZE:
+            self.maxLevel += 1
+        # Decoded at a reduced scale, made a pixmap on first paint
+        self.overviewImage = QImage()
+        if self._size.isValid():
+            size = self.levelSize(self.maxLevel)
+            self.overviewImage = readRegion(imageData, size, QRect(QPoint(0, 0), size))
+        self._overview = None
+        self._tiles = OrderedDict()
+        self._pending = OrderedDict()
+        # (level, row) -> QImage, and the futures of the ones being decoded
+        self._bands = OrderedDict()
+        self._bandJobs = {}
+        self._paintLevel = 0
+
+    def width(self):
+        return self._size.width()
+
+    def height(self):
+        return self._size.height()
+
+    def size(self):
+        return QSize(self._size)
+
+    def rect(self):
+        return QRect(QPoint(0, 0), self._size)
+
+    def isNull(self):
+        return self.overviewImage.isNull()
+
+    def __bool__(self):
+        return not self.isNull()
+    __nonzero__ = __bool__
+
+    def isGrayscale(self):
+        return self.overviewImage.isGrayscale()
+
+    def sizeInBytes(self):
+        """Memory held besides the encoded bytes, like QImage.sizeInBytes()."""
+        return imageBytes(self.overviewImage) + sum(imageBytes(band) for band in self._bands.values()) + \
+            sum(tile.width() * tile.height() * 4 for tile in self._tiles.values())
+
+    def copy(self, rect):
+        """QImage of rect at full resolution, like QImage.copy(); decoded
+        from the file, so keep it small."""
+        rect = rect.intersected(self.rect())
+        if rect.isEmpty():
+            return QImage()
+        return readRegion(self.imageData, self._size, rect)
+
+    def overview(self):
+        if self._overview is None:
+            self._overview = QPixmap.fromImage(self.overviewImage)
+        return self._overview
+
+    def levelFor(self, scale):
+        """Coarsest level that still has at least one pixel per screen pixel."""
+        level = 0
+        while level < self.maxLevel and scale * (2 << level) <= 1:
+            level += 1
+        return level
+
+    def levelSize(self, level):
+        return QSize(max(1, self.width() >> level), max(1, self.height() >> level))
+
+    def bandRect(self, level, row):
+        """Rect of a row of tiles in pixels of its level."""
+        size = self.levelSize(level)
+        y = row * self.tileSize
+        return QRect(0, y, size.width(), min(self.tileSize, size.height() - y))
+
+    def tileRect(self, level, col, row):
+        """Rect of a tile in pixels of its level."""
+        size = self.levelSize(level)
+        x, y = col * self.tileSize, row * self.tileSize
+        return QRect(x, y, min(self.tileSize, size.width() - x), min(self.tileSize, size.height() - y))
+
+    def imageRectOf(self, level, col, row):
+        """Rect of a tile in full resolution image coordinates."""
+        rect = self.tileRect(level, col, row)
+        factor = 1 << level
+        return QRectF(rect.x() * factor, rect.y() * factor, rect.width() * factor, rect.height() * factor)\
+            .intersected(QRectF(self.rect()))
+
+    def tilesIn(self, level, imageRect):
+        """(col, row) of the tiles of level covering imageRect."""
+        visible = imageRect.intersected(QRectF(self.rect()))
+        if visible.isEmpty():
+            return []
+        span = float(self.tileSize << level)
+        cols = range(int(visible.left() // span), int((visible.right() - 1e-6) // span) + 1)
+        rows = range(int(visible.top() // span), int((visible.bottom() - 1e-6) // span) + 1)
+        return [(col, row) for row in rows for col in cols]
+
+    def _requestBand(self, band):
+        if band in self._bands or band in self._bandJobs:
+            return
+        level, row = band
+        self._bandJobs[band] = bandDecoder().submit(readRegion, self.imageData, self.levelSize(level),
+                                                    self.bandRect(level, row))
+
+    def _band(self, band):
+        """The decoded QImage of band, None while it is being decoded."""
+        image = self._bands.pop(band, None)
+        if image is None:
+            job = self._bandJobs.get(band)
+            if job is None or not job.done():
+                return None
+            del self._bandJobs[band]
+            try:
+                image = job.result()
+            except Exception as e:
+                print('decode tiles failed: %s' % e)
+                image = QImage()
+            if image.isNull():
+                print('decode tiles %s failed' % (band,))
+        self._bands[band] = image
+        while len(self._bands) > BAND_CACHE_BANDS:
+            self._bands.popitem(last=False)
+        return image
+
+    def _makeTile(self, key, band):
+        level, col, row = key
+        rect = self.tileRect(level, col, row)
+        tile = QPixmap.fromImage(band.copy(rect.x(), 0, rect.width(), rect.height()))
+        self._tiles[key] = tile
+        while len(self._tiles) > self.capacity:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def paint(self, painter, imageRect, scale):
+        """Draw the part of the image in imageRect; painter works in image
+        coordinates. Returns True if tiles were queued for makePending()."""
+        level = self.levelFor(scale)
+        if level != self._paintLevel:
+            # Bands of a zoom level that is no longer shown are not needed
+            for band in [band for band in self._bandJobs if band[0] != level]:
+                self._bandJobs.pop(band).cancel()
+        self._paintLevel = level
+        overview = self.overview()
+        if level == self.maxLevel:
+            painter.drawPixmap(QRectF(self.rect()), overview, QRectF(overview.rect()))
+            return False
+        missing = False
+        for col, row in self.tilesIn(level, imageRect):
+            key = (level, col, row)
+            target = self.imageRectOf(level, col, row)
+            tile = self._tiles.pop(key, None)
+            if tile is None:
+                missing = True
+                self._pending[key] = True
+                self._requestBand((level, row))
+                source = QRectF(target.x() / self.width() * overview.width(),
+                                target.y() / self.height() * overview.height(),
+                                target.width() / self.width() * overview.width(),
+                                target.height() / self.height() * overview.height())
+                painter.drawPixmap(target, overview, source)
+            else:
+                self._tiles[key] = tile
+                painter.drawPixmap(target, tile, QRectF(tile.rect()))
+        return missing
+
+    def hasPending(self):
+        return bool(self._pending)
+
+    def makePending(self, budget=TILES_PER_PASS):
+        """Make up to budget queued tiles whose band is decoded, returns
+        their image rects. The others stay queued."""
+        made = []
+        for key in list(self._pending):
+            if len(made) >= budget:
+                break
+            level, col, row = key
+            # Queued for a zoom level that is no longer shown
+            if level != self._paintLevel or key in self._tiles:
+                del self._pending[key]
+                continue
+            self._requestBand((level, row))
+            band = self._band((level, row))
+            if band is None:
+                continue
+            del self._pending[key]
+            if not band.isNull():
+                self._makeTile(key, band)
+                made.append(self.imageRectOf(*key))
+        return made
+
+    def waitForBands(self, timeout=None):
+        """Block until the bands being decoded are done; for tests and
+        benchmarks."""
+        for job in list(self._bandJobs.values()):
+            if not job.cancelled():
+                job.exception(timeout)
+
+    def release(self):
+        """Drop tiles, bands and queued work; the image is no longer shown.
+        The overview stays, it is what paint() starts from again."""
+        for job in self._bandJobs.values():
+            job.cancel()
+        self._bandJobs.clear()
+        self._bands.clear()
+        self._tiles.clear()
+        self._pending.clear()
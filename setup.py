@@ -29,7 +29,8 @@ setup(
     packages=required_packages,
     entry_points={
         'console_scripts': [
-            'labelImg=labelImg.labelImg:main'
+            'labelImg=labelImg.labelImg:main',
+            'labelImgBatch=labelImg.labelImgBatch:main'
         ]
     },
     include_package_data=True,
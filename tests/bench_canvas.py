@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Measure Canvas frame times for a full repaint against a damaged-region repaint.
+
+Usage: python tests/bench_canvas.py [--width N] [--height N] [--boxes N] [--frames N]
+
+Runs offscreen, rendering into an image. The full repaint redraws the whole
+widget like every mouse move used to; the damaged repaint only redraws the
+area of one hovered box.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QPoint, QPointF
+from PyQt5.QtGui import QColor, QImage, QPixmap, QRegion
+from PyQt5.QtWidgets import QApplication
+from libs.canvas import Canvas
+from libs.shape import Shape
+
+
+def make_canvas(width, height, boxes):
+    canvas = Canvas()
+    canvas.resize(1600, 1000)
+    pixmap = QPixmap(width, height)
+    pixmap.fill(QColor(90, 120, 90))
+    canvas.loadPixmap(pixmap)
+    rand = random.Random(7)
+    shapes = []
+    for i in range(boxes):
+        x, y = rand.uniform(0, width - 200), rand.uniform(0, height - 200)
+        w, h = rand.uniform(20, 200), rand.uniform(20, 200)
+        shape = Shape(label='sign %d' % i)
+        for px, py in ((x, y), (x + w, y), (x + w, y + h), (x, y + h)):
+            shape.addPoint(QPointF(px, py))
+        shape.close()
+        shapes.append(shape)
+    canvas.loadShapes(shapes)
+    return canvas, shapes
+
+
+def painter(canvas, rect=None):
+    """Return a callable rendering canvas, or only rect of it, into an image."""
+    target = QImage(canvas.size(), QImage.Format_ARGB32_Premultiplied)
+    region = QRegion(rect if rect is not None else canvas.rect())
+    return lambda: canvas.render(target, QPoint(), region)
+
+
+def timed(paint, frames):
+    start = time.time()
+    for _ in range(frames):
+        paint()
+    return (time.time() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=5472)
+    parser.add_argument('--height', type=int, default=3648)
+    parser.add_argument('--boxes', type=int, default=200)
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    canvas, shapes = make_canvas(args.width, args.height, args.boxes)
+    for scale in (1600.0 / args.width, 1.0):
+        canvas.scale = scale
+        painter(canvas)()
+        hovered = shapes[len(shapes) // 2]
+        damage = canvas.imageToWidgetRect(hovered.paintRect())
+        full = timed(painter(canvas), args.frames)
+        dirty = timed(painter(canvas, damage), args.frames)
+        print('%dx%d image, %d boxes, zoom %.2f' % (args.width, args.height, args.boxes, scale))
+        print('full repaint    : %8.3f ms/frame' % (full * 1000))
+        print('damaged repaint : %8.3f ms/frame (%dx%d px)' % (dirty * 1000, damage.width(), damage.height()))
+    canvas.close()
+    del app
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
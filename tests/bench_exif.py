@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Compare the header-only GPS reader against the PIL path on a folder of JPEGs.
+
+Usage: python tests/bench_exif.py [folder] [--limit N]
+
+Without a folder, a temporary folder of GPS tagged JPEGs is generated.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PIL import Image
+from libs.getExImgInfo import read_gps_header, get_exif_data, get_lat_lon
+
+
+def pil_gps(path):
+    try:
+        return get_lat_lon(get_exif_data(Image.open(path)))
+    except Exception:
+        return None
+
+
+def make_folder(count):
+    folder = tempfile.mkdtemp(prefix='bench_exif_')
+    exif = Image.Exif()
+    exif[0x8825] = {1: 'N', 2: (44.0, 17.0, 48.75), 3: 'W', 4: (72.0, 41.0, 3.5), 5: b'\x00', 6: 250.5}
+    sample = os.path.join(folder, 'sample.jpg')
+    Image.new('RGB', (1920, 1080), (90, 120, 60)).save(sample, 'JPEG', exif=exif.tobytes())
+    for i in range(count):
+        shutil.copyfile(sample, os.path.join(folder, '%06d.jpg' % i))
+    os.remove(sample)
+    return folder
+
+
+def timed(reader, paths):
+    start = time.time()
+    results = [reader(p) for p in paths]
+    return time.time() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder', nargs='?')
+    parser.add_argument('--limit', type=int, default=10000)
+    args = parser.parse_args()
+
+    folder = args.folder or make_folder(min(args.limit, 2000))
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(('.jpg', '.jpeg')))
+    paths = sorted(paths)[:args.limit]
+    if not paths:
+        print('no JPEG found in %s' % folder)
+        return 1
+
+    header_time, header = timed(read_gps_header, paths)
+    pil_time, pil = timed(pil_gps, paths)
+    same = sum(1 for h, p in zip(header, pil)
+               if (h is None and (p is None or p[0] is None)) or
+               (h is not None and p is not None and tuple(h[:2]) == tuple(p[:2])))
+
+    print('%d files in %s' % (len(paths), folder))
+    print('PIL _getexif : %8.3fs %10.0f files/s' % (pil_time, len(paths) / pil_time))
+    print('header only  : %8.3fs %10.0f files/s' % (header_time, len(paths) / header_time))
+    print('speedup      : %8.1fx, %d/%d identical positions' % (pil_time / header_time, same, len(paths)))
+    if not args.folder:
+        shutil.rmtree(folder)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Measure libs.geo sign offsets against the scalar per-sign path.
+
+Usage: python tests/bench_geo.py [--signs N] [--frames N]
+
+The scalar path is what the sign panel did per box before: two bearings
+and a haversine with math, the distance formatted and parsed back.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from math import sin, cos, sqrt, atan2, radians
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+import numpy as np
+from libs import geo
+
+
+def scalar_bearing(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    return atan2(sin(dlon) * cos(lat2), cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dlon))
+
+
+def scalar_distance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return "{:.3f}".format(6373.0 * 2 * atan2(sqrt(a), sqrt(1 - a)) * 1000)
+
+
+def scalar_offsets(prev, cam, signs):
+    result = []
+    for lat, lon in signs:
+        angle = abs(scalar_bearing(prev[0], prev[1], cam[0], cam[1]) - scalar_bearing(cam[0], cam[1], lat, lon))
+        distance = scalar_distance(cam[0], cam[1], lat, lon)
+        result.append((float(distance) * sin(angle), float(distance) * cos(angle), distance))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--signs', type=int, default=20000)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    rand = random.Random(7)
+    prev, cam = (44.2960, -72.6850), (44.2968, -72.6843)
+    signs = [(cam[0] + rand.uniform(-0.002, 0.002), cam[1] + rand.uniform(-0.002, 0.002))
+             for _ in range(args.signs)]
+    lats, lons = np.array(signs).T
+
+    # A folder-wide report: every sign at once
+    start = time.time()
+    scalar_offsets(prev, cam, signs)
+    scalar_time = time.time() - start
+    start = time.time()
+    geo.signOffsets(geo.bearing(prev[0], prev[1], cam[0], cam[1]), cam[0], cam[1], lats, lons)
+    vector_time = time.time() - start
+    print('%d signs in one call' % args.signs)
+    print('scalar math : %8.2f ms' % (scalar_time * 1000))
+    print('numpy       : %8.2f ms' % (vector_time * 1000))
+
+    # Per-frame panel updates: a handful of signs per image
+    frame = signs[:8]
+    start = time.time()
+    for _ in range(args.frames):
+        scalar_offsets(prev, cam, frame)
+    scalar_time = time.time() - start
+    start = time.time()
+    for _ in range(args.frames):
+        geo.signOffsets(geo.bearing(prev[0], prev[1], cam[0], cam[1]), cam[0], cam[1], lats[:8], lons[:8])
+    vector_time = time.time() - start
+    print('%d frames of %d signs' % (args.frames, len(frame)))
+    print('scalar math : %8.3f ms/frame' % (scalar_time * 1000 / args.frames))
+    print('numpy       : %8.3f ms/frame' % (vector_time * 1000 / args.frames))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
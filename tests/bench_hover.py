@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Time a hover hit-test over many boxes: the old linear scan against the grid index.
+
+Usage: python tests/bench_hover.py [--boxes N] [--moves N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+try:
+    from PyQt5.QtCore import QPointF
+    from PyQt5.QtGui import QPainterPath
+except ImportError:
+    from PyQt4.QtCore import QPointF
+    from PyQt4.QtGui import QPainterPath
+from libs.shape import Shape
+from libs.spatialIndex import GridIndex
+
+EPSILON = 11.0
+
+
+def make_shapes(count, width=1920, height=1080):
+    rnd = random.Random(1)
+    shapes = []
+    for _ in range(count):
+        x, y = rnd.uniform(0, width - 80), rnd.uniform(0, height - 80)
+        w, h = rnd.uniform(15, 80), rnd.uniform(15, 80)
+        shape = Shape('SIGN')
+        for px, py in ((x, y), (x + w, y), (x + w, y + h), (x, y + h)):
+            shape.addPoint(QPointF(px, py))
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def linear_hit(shapes, pos):
+    """The loop mouseMoveEvent used to run, with a fresh path per shape."""
+    for shape in reversed(shapes):
+        if shape.nearestVertex(pos, EPSILON) is not None:
+            return shape
+        path = QPainterPath(shape.points[0])
+        for p in shape.points[1:]:
+            path.lineTo(p)
+        if path.contains(pos):
+            return shape
+    return None
+
+
+def indexed_hit(index, pos):
+    for shape in index.query(pos.x(), pos.y(), EPSILON):
+        if shape.nearestVertex(pos, EPSILON) is not None or shape.containsPoint(pos):
+            return shape
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boxes', type=int, nargs='+', default=[10, 100, 500, 2000])
+    parser.add_argument('--moves', type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(2)
+    positions = [QPointF(rnd.uniform(0, 1920), rnd.uniform(0, 1080)) for _ in range(args.moves)]
+    print('%6s %14s %14s' % ('boxes', 'linear ms/move', 'grid ms/move'))
+    for count in args.boxes:
+        shapes = make_shapes(count)
+        index = GridIndex()
+        for shape in shapes:
+            rect = shape.boundingRect()
+            index.insert(shape, (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+        start = time.time()
+        linear = [linear_hit(shapes, pos) for pos in positions]
+        linear_time = time.time() - start
+        start = time.time()
+        indexed = [indexed_hit(index, pos) for pos in positions]
+        indexed_time = time.time() - start
+        assert linear == indexed
+        print('%6d %14.4f %14.4f' % (count, 1000 * linear_time / len(positions),
+                                     1000 * indexed_time / len(positions)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Measure the time to fill the image info dock when moving to the next image.
+
+Usage: python tests/bench_imgInfo.py [--boxes N] [--images N]
+
+Runs offscreen. Every image has --boxes new shapes; the rows of the dock
+are recycled, so only the first image pays for creating them and the
+number of rows stays flat however many images are shown.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+os.chdir(os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QPointF
+from PyQt5.QtWidgets import QApplication
+from labelImg import MainWindow, shareOpenGLContexts
+from libs.boundingBoxWidget import BoundingBoxWidget
+from libs.shape import Shape
+
+
+def make_shapes(count):
+    shapes = []
+    for i in range(count):
+        shape = Shape(label='sign %d' % i)
+        for x, y in ((10, 10), (60, 10), (60, 60), (10, 60)):
+            shape.addPoint(QPointF(x + i, y))
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boxes', type=int, default=40)
+    parser.add_argument('--images', type=int, default=200)
+    args = parser.parse_args()
+
+    shareOpenGLContexts()
+    app = QApplication(sys.argv[:1])
+    win = MainWindow(None, os.path.join('data', 'predefined_classes.txt'))
+    win.show()
+    win.geoInfo = (44.0, -72.0, 0.0)
+    times = []
+    for _ in range(args.images):
+        shapes = make_shapes(args.boxes)
+        win.objects.clear()
+        start = time.time()
+        win.loadImgInfo(shapes)
+        app.processEvents()
+        times.append(time.time() - start)
+    gc.collect()
+    rows = sum(1 for o in gc.get_objects() if isinstance(o, BoundingBoxWidget))
+    print('%d boxes per image, %d images' % (args.boxes, args.images))
+    print('first image : %8.3f ms' % (times[0] * 1000))
+    print('next images : %8.3f ms/image' % (sum(times[1:]) / max(1, len(times) - 1) * 1000))
+    print('rows alive  : %8d' % rows)
+    win.dirty = False
+    del app
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
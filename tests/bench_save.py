@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Measure PascalVocWriter.save throughput against the old serialize-reparse path.
+
+Usage: python tests/bench_save.py [--files N] [--boxes N]
+
+Annotations with sign attributes are written to a temporary folder.
+"""
+import argparse
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from xml.etree import ElementTree
+from lxml import etree
+from libs import pascal_voc_io
+from libs.pascal_voc_io import PascalVocWriter, ENCODE_METHOD
+
+SIGN = {'latitude': 44.2968, 'longitude': -72.6843, 'altitude': 250.5, 'superclass': 'regulatory',
+        'subclass': 'R1-1', 'SignMainGeneralOID': 120443, 'ID': 88, 'City': 'Montpelier',
+        'MUTCDCode': 'R1-1', 'TWN_MI': 1.25, 'OFFSET': 3.5, 'PublishDate': '2017-06-01'}
+
+
+def make_writer(boxes):
+    writer = PascalVocWriter('bench', 'image.jpg', (1080, 1920, 3), localImgPath='/data/bench/image.jpg')
+    writer.latitude, writer.longitude, writer.altitude = 44.29, -72.68, 250.5
+    for i in range(boxes):
+        writer.addBndBox(100 + i, 200, 180 + i, 260, 'SIGN', 0, SIGN)
+    return writer
+
+
+def legacy_save(writer, path):
+    """What save() did before: build with xml.etree, serialize, reparse with lxml,
+    pretty print, patch the indent and re-encode."""
+    pascal_voc_io.Element, pascal_voc_io.SubElement = ElementTree.Element, ElementTree.SubElement
+    try:
+        root = writer.genXML()
+        writer.appendObjects(root)
+    finally:
+        pascal_voc_io.Element, pascal_voc_io.SubElement = etree.Element, etree.SubElement
+    rough_string = ElementTree.tostring(root, 'utf8')
+    result = etree.tostring(etree.fromstring(rough_string), pretty_print=True,
+                            encoding=ENCODE_METHOD).replace("  ".encode(), "\t".encode())
+    out_file = codecs.open(path, 'w', encoding=ENCODE_METHOD)
+    out_file.write(result.decode('utf8'))
+    out_file.close()
+
+
+def current_save(writer, path):
+    writer.save(path)
+
+
+def timed(save, writers, folder):
+    start = time.time()
+    for i, writer in enumerate(writers):
+        save(writer, os.path.join(folder, '%06d.xml' % i))
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--boxes', type=int, default=5)
+    args = parser.parse_args()
+
+    writers = [make_writer(args.boxes) for _ in range(args.files)]
+    folder = tempfile.mkdtemp(prefix='bench_save_')
+    try:
+        legacy_time = timed(legacy_save, writers, folder)
+        current_time = timed(current_save, writers, folder)
+    finally:
+        shutil.rmtree(folder)
+
+    print('%d files, %d boxes each' % (args.files, args.boxes))
+    print('reparse + codecs : %8.3fs %10.0f files/s' % (legacy_time, args.files / legacy_time))
+    print('direct + atomic  : %8.3fs %10.0f files/s' % (current_time, args.files / current_time))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
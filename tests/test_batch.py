@@ -0,0 +1,151 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PIL import Image
+from lxml import etree
+from libs.batchTasks import validateAnnotation, fillLocation, recomputeTruncated, refreshInventory, findCrops, \
+    bestThumbnailCrops, openForCrops, writeThumbnails
+from libs.pascal_voc_io import PascalVocWriter, readSignRecord
+from libs.signInventory import SignInventory
+import labelImgBatch
+
+
+class TestBatchTasks(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.xml = os.path.join(self.tmp, 'sign.xml')
+        writer = PascalVocWriter('tmp', 'sign.jpg', (48, 64, 3))
+        writer.addBndBox(1, 10, 20, 30, 'SIGN', 0, {'SignMainGeneralOID': 7, 'Retired': 'N', 'SignAge': 3})
+        writer.addBndBox(10, 10, 20, 30, 'SIGN', 0)
+        writer.save(self.xml)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_validate(self):
+        self.assertEqual(validateAnnotation(self.xml).problems, [])
+        self.assertEqual(validateAnnotation(self.xml, checkImages=True).problems, ['image not found'])
+        root = etree.parse(self.xml).getroot()
+        root.findall('object')[1].find('bndbox/xmax').text = '80'
+        root.getroottree().write(self.xml)
+        problems = validateAnnotation(self.xml).problems
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith('object 1: box'))
+
+    def test_fill_location(self):
+        exif = Image.Exif()
+        exif[0x8825] = {1: 'N', 2: (44.0, 30.0, 0.0), 3: 'W', 4: (72.0, 0.0, 0.0), 5: b'\x00', 6: 200.0}
+        Image.new('RGB', (64, 48)).save(os.path.join(self.tmp, 'sign.jpg'), 'JPEG', exif=exif.tobytes())
+        result = fillLocation(self.xml)
+        self.assertTrue(result.changed)
+        root = etree.parse(self.xml).getroot()
+        self.assertEqual(root.find('Location/Latitude').text, '44.5')
+        self.assertEqual(root.find('Location/Longitude').text, '-72.0')
+        self.assertEqual(root.find('Location/Altitude').text, '200.0')
+        # Already filled
+        self.assertFalse(fillLocation(self.xml).changed)
+
+        # No altitude in the EXIF: an empty element, not the text 'None'
+        exif = Image.Exif()
+        exif[0x8825] = {1: 'N', 2: (44.0, 30.0, 0.0), 3: 'W', 4: (72.0, 0.0, 0.0)}
+        Image.new('RGB', (64, 48)).save(os.path.join(self.tmp, 'sign.jpg'), 'JPEG', exif=exif.tobytes())
+        self.assertTrue(fillLocation(self.xml, overwrite=True).changed)
+        root = etree.parse(self.xml).getroot()
+        self.assertEqual(root.find('Location/Latitude').text, '44.5')
+        self.assertIsNone(root.find('Location/Altitude').text)
+
+    def test_truncated(self):
+        root = etree.parse(self.xml).getroot()
+        self.assertEqual([obj.find('truncated').text for obj in root.findall('object')], ['1', '0'])
+        for obj in root.findall('object'):
+            obj.find('truncated').text = '0'
+        root.getroottree().write(self.xml)
+        self.assertTrue(recomputeTruncated(self.xml).changed)
+        root = etree.parse(self.xml).getroot()
+        self.assertEqual([obj.find('truncated').text for obj in root.findall('object')], ['1', '0'])
+        self.assertFalse(recomputeTruncated(self.xml).changed)
+
+    def test_refresh_inventory(self):
+        dbPath = os.path.join(self.tmp, 'inventory.db')
+        SignInventory(dbPath).importRecords([
+            {'SignMainGeneralOID': 7, 'Retired': 'Y', 'SignAge': 3, 'PublishDate': '2018-05-01'}])
+        mtime = os.path.getmtime(self.xml)
+        result = refreshInventory(self.xml, dbPath, dryRun=True)
+        self.assertEqual(sorted((c.field, c.old, c.new) for c in result.changes),
+                         [('PublishDate', '', '2018-05-01'), ('Retired', 'N', 'Y')])
+        self.assertEqual(os.path.getmtime(self.xml), mtime)
+
+        self.assertTrue(refreshInventory(self.xml, dbPath).changed)
+        record = readSignRecord(etree.parse(self.xml).getroot().find('object'))
+        self.assertEqual((record['Retired'], record['SignAge']), ('Y', 3))
+        self.assertFalse(refreshInventory(self.xml, dbPath).changed)
+
+        SignInventory(dbPath).importRecords([{'SignMainGeneralOID': 8}])
+        self.assertEqual(refreshInventory(self.xml, dbPath).problems, ['object 0: sign 7 not in the inventory'])
+
+    def test_refresh_partial_inventory(self):
+        writer = PascalVocWriter('tmp', 'sign.jpg', (48, 64, 3))
+        writer.addBndBox(1, 10, 20, 30, 'SIGN', 0,
+                         {'SignMainGeneralOID': 7, 'Retired': 'N', 'County': 'Kent', 'SignAge': 7})
+        writer.save(self.xml)
+        # A snapshot without County and SignAge
+        csvPath = os.path.join(self.tmp, 'signs.csv')
+        with open(csvPath, 'w') as f:
+            f.write('SignMainGeneralOID,Retired\n7,Y\n')
+        dbPath = os.path.join(self.tmp, 'partial.db')
+        SignInventory(dbPath).importFile(csvPath)
+        result = refreshInventory(self.xml, dbPath)
+        self.assertEqual([(c.field, c.old, c.new) for c in result.changes], [('Retired', 'N', 'Y')])
+        record = readSignRecord(etree.parse(self.xml).getroot().find('object'))
+        self.assertEqual((record['Retired'], record['County'], record['SignAge']), ('Y', 'Kent', 7))
+
+        args = ['refresh-inventory', self.xml, '--inventory', csvPath, '-j', '1']
+        self.assertEqual(labelImgBatch.main(args), 0)
+        self.assertEqual(labelImgBatch.main(args + ['--fields', 'Retired,County']), 1)
+        # A sign the snapshot does not have
+        writer.addBndBox(10, 10, 20, 30, 'SIGN', 0, {'SignMainGeneralOID': 8})
+        writer.save(self.xml)
+        self.assertEqual(labelImgBatch.main(args), 1)
+
+    def test_thumbnails(self):
+        image = Image.new('RGB', (1600, 1200), (0, 0, 255))
+        image.paste((255, 0, 0), (400, 400, 1200, 1000))
+        image.save(os.path.join(self.tmp, 'road.jpg'), 'JPEG', quality=95)
+        writer = PascalVocWriter('tmp', 'road.jpg', (1200, 1600, 3))
+        writer.addBndBox(400, 400, 1200, 1000, 'SIGN', 0, {'subclass': 'R1-1'})
+        writer.addBndBox(20, 20, 200, 200, 'SIGN', 0, {'subclass': 'R1-1'})
+        # Larger, but difficult
+        writer.addBndBox(10, 10, 1500, 1100, 'SIGN', 1, {'subclass': 'R1-1'})
+        writer.addBndBox(20, 20, 100, 100, 'SIGN', 0)
+        xml = os.path.join(self.tmp, 'road.xml')
+        writer.save(xml)
+
+        crops, problems = findCrops(xml)
+        self.assertEqual(problems, [])
+        self.assertEqual([crop.subclass for crop in crops], ['R1-1', 'R1-1', 'R1-1', ''])
+        self.assertEqual([crop.difficult for crop in crops], [False, False, True, False])
+        best = bestThumbnailCrops(crops)
+        self.assertEqual(list(best), ['R1-1'])
+        self.assertEqual(best['R1-1'].box, (400, 400, 1200, 1000))
+
+        # The JPEG is decoded at 1/4, the box still is 200 pixels wide
+        decoded, scale = openForCrops(best['R1-1'].imagePath, [best['R1-1'].box], 200)
+        self.assertEqual((decoded.size, scale), ((400, 300), 0.25))
+
+        path = os.path.join(self.tmp, 'R1-1.png')
+        result = writeThumbnails(best['R1-1'].imagePath, [(best['R1-1'], path)], 100)
+        self.assertEqual((result.changed, result.problems), (True, []))
+        thumbnail = Image.open(path)
+        self.assertEqual(thumbnail.size, (100, 75))
+        red, green, blue = thumbnail.convert('RGB').getpixel((50, 37))
+        self.assertTrue(red > 200 and blue < 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import json
+import shutil
+import tarfile
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+import numpy as np
+from PIL import Image
+from libs.batchTasks import findCrops
+from libs.chipExport import ChipWriter, chipBox, cutChips
+from libs.pascal_voc_io import PascalVocWriter
+from labelImgBatch import main
+
+
+class TestChipExport(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.out = os.path.join(self.tmp, 'chips')
+        for i, color in enumerate([(255, 0, 0), (0, 255, 0), (0, 0, 255)]):
+            image = Image.new('RGB', (400, 300), (0, 0, 0))
+            image.paste(color, (100, 100, 200, 150))
+            image.save(os.path.join(self.tmp, 'road%d.jpg' % i), 'JPEG', quality=95)
+            writer = PascalVocWriter('tmp', 'road%d.jpg' % i, (300, 400, 3))
+            writer.addBndBox(100, 100, 200, 150, 'SIGN', 0, {'subclass': 'R1-%d' % (i % 2)})
+            writer.addBndBox(300, 200, 350, 250, 'SIGN', 0)
+            writer.save(os.path.join(self.tmp, 'road%d.xml' % i))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_chip_box(self):
+        self.assertEqual(chipBox((100, 100, 200, 150), 0.1), (90.0, 65.0, 210.0, 185.0))
+        crops, _ = findCrops(os.path.join(self.tmp, 'road0.xml'))
+        (crop, chip), _ = cutChips(crops[0].imagePath, crops, 32, 0.0, encode=False)
+        self.assertEqual(chip.shape, (32, 32, 3))
+        # The box is squared: red in the middle, black above and below
+        self.assertTrue(chip[16, 16, 0] > 200 and chip[2, 16, 0] < 50)
+
+    def test_tar_and_resume(self):
+        self.assertEqual(main(['chips', self.tmp, '--out', self.out, '--shard-size', '2', '-j', '1']), 0)
+        with open(os.path.join(self.out, 'labels.txt')) as f:
+            self.assertEqual(f.read(), 'R1-0\nR1-1\n')
+        with tarfile.open(os.path.join(self.out, 'shard-000000.tar')) as tar:
+            self.assertEqual(tar.getnames(), ['000000000.png', '000000000.cls', '000000000.json',
+                                              '000000001.png', '000000001.cls', '000000001.json'])
+            self.assertEqual(tar.extractfile('000000001.cls').read(), b'1')
+            meta = json.loads(tar.extractfile('000000001.json').read().decode('utf8'))
+            self.assertEqual((meta['subclass'], meta['object']), ('R1-1', 0))
+        self.assertEqual(ChipWriter(self.out).chipCount, 3)
+
+        # Interrupted in the middle of the manifest: the last shard is done again
+        manifest = os.path.join(self.out, 'manifest.jsonl')
+        with open(manifest) as f:
+            lines = f.readlines()
+        with open(manifest, 'w') as f:
+            f.write(lines[0] + lines[1][:10])
+        writer = ChipWriter(self.out)
+        self.assertEqual((writer.shardCount, writer.chipCount, len(writer.doneImages)), (1, 2, 2))
+        self.assertEqual(main(['chips', self.tmp, '--out', self.out, '--shard-size', '2', '-j', '1']), 0)
+        with open(manifest) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_npy(self):
+        self.assertEqual(main(['chips', self.tmp, '--out', self.out, '--format', 'npy', '--size', '16',
+                               '-j', '1']), 0)
+        chips = np.load(os.path.join(self.out, 'shard-000000.npy'), mmap_mode='r')
+        labels = np.load(os.path.join(self.out, 'shard-000000.labels.npy'))
+        self.assertEqual(chips.shape, (3, 16, 16, 3))
+        self.assertEqual(labels.tolist(), [0, 1, 0])
+        # Nothing left to do
+        self.assertEqual(main(['chips', self.tmp, '--out', self.out, '--format', 'npy', '-j', '1']), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.out, 'shard-000001.npy')))
+        self.assertEqual(main(['chips', self.tmp, '--out', self.out, '-j', '1']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs import dirScanner
+from libs.dirScanner import DirScanner, scanImages
+
+
+class TestDirScanner(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ['b.JPG', 'A.png', 'a.jpg', 'notes.txt', 'c.bmp', 'a/x.jpeg', 'a/Y.jpg', 'a/z.gif',
+                     'B/z.png', 'a.b/q.jpg']:
+            path = os.path.join(self.tmp, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as f:
+                f.write(b'x')
+        self.expected = [os.path.join(self.tmp, name) for name in
+                         ['a.b/q.jpg', 'a.jpg', 'A.png', 'a/x.jpeg', 'a/Y.jpg', 'b.JPG', 'B/z.png', 'c.bmp']]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_order_and_filter(self):
+        paths = list(scanImages(self.tmp))
+        self.assertEqual(paths, self.expected)
+        # The same order as sorting the whole list by lower-cased path
+        self.assertEqual(paths, sorted(paths, key=lambda path: path.lower()))
+
+    def test_cancel(self):
+        found = []
+        for path in scanImages(self.tmp, lambda: len(found) >= 2):
+            found.append(path)
+        self.assertEqual(found, self.expected[:2])
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'needs symlinks')
+    def test_symlink_loop(self):
+        # A link back to the top and a linked image
+        os.symlink(self.tmp, os.path.join(self.tmp, 'a', 'loop'))
+        os.symlink(os.path.join(self.tmp, 'c.bmp'), os.path.join(self.tmp, 'B', 'd.bmp'))
+        self.assertEqual(list(scanImages(self.tmp)), self.expected[:6] + [os.path.join(self.tmp, 'B/d.bmp')] +
+                         self.expected[6:])
+
+    def test_batches(self):
+        batchSize, interval = dirScanner.SCAN_BATCH_SIZE, dirScanner.SCAN_BATCH_INTERVAL
+        dirScanner.SCAN_BATCH_SIZE, dirScanner.SCAN_BATCH_INTERVAL = 3, 1000
+        try:
+            batches = []
+            done = []
+            scanner = DirScanner(self.tmp)
+            scanner.batchFound.connect(batches.append)
+            scanner.scanned.connect(lambda total, cancelled: done.append((total, cancelled)))
+            scanner.run()
+        finally:
+            dirScanner.SCAN_BATCH_SIZE, dirScanner.SCAN_BATCH_INTERVAL = batchSize, interval
+        # The first path on its own, then full batches, then the rest
+        self.assertEqual([len(batch) for batch in batches], [1, 3, 3, 1])
+        self.assertEqual(sum(batches, []), self.expected)
+        self.assertEqual(done, [(8, False)])
+
+if __name__ == '__main__':
+    unittest.main()
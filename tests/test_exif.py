@@ -0,0 +1,51 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+from io import BytesIO
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PIL import Image
+from libs.getExImgInfo import read_gps_header, get_exif_data, get_lat_lon
+
+
+def make_jpeg(gps=None):
+    exif = Image.Exif()
+    exif[0x0112] = 1
+    if gps is not None:
+        exif[0x8825] = gps
+    data = BytesIO()
+    Image.new('RGB', (64, 48)).save(data, 'JPEG', exif=exif.tobytes())
+    data.seek(0)
+    return data
+
+
+class TestReadGpsHeader(TestCase):
+
+    def test_gps(self):
+        jpeg = make_jpeg({1: 'N', 2: (44.0, 17.0, 48.75), 3: 'W', 4: (72.0, 41.0, 3.5),
+                          5: b'\x00', 6: 250.5})
+        record = read_gps_header(jpeg)
+        self.assertAlmostEqual(record.latitude, 44.296875)
+        self.assertAlmostEqual(record.longitude, -72.6843055555)
+        self.assertAlmostEqual(record.altitude, 250.5)
+
+        # Same answer as the PIL path
+        jpeg.seek(0)
+        lat, lon, alt = get_lat_lon(get_exif_data(Image.open(jpeg)))
+        self.assertEqual(tuple(record), (lat, lon, alt))
+
+    def test_below_sea_level_and_no_altitude(self):
+        record = read_gps_header(make_jpeg({1: 'S', 2: (1.0, 30.0, 0.0), 3: 'E', 4: (2.0, 0.0, 0.0),
+                                            5: b'\x01', 6: 3.0}))
+        self.assertEqual(tuple(record), (-1.5, 2.0, -3.0))
+        record = read_gps_header(make_jpeg({1: 'N', 2: (1.0, 0.0, 0.0), 3: 'E', 4: (2.0, 0.0, 0.0)}))
+        self.assertIsNone(record.altitude)
+
+    def test_no_gps(self):
+        self.assertIsNone(read_gps_header(make_jpeg()))
+        self.assertIsNone(read_gps_header(os.path.join(dir_name, 'test.bmp')))
+
+if __name__ == '__main__':
+    unittest.main()
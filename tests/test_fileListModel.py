@@ -0,0 +1,86 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication
+from libs.fileListModel import FileListModel
+from libs.pascal_voc_io import PascalVocWriter
+
+
+class TestFileListModel(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.tmp, '%s.jpg' % name) for name in ('a', 'b', 'c')]
+        self.writeXml('a', 2, verified=True)
+        self.writeXml('b', 1)
+        self.reads = []
+        self.model = FileListModel(self.xmlPathFor)
+        self.model.extend(self.paths)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def xmlPathFor(self, imagePath):
+        self.reads.append(imagePath)
+        return os.path.splitext(imagePath)[0] + '.xml'
+
+    def writeXml(self, name, boxes, verified=False):
+        writer = PascalVocWriter('tmp', name + '.jpg', (48, 64, 3))
+        writer.verified = verified
+        for i in range(boxes):
+            writer.addBndBox(10, 10 + i, 20, 30, 'SIGN', 0)
+        writer.save(os.path.join(self.tmp, name + '.xml'))
+
+    def texts(self, row):
+        return [self.model.data(self.model.index(row, column)) for column in range(self.model.columnCount())]
+
+    def test_columns(self):
+        model = self.model
+        self.assertEqual((model.rowCount(), model.columnCount()), (3, 4))
+        self.assertEqual([model.headerData(i, Qt.Horizontal) for i in range(4)], ['File', 'XML', 'Verified', 'Boxes'])
+        self.assertEqual(self.texts(0), [self.paths[0], u'✓', u'✓', '2'])
+        self.assertEqual(self.texts(1), [self.paths[1], u'✓', '', '1'])
+        self.assertEqual(self.texts(2), [self.paths[2], '', '', ''])
+        self.assertEqual(model.indexOf(self.paths[1]), 1)
+        self.assertEqual(model.indexOf('missing.jpg'), -1)
+
+    def test_lazy_status(self):
+        # Nothing is read until a status column is shown
+        self.assertEqual(self.reads, [])
+        self.model.data(self.model.index(1, FileListModel.COLUMN_FILE))
+        self.assertEqual(self.reads, [])
+        self.model.data(self.model.index(1, FileListModel.COLUMN_BOXES))
+        self.model.data(self.model.index(1, FileListModel.COLUMN_XML))
+        self.assertEqual(self.reads, [self.paths[1]])
+
+    def test_invalidate_status(self):
+        changed = []
+        self.model.dataChanged.connect(lambda first, last: changed.append((first.row(), last.row())))
+        self.assertEqual(self.texts(1)[3], '1')
+        self.assertEqual(self.texts(2)[1], '')
+        self.writeXml('b', 3)
+        self.writeXml('c', 1)
+        # Cached until invalidated
+        self.assertEqual(self.texts(1)[3], '1')
+        self.model.invalidateStatus(self.paths[1])
+        self.assertEqual(changed, [(1, 1)])
+        self.assertEqual(self.texts(1)[3], '3')
+        self.assertEqual(self.texts(2)[1], '')
+        self.model.invalidateStatus()
+        self.assertEqual(changed[-1], (0, 2))
+        self.assertEqual(self.texts(2)[1:], [u'✓', '', '1'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+from math import sin, cos, sqrt, atan2, radians
+
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs import geo
+
+
+def scalarDistance(lat1, lon1, lat2, lon2):
+    """The formula the sign panel used before libs.geo, in meters."""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6373.0 * 2 * atan2(sqrt(a), sqrt(1 - a)) * 1000
+
+
+class TestGeo(TestCase):
+
+    def test_haversine_matches_scalar(self):
+        lats = np.array([44.2968, 44.3001, 44.2500])
+        lons = np.array([-72.6843, -72.6800, -72.7000])
+        distances = geo.haversine(44.2960, -72.6850, lats, lons)
+        self.assertEqual(distances.shape, (3,))
+        for lat, lon, distance in zip(lats, lons, distances):
+            self.assertAlmostEqual(distance, scalarDistance(44.2960, -72.6850, lat, lon), places=6)
+        self.assertEqual(float(geo.haversine(44.0, -72.0, 44.0, -72.0)), 0.0)
+
+    def test_vincenty(self):
+        # Flinders Peak to Buninyong, the example of Vincenty's paper
+        distance = geo.vincenty(-37.95103342, 144.42486789, -37.65282114, 143.92649554)
+        self.assertAlmostEqual(float(distance), 54972.271, places=2)
+        distances = geo.vincenty([0.0, 44.0], [0.0, -72.0], [0.5, 44.0], [179.7, -72.0])
+        self.assertTrue(np.all(np.isfinite(distances)))
+        self.assertEqual(distances[1], 0.0)
+
+    def test_bearing_and_offsets(self):
+        self.assertAlmostEqual(float(geo.bearing(44.0, -72.0, 44.001, -72.0)), 0.0)
+        self.assertAlmostEqual(float(geo.bearing(44.0, -72.0, 44.0, -71.999)), np.pi / 2, places=4)
+        east, north = geo.enu(44.0, -72.0, 44.0, -71.999)
+        self.assertAlmostEqual(float(north), 0.0)
+        self.assertAlmostEqual(float(east), float(geo.haversine(44.0, -72.0, 44.0, -71.999)), places=2)
+
+        # Driving north, one sign ahead and one to the right
+        heading = geo.bearing(43.999, -72.0, 44.0, -72.0)
+        xd, yd, distance = geo.signOffsets(heading, 44.0, -72.0, [44.0005, 44.0], [-72.0, -71.9995])
+        np.testing.assert_allclose(xd, [0.0, distance[1]], atol=1e-3)
+        np.testing.assert_allclose(yd, [distance[0], 0.0], atol=1e-3)
+
+    def test_offsets_wrap_around(self):
+        # Heading 359 degrees, signs at a bearing of about 1 degree, to the left and behind
+        heading = np.radians(359.0)
+        lats, lons = [44.001, 44.0, 43.999], [-71.99998, -72.0005, -72.0]
+        bearings = np.degrees(geo.bearing(44.0, -72.0, lats, lons))
+        self.assertAlmostEqual(float(bearings[0]), 1.0, places=0)
+        xd, yd, distance = geo.signOffsets(heading, 44.0, -72.0, lats, lons)
+        angle = np.radians(bearings[0] - 359.0 + 360.0)
+        np.testing.assert_allclose([xd[0], yd[0]], [distance[0] * np.sin(angle), distance[0] * np.cos(angle)])
+        self.assertTrue(0 < xd[0] < 0.05 * distance[0])
+        self.assertTrue(xd[1] < 0 and yd[2] < 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PIL import Image
+from libs.geoIndex import GeoIndex, INDEX_FILENAME
+
+
+class TestGeoIndex(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        exif = Image.Exif()
+        exif[0x8825] = {1: 'N', 2: (44.0, 30.0, 0.0), 3: 'W', 4: (72.0, 0.0, 0.0), 5: b'\x00', 6: 200.0}
+        self.gpsPath = os.path.join(self.tmp, 'gps.jpg')
+        Image.new('RGB', (64, 48)).save(self.gpsPath, 'JPEG', exif=exif.tobytes())
+        self.plainPath = os.path.join(self.tmp, 'plain.jpg')
+        Image.new('RGB', (32, 16)).save(self.plainPath, 'JPEG')
+        self.paths = [self.gpsPath, self.plainPath]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_read_only_folder(self):
+        self.assertEqual(GeoIndex.defaultIndexPath(self.tmp), os.path.join(self.tmp, INDEX_FILENAME))
+        saveDir = tempfile.mkdtemp()
+        try:
+            # Only saveDir is writable
+            with mock.patch('libs.geoIndex.os.access', lambda path, mode: path == saveDir):
+                indexPath = GeoIndex.defaultIndexPath(self.tmp + os.sep, saveDir)
+                self.assertIsNone(GeoIndex.defaultIndexPath(self.tmp))
+            self.assertEqual(indexPath, os.path.join(saveDir, os.path.basename(self.tmp) + '-' + INDEX_FILENAME))
+            index = GeoIndex(self.tmp, indexPath)
+            self.assertEqual(index.update(self.paths), 2)
+            self.assertEqual(index.lookup(self.gpsPath).geoInfo, (44.5, -72.0, 200.0))
+            # Nothing written next to the images
+            self.assertEqual(sorted(os.listdir(self.tmp)), ['gps.jpg', 'plain.jpg'])
+        finally:
+            shutil.rmtree(saveDir)
+
+    def test_hit_after_update(self):
+        index = GeoIndex(self.tmp)
+        self.assertIsNone(index.lookup(self.gpsPath))
+        self.assertEqual(index.update(self.paths), 2)
+        record = index.lookup(self.gpsPath)
+        self.assertEqual(record.geoInfo, (44.5, -72.0, 200.0))
+        self.assertEqual((record.width, record.height), (64, 48))
+        self.assertIsNone(index.lookup(self.plainPath).geoInfo)
+        # Nothing to read again
+        self.assertEqual(index.update(self.paths), 0)
+
+    def test_miss_after_change(self):
+        index = GeoIndex(self.tmp)
+        index.update(self.paths)
+        st = os.stat(self.gpsPath)
+        os.utime(self.gpsPath, (st.st_atime, st.st_mtime + 10))
+        self.assertIsNone(index.lookup(self.gpsPath))
+        self.assertIsNotNone(index.lookup(self.plainPath))
+
+        index.update(self.paths)
+        self.assertIsNotNone(index.lookup(self.gpsPath))
+        # Same mtime, other size
+        st = os.stat(self.plainPath)
+        with open(self.plainPath, 'ab') as f:
+            f.write(b'\0')
+        os.utime(self.plainPath, (st.st_atime, st.st_mtime))
+        self.assertIsNone(index.lookup(self.plainPath))
+        self.assertEqual(index.update(self.paths), 1)
+
+    def test_prune(self):
+        index = GeoIndex(self.tmp)
+        index.update(self.paths)
+        os.remove(self.plainPath)
+        index.update([self.gpsPath])
+        self.assertEqual(list(index.records()), [self.gpsPath])
+        # Without prune the rows of other images stay
+        index.update(self.paths)
+        index.update([], prune=False)
+        self.assertEqual(list(index.records()), [self.gpsPath])
+
+    def test_reopen(self):
+        GeoIndex(self.tmp).update(self.paths)
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp, INDEX_FILENAME)))
+        index = GeoIndex(self.tmp)
+        self.assertEqual(index.lookup(self.gpsPath).geoInfo, (44.5, -72.0, 200.0))
+        self.assertEqual(index.update(self.paths), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import math
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs import geo
+from libs.gpsTrack import GpsTrack
+
+
+class FakeRecord(object):
+
+    def __init__(self, latitude, longitude, captureTime):
+        self.latitude, self.longitude, self.captureTime = latitude, longitude, captureTime
+        self.geoInfo = None if latitude is None else (latitude, longitude, None)
+
+
+class FakeIndex(object):
+
+    def __init__(self, records):
+        self._records = records
+
+    def records(self):
+        return self._records
+
+
+class TestGpsTrack(TestCase):
+
+    def test_heading_speed_chainage(self):
+        # Driving north 10 m per second, then standing still, then east
+        lats = [44.0 + i * 0.00009 for i in range(6)] + [44.00045] * 5
+        lons = [-72.0] * 11
+        lats += [44.00045] * 5
+        lons += [-72.0 + i * 0.000125 for i in range(1, 6)]
+        times = ['2018-03-15T10:00:%02d' % i for i in range(len(lats))]
+        paths = ['/data/%03d.jpg' % i for i in range(len(lats))]
+        track = GpsTrack(paths, lats, lons, times)
+
+        self.assertEqual(len(track), len(paths))
+        first = track.frame(paths[0])
+        self.assertAlmostEqual(first.heading, 0.0, places=3)
+        self.assertEqual(first.chainage, 0.0)
+        self.assertAlmostEqual(track.frame(paths[3]).speed, 10.0, delta=0.1)
+        self.assertAlmostEqual(track.frame(paths[3]).step, 10.0, delta=0.1)
+        # Standing still keeps the last heading the track had
+        self.assertAlmostEqual(track.frame(paths[8]).heading, track.frame(paths[5]).heading)
+        self.assertAlmostEqual(track.frame(paths[-1]).heading, math.pi / 2, places=2)
+        total = geo.haversine(lats[0], lons[0], lats[5], lons[5]) + geo.haversine(lats[10], lons[10], lats[-1], lons[-1])
+        self.assertAlmostEqual(track.frame(paths[-1]).chainage, float(total), places=6)
+        self.assertIsNone(track.frame('/data/other.jpg'))
+
+    def test_order_does_not_depend_on_list(self):
+        lats, lons = [44.0, 44.0001, 44.0002], [-72.0] * 3
+        times = ['2018-03-15T10:00:02', '2018-03-15T10:00:00', '2018-03-15T10:00:01']
+        track = GpsTrack(['a.jpg', 'b.jpg', 'c.jpg'], lats, lons, times)
+        self.assertEqual(track.paths, ['b.jpg', 'c.jpg', 'a.jpg'])
+        self.assertEqual(track.frame('b.jpg').chainage, 0.0)
+
+        # Without capture times the list order is kept and there is no speed
+        track = GpsTrack.fromGeoIndex(FakeIndex({
+            os.path.abspath('a.jpg'): FakeRecord(44.0, -72.0, None),
+            os.path.abspath('b.jpg'): FakeRecord(None, None, None),
+            os.path.abspath('c.jpg'): FakeRecord(44.0001, -72.0, '2018-03-15T10:00:01'),
+        }), ['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual(track.paths, ['a.jpg', 'c.jpg'])
+        self.assertIsNone(track.frame('c.jpg').speed)
+        self.assertAlmostEqual(track.frame('a.jpg').heading, 0.0, places=3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -28,5 +28,73 @@ class TestPascalVocRW(TestCase):
         self.assertEqual(face[0], 'face')
         self.assertEqual(face[1], [(113, 40), (450, 40), (450, 403), (113, 403)])
 
+    def test_sign_fields(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..', 'libs'))
+        from datetime import date
+        from pascal_voc_io import PascalVocWriter, PascalVocReader, SignRecord
+
+        sign = {'latitude': '44.5', 'longitude': -72.25, 'subclass': 'R1-1', 'ID': '1204',
+                'OFFSET': '12.5', 'PublishDate': '2017-06-01', 'SignAge': 'unknown', 'notAField': 1}
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addBndBox(60, 40, 430, 504, 'sign', 0, sign)
+        writer.save('tests/test.xml')
+
+        record = PascalVocReader('tests/test.xml').objects[0]
+        self.assertEqual(record['latitude'], 44.5)
+        self.assertEqual(record['longitude'], -72.25)
+        self.assertEqual(record['ID'], 1204)
+        self.assertEqual(record['OFFSET'], 12.5)
+        self.assertEqual(record['PublishDate'], date(2017, 6, 1))
+        self.assertEqual(record['subclass'], 'R1-1')
+        self.assertIsNone(record['altitude'])
+        self.assertEqual(record['Marker'], '')
+        # Kept as typed, but reported
+        self.assertEqual(record['SignAge'], 'unknown')
+        self.assertEqual(record.invalidFields(), ['SignAge'])
+        self.assertRaises(KeyError, lambda: record['notAField'])
+        self.assertEqual(SignRecord(record).items(), record.items())
+
+    def test_read_errors(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..', 'libs'))
+        from pascal_voc_io import PascalVocWriter, PascalVocReader
+
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addBndBox(60, 40, 430, 504, 'person', 0, {'ID': 7})
+        writer.addBndBox(113, 40, 450, 403, 'face', 0, {'ID': 8})
+        writer.save('tests/test.xml')
+        with open('tests/test.xml') as f:
+            text = f.read()
+        with open('tests/test.xml', 'w') as f:
+            f.write(text.replace('<xmin>60</xmin>', '<xmin>sixty</xmin>'))
+
+        reader = PascalVocReader('tests/test.xml')
+        self.assertEqual([shape[0] for shape in reader.getShapes()], ['face'])
+        self.assertEqual(reader.objects[0]['ID'], 8)
+        self.assertEqual(len(reader.errors), 1)
+        self.assertTrue(reader.errors[0].startswith('object 0 (person)'))
+
+        self.assertEqual(PascalVocReader('tests/missing.xml').shapes, [])
+        self.assertEqual(len(PascalVocReader('tests/missing.xml').errors), 1)
+
+    def test_save_keeps_text(self):
+        dir_name = os.path.abspath(os.path.dirname(__file__))
+        sys.path.insert(0, os.path.join(dir_name, '..', 'libs'))
+        from pascal_voc_io import PascalVocWriter, PascalVocReader
+
+        writer = PascalVocWriter('tests', 'test', (512, 512, 1), localImgPath='tests/test.bmp')
+        writer.addBndBox(60, 40, 430, 504, 'stop  sign', 0, {'STREETNAME': 'MAIN  ST'})
+        writer.save('tests/test.xml')
+        with open('tests/test.xml', 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b'<annotation>\n\t<folder>tests</folder>\n'))
+        self.assertTrue(data.endswith(b'\t</object>\n</annotation>\n'))
+
+        shape = PascalVocReader('tests/test.xml').getShapes()[0]
+        self.assertEqual(shape[0], 'stop  sign')
+        self.assertEqual(shape[5]['STREETNAME'], 'MAIN  ST')
+        self.assertEqual([name for name in os.listdir('tests') if name.endswith('.tmp')], [])
+
 if __name__ == '__main__':
     unittest.main()
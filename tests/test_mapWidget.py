@@ -0,0 +1,56 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+import numpy as np
+from libs.mapWidget import mercator, VectorLayer
+
+
+class TestMapData(TestCase):
+
+    def test_mercator(self):
+        x, y = mercator(0.0, 0.0)
+        self.assertAlmostEqual(float(x), 0.5)
+        self.assertAlmostEqual(float(y), 0.5)
+        # Tile 0/0 at zoom 1 is the north-west quarter
+        x, y = mercator([60.0, -60.0], [-90.0, 90.0])
+        self.assertTrue(x[0] < 0.5 < x[1])
+        self.assertTrue(y[0] < 0.5 < y[1])
+
+    def test_geojson_layer(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'signs.geojson')
+            with open(path, 'w') as f:
+                json.dump({'type': 'FeatureCollection', 'features': [
+                    {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-72.68, 44.29]},
+                     'properties': {'MUTCDCode': 'R1-1'}},
+                    {'type': 'Feature', 'geometry': {'type': 'LineString',
+                                                     'coordinates': [[-72.69, 44.28], [-72.68, 44.29, 250.0]]}},
+                    {'type': 'Feature', 'geometry': None},
+                ]}, f)
+            layer = VectorLayer.load(path)
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(layer.points.shape, (1, 2))
+        self.assertEqual(layer.labels, ['R1-1'])
+        self.assertEqual(len(layer.lines), 1)
+        self.assertAlmostEqual(layer.lines[0][1][0], layer.points[0][0])
+
+    def test_points_in(self):
+        points = np.array([[0.1, 0.1], [0.5, 0.5], [0.52, 0.3], [0.9, 0.55]])
+        layer = VectorLayer('signs', points, [], ['a', 'b', 'c', 'd'])
+        pixels, indices = layer.pointsIn(1000, 400, 400, 600, 600)
+        self.assertEqual(list(indices), [1])
+        self.assertEqual(pixels.tolist(), [[500.0, 500.0]])
+        self.assertEqual(list(layer.pointsIn(1000, 0, 0, 1000, 1000)[1]), [0, 1, 2, 3])
+        self.assertEqual(len(VectorLayer('empty', np.zeros((0, 2)), [], []).pointsIn(1000, 0, 0, 1000, 1000)[0]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtGui import QImage
+from libs.imageLoader import ImageRecord
+from libs.prefetcher import ImagePrefetcher
+
+
+class TestImagePrefetcher(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(8):
+            path = os.path.join(self.tmp, '%d.jpg' % i)
+            with open(path, 'wb') as f:
+                f.write(b'x')
+            self.paths.append(path)
+        self.loaded = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def loader(self, filePath):
+        self.loaded.append(filePath)
+        # 100 x 100 RGB32: 40000 bytes
+        image = QImage(100, 100, QImage.Format_RGB32)
+        return ImageRecord(filePath, os.path.getmtime(filePath), b'', image, None)
+
+    def wait(self, prefetcher):
+        for future in list(prefetcher._cache.values()):
+            future.exception()
+
+    def test_window(self):
+        prefetcher = ImagePrefetcher(self.loader, ahead=2, behind=1, capacity=4)
+        prefetcher.prefetch(self.paths, 3)
+        self.wait(prefetcher)
+        self.assertEqual(sorted(self.loaded), [self.paths[2], self.paths[4], self.paths[5]])
+        # Nearest is the most recently used
+        self.assertEqual(list(prefetcher._cache), [self.paths[5], self.paths[2], self.paths[4]])
+        self.assertEqual(prefetcher.take(self.paths[4]).filePath, self.paths[4])
+        self.assertIsNone(prefetcher.take(self.paths[0]))
+        prefetcher.shutdown()
+
+    def test_lru_eviction(self):
+        prefetcher = ImagePrefetcher(self.loader, ahead=1, behind=0, capacity=2)
+        for index in range(4):
+            prefetcher.prefetch(self.paths, index)
+        self.wait(prefetcher)
+        self.assertEqual(list(prefetcher._cache), [self.paths[3], self.paths[4]])
+        # Taking an image makes it the most recently used
+        prefetcher.take(self.paths[3])
+        prefetcher.prefetch(self.paths, 5)
+        self.assertEqual(list(prefetcher._cache), [self.paths[3], self.paths[6]])
+        prefetcher.shutdown()
+
+    def test_byte_limit(self):
+        prefetcher = ImagePrefetcher(self.loader, ahead=1, behind=0, capacity=6, maxBytes=100000)
+        for index in range(4):
+            prefetcher.prefetch(self.paths, index)
+            self.wait(prefetcher)
+        prefetcher.take(self.paths[4])
+        # Two decoded images fit in 100000 bytes, not three
+        self.assertEqual(list(prefetcher._cache), [self.paths[3], self.paths[4]])
+        prefetcher.shutdown()
+
+    def test_failing_loader(self):
+        def failing(filePath):
+            raise IOError('cannot read %s' % filePath)
+        prefetcher = ImagePrefetcher(failing, ahead=1, behind=0)
+        prefetcher.prefetch(self.paths, 0)
+        self.assertIsNone(prefetcher.take(self.paths[1]))
+        self.assertNotIn(self.paths[1], prefetcher._cache)
+        prefetcher.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
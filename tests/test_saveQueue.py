@@ -0,0 +1,42 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import threading
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.saveQueue import SaveQueue
+
+
+class TestSaveQueue(TestCase):
+
+    def test_coalesce_and_flush(self):
+        queue = SaveQueue()
+        written = []
+        release = threading.Event()
+
+        def blocking():
+            release.wait(5)
+            written.append(('a.xml', 0))
+
+        queue.submit('a.xml', 'a.jpg', blocking)
+        # While a.xml is being written, b.xml is queued three times
+        for version in range(1, 4):
+            queue.submit('b.xml', 'b.jpg', lambda version=version: written.append(('b.xml', version)))
+        self.assertTrue(queue.isPending('b.jpg'))
+        self.assertTrue(queue.isPending('a.xml'))
+        release.set()
+        queue.flush('b.jpg')
+        self.assertEqual(written, [('a.xml', 0), ('b.xml', 3)])
+        self.assertFalse(queue.isPending())
+
+        def failing():
+            raise IOError('disk full')
+        queue.submit('c.xml', 'c.jpg', failing)
+        queue.stop()
+        self.assertFalse(queue.isPending())
+        self.assertFalse(queue.isRunning())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import math
+import json
+import shutil
+import tempfile
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from datetime import date
+from libs.signInventory import SignInventory
+
+
+class TestSignInventory(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.inventory = SignInventory(os.path.join(self.tmp, 'inventory.db'))
+
+    def tearDown(self):
+        self.inventory.close()
+        shutil.rmtree(self.tmp)
+
+    def test_csv_import_and_near(self):
+        path = os.path.join(self.tmp, 'signs.csv')
+        with open(path, 'w') as f:
+            f.write('SignMainGeneralOID,MUTCDCode,LAT,LON,SignAge,PublishDate,Comment\n')
+            # 20 m north, 50 m south, 24 m south east and 500 m north of the camera
+            f.write('1,R1-1,44.00018,-72.0,5,2018/03/01,x\n')
+            f.write('2,W1-1,43.99955,-72.0,,,\n')
+            f.write('3,R2-1,43.99995,-71.9997,,,\n')
+            f.write('4,D1-1,44.0045,-72.0,,,\n')
+            f.write('5,NoPosition,,,,,\n')
+        self.assertEqual(self.inventory.importFile(path), 5)
+        self.assertEqual(len(self.inventory), 5)
+        self.assertEqual(self.inventory.source(), path)
+        self.assertEqual(self.inventory.columns(), set(['SignMainGeneralOID', 'MUTCDCode', 'latitude', 'longitude',
+                                                        'SignAge', 'PublishDate']))
+
+        found = self.inventory.near(44.0, -72.0, radius=100)
+        self.assertEqual([c.record['SignMainGeneralOID'] for c in found], [1, 3, 2])
+        self.assertAlmostEqual(found[0].distance, 20.0, delta=0.1)
+        self.assertIsNone(found[0].offAxis)
+        record = found[0].record
+        self.assertEqual((record['MUTCDCode'], record['SignAge'], record['PublishDate']),
+                         ('R1-1', 5, date(2018, 3, 1)))
+
+        # Driving south: the signs ahead come before the one behind
+        found = self.inventory.near(44.0, -72.0, radius=100, heading=math.pi)
+        self.assertEqual([c.record['SignMainGeneralOID'] for c in found], [3, 2, 1])
+        self.assertAlmostEqual(found[1].offAxis, 0.0, places=3)
+        self.assertEqual(len(self.inventory.near(44.0, -72.0, radius=100, limit=1)), 1)
+
+    def test_geojson_import_replaces(self):
+        path = os.path.join(self.tmp, 'signs.geojson')
+        feature = {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-72.0, 44.0]},
+                   'properties': {'signmaingeneraloid': 7, 'MUTCDCode': 'R1-1'}}
+        with open(path, 'w') as f:
+            json.dump({'type': 'FeatureCollection', 'features': [feature]}, f)
+        self.inventory.importRecords([{'SignMainGeneralOID': 1, 'latitude': 44.0, 'longitude': -72.0}])
+        self.assertEqual(self.inventory.importFile(path), 1)
+        found = self.inventory.near(44.0, -72.0, radius=10)
+        self.assertEqual([c.record['SignMainGeneralOID'] for c in found], [7])
+        self.assertEqual(found[0].record['latitude'], 44.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+import random
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from libs.spatialIndex import GridIndex
+
+
+class TestGridIndex(TestCase):
+
+    def brute(self, rects, x, y, margin=0):
+        hits = [(z, name) for z, (name, (x1, y1, x2, y2)) in enumerate(rects)
+                if x1 - margin <= x <= x2 + margin and y1 - margin <= y <= y2 + margin]
+        return [name for _, name in sorted(hits, reverse=True)]
+
+    def test_matches_brute_force(self):
+        rnd = random.Random(7)
+        rects = []
+        index = GridIndex(cellSize=64)
+        for i in range(300):
+            x, y = rnd.uniform(0, 1900), rnd.uniform(0, 1000)
+            rect = (x, y, x + rnd.uniform(5, 400), y + rnd.uniform(5, 300))
+            rects.append(('box%d' % i, rect))
+            index.insert('box%d' % i, rect)
+        # Move some, drop some
+        for i in range(0, 300, 7):
+            x, y = rnd.uniform(0, 1900), rnd.uniform(0, 1000)
+            rects[i] = (rects[i][0], (x, y, x + 30, y + 30))
+            index.update(rects[i][0], rects[i][1])
+        for i in range(3, 300, 11):
+            index.remove(rects[i][0])
+        removed = set(rects[i][0] for i in range(3, 300, 11))
+        rects = [r if r[0] not in removed else (r[0], (-9, -9, -9, -9)) for r in rects]
+        for _ in range(500):
+            x, y = rnd.uniform(-20, 2300), rnd.uniform(-20, 1300)
+            self.assertEqual(index.query(x, y, 11), self.brute(rects, x, y, 11))
+        self.assertEqual(len(index), 300 - len(removed))
+
+    def test_z_order(self):
+        index = GridIndex()
+        index.insert('bottom', (0, 0, 100, 100))
+        index.insert('top', (50, 50, 150, 150))
+        self.assertEqual(index.query(75, 75), ['top', 'bottom'])
+        # Moving keeps the stacking, re-inserting puts it on top
+        index.update('bottom', (40, 40, 140, 140))
+        self.assertEqual(index.query(75, 75), ['top', 'bottom'])
+        index.insert('bottom', (40, 40, 140, 140))
+        self.assertEqual(index.query(75, 75), ['bottom', 'top'])
+        index.clear()
+        self.assertEqual(index.query(75, 75), [])
+
+if __name__ == '__main__':
+    unittest.main()
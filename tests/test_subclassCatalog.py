@@ -0,0 +1,62 @@
+from unittest import TestCase
+import unittest
+import shutil
+import sys
+import os
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtWidgets import QApplication, QComboBox
+from libs.subclassCatalog import SubclassCatalog, normalizeCode
+
+
+class TestSubclassCatalog(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'subclass.txt')
+        self.write(['R1-1', 'R1-2', 'R1-2aP', 'R2-1', 'W1-1', ''], 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, codes, mtime):
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(codes))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_lookup_and_suggest(self):
+        catalog = SubclassCatalog(self.path)
+        self.assertEqual(len(catalog), 5)
+        self.assertEqual(normalizeCode('r1-2ap '), 'R12AP')
+        self.assertEqual(catalog.lookup('r1 1'), 'R1-1')
+        self.assertIsNone(catalog.lookup('X9'))
+        self.assertEqual(catalog.suggest('r1-2'), ['R1-2', 'R1-2aP'])
+        self.assertIn('W1-1', catalog.suggest('w11x'))
+
+    def test_shared_model_reloads_on_mtime(self):
+        catalog = SubclassCatalog(self.path)
+        first, second = QComboBox(), QComboBox()
+        catalog.bind(first)
+        catalog.bind(second)
+        self.assertIs(first.model(), second.model())
+        self.assertEqual(first.count(), 5)
+        self.assertFalse(catalog.reload())
+
+        self.write(['R1-1', 'S1-1'], 2000)
+        self.assertTrue(catalog.reload())
+        self.assertEqual(second.count(), 2)
+        self.assertEqual(catalog.lookup('s11'), 'S1-1')
+
+        # Typed text does not end up in the shared list
+        first.setEditText('X1-1')
+        self.assertEqual(catalog.model.rowCount(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
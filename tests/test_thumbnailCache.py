@@ -0,0 +1,67 @@
+from unittest import TestCase
+import unittest
+import shutil
+import sys
+import os
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtGui import QColor, QImage, QPixmapCache
+from PyQt5.QtWidgets import QApplication
+from libs.thumbnailCache import ThumbnailCache
+
+
+class TestThumbnailCache(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        QPixmapCache.clear()
+        self.tmp = tempfile.mkdtemp()
+        self.writePreview('R1-1', 400, 200, QColor(255, 0, 0), 1000)
+        self.writePreview('W1-1', 40, 40, QColor(0, 0, 255), 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def writePreview(self, name, width, height, color, mtime):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(color)
+        path = os.path.join(self.tmp, name + '.png')
+        image.save(path)
+        os.utime(path, (mtime, mtime))
+
+    def test_scaled_once(self):
+        cache = ThumbnailCache(self.tmp, 80, watch=False)
+        pixmap = cache.pixmap('R1-1')
+        self.assertEqual((pixmap.width(), pixmap.height()), (80, 40))
+        self.assertEqual(cache.pixmap('W1-1').width(), 40)
+        self.assertIsNone(cache.pixmap('S1-1'))
+        # Served from the QPixmapCache, not the file
+        os.remove(os.path.join(self.tmp, 'R1-1.png'))
+        self.assertEqual(cache.pixmap('R1-1').cacheKey(), pixmap.cacheKey())
+        self.assertEqual(cache.rescan(), ['R1-1'])
+        self.assertIsNone(cache.pixmap('R1-1'))
+
+    def test_atlas(self):
+        cache = ThumbnailCache(self.tmp, 80, watch=False)
+        self.assertFalse(cache.atlasIsCurrent())
+        self.assertEqual(cache.saveAtlas(), 2)
+        self.assertTrue(cache.atlasIsCurrent())
+        self.assertNotIn('.atlas', ThumbnailCache(self.tmp, 80, watch=False).sources)
+
+        QPixmapCache.clear()
+        self.writePreview('W1-1', 40, 40, QColor(0, 255, 0), 2000)
+        cache = ThumbnailCache(self.tmp, 80, watch=False)
+        self.assertFalse(cache.atlasIsCurrent())
+        # The atlas only gives the previews that did not change since
+        self.assertEqual(cache.loadAtlas(), 1)
+        self.assertEqual(QColor(cache.pixmap('R1-1').toImage().pixel(10, 10)), QColor(255, 0, 0))
+        self.assertEqual(QColor(cache.pixmap('W1-1').toImage().pixel(10, 10)), QColor(0, 255, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+from unittest import TestCase
+import unittest
+import sys
+import os
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, '..'))
+from PyQt5.QtCore import QBuffer, QIODevice, QRect, QRectF
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+from PyQt5.QtWidgets import QApplication
+from libs import imageLoader
+from libs.canvas import Canvas
+from libs.imageLoader import decodeImage
+from libs.tiledImage import TiledImage, TILES_PER_PASS
+
+
+class TestTiledImage(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def makeImage(self, width, height):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(QColor(0, 0, 255))
+        # A red square in the bottom right corner
+        for x in range(width - 100, width):
+            for y in range(height - 100, height):
+                image.setPixel(x, y, QColor(255, 0, 0).rgb())
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'PNG')
+        return bytes(buffer.data())
+
+    def test_levels_and_tiles(self):
+        tiled = TiledImage(self.makeImage(3000, 2000), tileSize=256)
+        self.assertEqual((tiled.width(), tiled.height()), (3000, 2000))
+        # 3000 >> 2 fits in the 1024 overview
+        self.assertEqual(tiled.maxLevel, 2)
+        self.assertEqual(tiled.levelFor(1.0), 0)
+        self.assertEqual(tiled.levelFor(0.6), 0)
+        self.assertEqual(tiled.levelFor(0.5), 1)
+        self.assertEqual(tiled.levelFor(0.01), 2)
+        self.assertEqual(tiled.tilesIn(0, QRectF(0, 0, 256, 256)), [(0, 0)])
+        self.assertEqual(tiled.tilesIn(1, QRectF(500, 0, 100, 10)), [(0, 0), (1, 0)])
+        self.assertEqual(tiled.tilesIn(0, QRectF(5000, 0, 10, 10)), [])
+        # The last column is cut at the image border
+        self.assertEqual(tiled.imageRectOf(0, 11, 7), QRectF(2816, 1792, 184, 208))
+        self.assertEqual(tiled.overviewImage.size(), tiled.levelSize(2))
+        # Only the overview is decoded
+        self.assertTrue(tiled.sizeInBytes() < 3000 * 2000)
+        self.assertEqual(QColor(tiled.copy(QRect(2950, 1950, 100, 100)).pixel(10, 10)), QColor(255, 0, 0))
+        self.assertEqual(tiled.copy(QRect(2990, 1990, 100, 100)).size(), QRect(0, 0, 10, 10).size())
+
+    def test_decode_image(self):
+        data = self.makeImage(300, 200)
+        self.assertIsInstance(decodeImage(data), QImage)
+        minPixels = imageLoader.TILED_MIN_PIXELS
+        imageLoader.TILED_MIN_PIXELS = 300 * 200
+        try:
+            self.assertIsInstance(decodeImage(data), TiledImage)
+        finally:
+            imageLoader.TILED_MIN_PIXELS = minPixels
+        self.assertTrue(decodeImage(b'').isNull())
+
+    def test_progressive_paint(self):
+        tiled = TiledImage(self.makeImage(3000, 2000), tileSize=256)
+        target = QImage(3000, 2000, QImage.Format_RGB32)
+        visible = QRectF(2700, 1700, 300, 300)
+
+        def paint(rect=visible, scale=1.0):
+            painter = QPainter(target)
+            missing = tiled.paint(painter, rect, scale)
+            painter.end()
+            return missing
+
+        # First pass draws the overview and queues the 4 tiles in view,
+        # their 2 bands are decoded in the background
+        self.assertTrue(paint())
+        self.assertTrue(tiled.hasPending())
+        tiled.waitForBands()
+        made = tiled.makePending(budget=10)
+        self.assertEqual(len(made), 4)
+        self.assertFalse(paint())
+        self.assertEqual(QColor(target.pixel(2950, 1950)), QColor(255, 0, 0))
+        self.assertEqual(QColor(target.pixel(2850, 1750)), QColor(0, 0, 255))
+
+        # Tiles queued for a zoom that is no longer shown are dropped
+        self.assertTrue(paint(QRectF(0, 0, 300, 300)))
+        self.assertTrue(paint(QRectF(0, 0, 300, 300), 0.5))
+        tiled.waitForBands()
+        made = tiled.makePending(budget=10)
+        self.assertEqual(made, [QRectF(0, 0, 512, 512)])
+        self.assertFalse(tiled.hasPending())
+
+    def test_canvas_makes_every_pending_tile(self):
+        canvas = Canvas()
+        canvas.resize(800, 600)
+        tiled = TiledImage(self.makeImage(3000, 2000), tileSize=256)
+        canvas.loadPixmap(tiled)
+        canvas.scale = 1.0
+        canvas.grab()
+        pending = len(tiled._pending)
+        self.assertTrue(pending > TILES_PER_PASS)
+        # One pass makes a few tiles and queues the next one itself
+        canvas._tileTimer.stop()
+        tiled.waitForBands()
+        canvas.makeTiles()
+        self.assertTrue(canvas._tileTimer.isActive())
+        for _ in range(pending):
+            tiled.waitForBands()
+            canvas.makeTiles()
+        self.assertFalse(tiled.hasPending())
+        self.assertTrue(tiled._tiles)
+        # Another image: the tiles go, the overview stays
+        canvas.loadPixmap(QPixmap(10, 10))
+        self.assertFalse(tiled._tiles or tiled._bands)
+        self.assertFalse(tiled.isNull())
+
+if __name__ == '__main__':
+    unittest.main()